@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Empresa, Producto, Inventario
+from .models import User, Empresa, Producto, Inventario, SugerenciaProducto
 
 
 @admin.register(User)
@@ -42,3 +42,9 @@ class InventarioAdmin(admin.ModelAdmin):
     search_fields = ('empresa__nombre', 'producto__nombre')
     list_filter = ('empresa', 'fecha_ingreso')
 
+
+
+@admin.register(SugerenciaProducto)
+class SugerenciaProductoAdmin(admin.ModelAdmin):
+    list_display = ('producto', 'contenido_hash', 'fecha_actualizacion')
+    search_fields = ('producto__nombre', 'producto__codigo')
@@ -4,4 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
-
+    
+    def ready(self):
+        # Registrar las señales que mantienen los índices en memoria
+        from . import signals  # noqa: F401
+        # El arranque en caliente del modelo se hace en config/asgi.py y config/wsgi.py,
+        # para que migrate, shell y los demás comandos no consulten a Gemini
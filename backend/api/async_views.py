@@ -0,0 +1,154 @@
+"""
+Vistas asíncronas (ASGI) para los endpoints que dependen de Gemini.
+Mientras se espera la respuesta del modelo el worker queda libre para atender
+otras solicitudes, en lugar de ocupar un hilo durante todo el round trip.
+
+Django REST Framework 3.14 no soporta vistas asíncronas, por lo que estas vistas
+son vistas de Django que reutilizan la autenticación JWT del API.
+"""
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .models import Producto, Inventario, User
+from .services import aget_product_suggestions, aget_inventory_predictions, aget_chatbot_response
+from .recommender import get_similar_products
+from .basic_suggestions import get_basic_suggestions
+
+
+async def _autenticar(request, solo_administrador=False):
+    """
+    Autentica la solicitud con el token JWT.
+
+    Returns:
+        tuple: (usuario, None) si es válido, o (None, JsonResponse con el error)
+    """
+    try:
+        resultado = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as e:
+        return None, JsonResponse({'detail': str(e.detail)}, status=401)
+
+    if resultado is None:
+        return None, JsonResponse(
+            {'detail': 'Las credenciales de autenticación no se proveyeron.'},
+            status=401
+        )
+
+    user = resultado[0]
+    if solo_administrador and user.rol != User.Rol.ADMINISTRADOR:
+        return None, JsonResponse(
+            {'detail': 'Usted no tiene permiso para realizar esta acción.'},
+            status=403
+        )
+    return user, None
+
+
+def _metodo_no_permitido(request):
+    return JsonResponse({'detail': f'Método "{request.method}" no permitido.'}, status=405)
+
+
+async def chatbot(request):
+    """Versión asíncrona de ChatbotView"""
+    if request.method != 'POST':
+        return _metodo_no_permitido(request)
+
+    user, error = await _autenticar(request)
+    if error:
+        return error
+
+    try:
+        data = json.loads(request.body or b'{}')
+        question = str(data.get('question', '')).strip()
+
+        if not question:
+            return JsonResponse({'error': 'Debe proporcionar una pregunta'}, status=400)
+
+        response = await aget_chatbot_response(question, user)
+
+        return JsonResponse({
+            'response': response,
+            'question': question
+        }, status=200)
+
+    except Exception as e:
+        return JsonResponse({'error': f'Error al procesar la pregunta: {str(e)}'}, status=500)
+
+
+# La autenticación es por token JWT (sin cookies), igual que en las vistas de DRF.
+# En Django 4.2 el decorador csrf_exempt no soporta vistas asíncronas.
+chatbot.csrf_exempt = True
+
+
+async def ai_suggestions(request, pk):
+    """Versión asíncrona de ProductoViewSet.ai_suggestions (mismo parámetro ?backend=gemini|tfidf)"""
+    if request.method != 'GET':
+        return _metodo_no_permitido(request)
+
+    user, error = await _autenticar(request, solo_administrador=True)
+    if error:
+        return error
+
+    producto = await Producto.objects.only('nombre', 'caracteristicas').filter(pk=pk).afirst()
+    if producto is None:
+        return JsonResponse({'detail': 'No encontrado.'}, status=404)
+
+    backend = request.GET.get('backend', settings.PRODUCT_SUGGESTIONS_BACKEND)
+    if backend == 'tfidf':
+        # Construir el índice consulta la base de datos y usa CPU: se hace en un hilo
+        suggestions, similares = await sync_to_async(get_similar_products)(producto)
+        if not similares:
+            suggestions = get_basic_suggestions(producto.nombre, producto.caracteristicas)
+        return JsonResponse({'suggestions': suggestions, 'similar_products': similares, 'backend': 'tfidf'})
+    if backend != 'gemini':
+        return JsonResponse({'error': "El parámetro backend debe ser 'gemini' o 'tfidf'"}, status=400)
+
+    suggestions = await aget_product_suggestions(pk, producto.nombre, producto.caracteristicas, user=user)
+    return JsonResponse({'suggestions': suggestions})
+
+
+async def inventory_predictions(request):
+    """Versión asíncrona de InventarioViewSet.inventory_predictions"""
+    if request.method != 'GET':
+        return _metodo_no_permitido(request)
+
+    user, error = await _autenticar(request, solo_administrador=True)
+    if error:
+        return error
+
+    try:
+        inventarios = Inventario.objects.select_related('empresa', 'producto').all()
+
+        # Filtrar por empresa si se proporciona
+        empresa_nit = request.GET.get('empresa', None)
+        if empresa_nit:
+            inventarios = inventarios.filter(empresa__nit=empresa_nit)
+
+        # Preparar datos para el análisis
+        inventario_data = []
+        async for inv in inventarios:
+            inventario_data.append({
+                'producto_nombre': inv.producto.nombre,
+                'producto_codigo': inv.producto.codigo,
+                'cantidad': inv.cantidad,
+                'empresa_nombre': inv.empresa.nombre,
+                'empresa_nit': inv.empresa.nit,
+                'fecha_ingreso': inv.fecha_ingreso.strftime('%Y-%m-%d') if inv.fecha_ingreso else '',
+                'fecha_actualizacion': inv.fecha_actualizacion.strftime('%Y-%m-%d') if inv.fecha_actualizacion else ''
+            })
+
+        if not inventario_data:
+            return JsonResponse({
+                'alerts': [],
+                'message': 'No hay inventario disponible para analizar'
+            })
+
+        alerts = await aget_inventory_predictions(inventario_data, user=user)
+
+        return JsonResponse({
+            'alerts': alerts,
+            'total_alerts': len(alerts)
+        })
+    except Exception as e:
+        return JsonResponse({'error': f'Error al obtener predicciones: {str(e)}'}, status=500)
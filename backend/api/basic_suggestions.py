@@ -0,0 +1,184 @@
+"""
+Sugerencias básicas de productos (sin IA), usadas como respaldo de Gemini.
+
+Las reglas por categoría son una tabla de datos que se compila una sola vez en
+una expresión regular con forma de trie. Cada texto se recorre en una sola
+pasada, con un costo que no depende del número de categorías.
+"""
+import re
+
+
+# Reglas en orden de prioridad: (palabras clave, sugerencias).
+# Si el texto contiene palabras de varias categorías, gana la primera de la tabla.
+REGLAS_SUGERENCIAS = [
+    # Tecnología y electrónicos
+    (('computador', 'laptop', 'pc', 'ordenador', 'portatil'), (
+        "Mouse inalámbrico",
+        "Teclado mecánico",
+        "Monitor adicional",
+    )),
+    (('telefono', 'smartphone', 'celular', 'movil', 'iphone', 'android'), (
+        "Cable de carga USB-C/Lightning",
+        "Funda protectora resistente",
+        "Auriculares inalámbricos",
+    )),
+    (('tablet', 'ipad'), (
+        "Estuche con teclado",
+        "Lápiz digital compatible",
+        "Soporte ajustable",
+    )),
+    (('electronico', 'tecnologia', 'gadget', 'dispositivo'), (
+        "Cable de carga compatible",
+        "Funda o protector",
+        "Accesorio de soporte",
+    )),
+    # Ropa y moda
+    (('camisa', 'camiseta', 'polo', 'blusa'), (
+        "Pantalón o falda coordinada",
+        "Cinturón complementario",
+        "Chaqueta o abrigo",
+    )),
+    (('pantalon', 'jeans', 'pantalones'), (
+        "Cinturón de cuero",
+        "Zapatos o zapatillas",
+        "Camisa o blusa",
+    )),
+    (('vestido', 'falda'), (
+        "Zapatos de tacón o planos",
+        "Bolso o cartera",
+        "Accesorios de joyería",
+    )),
+    (('ropa', 'vestimenta', 'moda', 'prenda'), (
+        "Complemento de moda relacionado",
+        "Accesorio de vestimenta",
+        "Producto de cuidado textil",
+    )),
+    # Alimentos y bebidas
+    (('bebida', 'refresco', 'jugo', 'agua', 'cerveza', 'vino'), (
+        "Vaso o copa apropiada",
+        "Hielo o enfriador",
+        "Snacks complementarios",
+    )),
+    (('comida', 'alimento', 'comestible', 'snack'), (
+        "Plato o recipiente para servir",
+        "Utensilios de cocina",
+        "Bebida complementaria",
+    )),
+    # Herramientas y construcción
+    (('herramienta', 'taladro', 'martillo', 'destornillador'), (
+        "Caja de herramientas",
+        "Guantes de protección",
+        "Accesorios o repuestos",
+    )),
+    # Muebles
+    (('mueble', 'silla', 'mesa', 'sofa', 'cama'), (
+        "Almohadas o cojines",
+        "Mesa auxiliar",
+        "Lámpara o iluminación",
+    )),
+    # Libros y material educativo
+    (('libro', 'texto', 'manual', 'guia'), (
+        "Marcador o resaltador",
+        "Cuaderno o libreta",
+        "Estuche o portafolio",
+    )),
+    # Deportes
+    (('deporte', 'futbol', 'balon', 'pelota', 'gimnasio'), (
+        "Equipamiento deportivo relacionado",
+        "Ropa deportiva",
+        "Accesorios de entrenamiento",
+    )),
+    # Palabras clave más generales, solo si no se detectó una categoría específica
+    (('cable', 'conexion', 'conector'), (
+        "Adaptador compatible",
+        "Extensión o prolongador",
+        "Organizador de cables",
+    )),
+    (('bateria', 'pilas', 'energia'), (
+        "Cargador compatible",
+        "Cable de carga",
+        "Power bank o banco de energía",
+    )),
+    (('limpieza', 'detergente', 'jabon', 'shampoo'), (
+        "Esponja o cepillo",
+        "Recipiente o dispensador",
+        "Producto complementario de cuidado",
+    )),
+]
+
+
+def _regex_trie(palabras):
+    """
+    Construye una expresión regular con forma de trie para las palabras dadas.
+    En cada nodo las continuaciones van antes que el fin de palabra, por lo que
+    en cada posición se obtiene la palabra más larga que coincide.
+    """
+    trie = {}
+    for palabra in palabras:
+        nodo = trie
+        for letra in palabra:
+            nodo = nodo.setdefault(letra, {})
+        nodo[''] = {}
+
+    def construir(nodo):
+        ramas = [re.escape(letra) + construir(hijo) for letra, hijo in sorted(nodo.items()) if letra]
+        if not ramas:
+            return ''
+        patron = ramas[0] if len(ramas) == 1 else '(?:' + '|'.join(ramas) + ')'
+        if '' in nodo:
+            patron = '(?:' + patron + ')?'
+        return patron
+
+    return construir(trie)
+
+
+def _compilar_reglas(reglas):
+    """
+    Compila las reglas en un único patrón y una tabla palabra -> categoría.
+
+    La búsqueda es por subcadena (como `palabra in texto`) y con lookahead, para
+    encontrar también palabras que se solapan. Como en cada posición el patrón
+    devuelve la palabra más larga, cada palabra hereda la mejor prioridad de las
+    palabras clave que son prefijo suyo.
+    """
+    prioridad = {}
+    for indice, (palabras, _) in enumerate(reglas):
+        for palabra in palabras:
+            prioridad.setdefault(palabra, indice)
+
+    for palabra in prioridad:
+        for fin in range(1, len(palabra)):
+            prefijo = palabra[:fin]
+            if prefijo in prioridad:
+                prioridad[palabra] = min(prioridad[palabra], prioridad[prefijo])
+
+    patron = re.compile('(?=(' + _regex_trie(prioridad) + '))')
+    return patron, prioridad
+
+
+_PATRON, _PRIORIDAD = _compilar_reglas(REGLAS_SUGERENCIAS)
+
+# Respuestas ya formateadas por categoría
+_RESPUESTAS = ["\n".join(f"- {sug}" for sug in sugerencias) for _, sugerencias in REGLAS_SUGERENCIAS]
+
+
+def clasificar(texto):
+    """
+    Retorna el índice de la regla que aplica al texto (en minúsculas), o None.
+    """
+    return min(map(_PRIORIDAD.__getitem__, _PATRON.findall(texto)), default=None)
+
+
+def get_basic_suggestions(nombre, caracteristicas):
+    """Genera sugerencias básicas basadas en el producto"""
+    texto_completo = f"{nombre.lower()} {caracteristicas.lower() if caracteristicas else ''}"
+    categoria = clasificar(texto_completo)
+    if categoria is not None:
+        return _RESPUESTAS[categoria]
+
+    # Si realmente no se puede determinar, dar sugerencias más genéricas pero útiles
+    return "\n".join([
+        f"- Accesorio compatible para {nombre}",
+        "- Producto complementario relacionado",
+        "- Solución adicional recomendada",
+    ])
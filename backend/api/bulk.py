@@ -0,0 +1,306 @@
+"""
+Operaciones masivas sobre inventario y productos.
+
+Resuelven las llaves foráneas con una consulta por modelo y escriben con
+bulk_create, en lugar de una solicitud (y una o dos escrituras) por fila.
+"""
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from .models import Empresa, Producto, Inventario
+from .serializers import InventarioBulkItemSerializer
+from .utils import generate_blockchain_hashes
+from .currency_service import get_exchange_rates, convert_with_rates
+from .domain_adapters import ProductoAdapter
+from . import recommender, summary, typeahead
+
+
+# Filas por sentencia INSERT
+BULK_BATCH_SIZE = 1000
+
+# Filas del CSV que se validan e insertan juntas
+IMPORT_CHUNK_SIZE = 2000
+
+# Errores de fila que se incluyen en el resultado de la importación (el total siempre se cuenta)
+IMPORT_MAX_ERRORES = 1000
+
+# Columnas obligatorias del CSV de productos
+COLUMNAS_PRODUCTO = ('codigo', 'nombre', 'caracteristicas', 'precio_usd', 'empresa')
+
+
+class ImportacionInterrumpida(ValueError):
+    """
+    El CSV dejó de poderse leer a mitad del archivo (codificación, byte NUL, comillas).
+
+    Las filas anteriores a `fila` ya quedaron importadas; `resultado` tiene el
+    mismo formato que el retorno de import_productos_csv.
+    """
+
+    def __init__(self, mensaje, fila, resultado):
+        super().__init__(mensaje)
+        self.fila = fila
+        self.resultado = resultado
+
+# Límite de los campos de precio del modelo (max_digits=10, decimal_places=2)
+_PRECIO_MAXIMO = Decimal('99999999.99')
+
+
+def bulk_upsert_inventario(filas):
+    """
+    Crea o actualiza muchas filas de inventario (empresa, producto, cantidad).
+    
+    Las filas válidas se escriben con un upsert sobre (empresa, producto) en una
+    sola transacción; las inválidas se reportan con su índice y no se escriben.
+    
+    Args:
+        filas: Lista de dicts con 'empresa' (NIT), 'producto' (id) y 'cantidad'
+    
+    Returns:
+        dict: {'creados', 'actualizados', 'errores': [{'fila', 'errores'}]}
+    """
+    errores = []
+    validas = []
+    # Una sola instancia del serializer: crearla por fila copia sus campos cada vez
+    serializer = InventarioBulkItemSerializer()
+    for indice, fila in enumerate(filas):
+        try:
+            validas.append((indice, serializer.run_validation(fila)))
+        except ValidationError as e:
+            errores.append({'fila': indice, 'errores': e.detail})
+    
+    # Resolver las llaves foráneas: una consulta por modelo
+    empresas = Empresa.objects.only('nit').in_bulk({datos['empresa'] for _, datos in validas})
+    productos = Producto.objects.only('id', 'codigo').in_bulk({datos['producto'] for _, datos in validas})
+    
+    por_clave = {}
+    for indice, datos in validas:
+        errores_fila = {}
+        if datos['empresa'] not in empresas:
+            errores_fila['empresa'] = [f'La empresa con NIT "{datos["empresa"]}" no existe.']
+        if datos['producto'] not in productos:
+            errores_fila['producto'] = [f'El producto con id "{datos["producto"]}" no existe.']
+        clave = (datos['empresa'], datos['producto'])
+        if not errores_fila and clave in por_clave:
+            errores_fila['non_field_errors'] = [
+                f'Fila duplicada: la misma empresa y producto ya aparecen en la fila {por_clave[clave][0]}.'
+            ]
+        if errores_fila:
+            errores.append({'fila': indice, 'errores': errores_fila})
+        else:
+            por_clave[clave] = (indice, datos)
+    
+    if not por_clave:
+        errores.sort(key=lambda e: e['fila'])
+        return {'creados': 0, 'actualizados': 0, 'errores': errores}
+    
+    claves = list(por_clave)
+    hashes = generate_blockchain_hashes(
+        (empresa_nit, productos[producto_id].codigo, por_clave[(empresa_nit, producto_id)][1]['cantidad'])
+        for empresa_nit, producto_id in claves
+    )
+    inventarios = [
+        Inventario(
+            empresa_id=empresa_nit,
+            producto_id=producto_id,
+            cantidad=por_clave[(empresa_nit, producto_id)][1]['cantidad'],
+            transaccion_hash=hash_transaccion
+        )
+        for (empresa_nit, producto_id), hash_transaccion in zip(claves, hashes)
+    ]
+    
+    with transaction.atomic():
+        # Solo para reportar cuántas filas ya existían
+        existentes = set(
+            Inventario.objects
+            .filter(empresa_id__in={e for e, _ in claves}, producto_id__in={p for _, p in claves})
+            .values_list('empresa_id', 'producto_id')
+        )
+        Inventario.objects.bulk_create(
+            inventarios,
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['empresa', 'producto'],
+            update_fields=['cantidad', 'transaccion_hash', 'fecha_actualizacion']
+        )
+        # bulk_create no emite post_save
+        summary.invalidar_resumen()
+    
+    actualizados = sum(1 for clave in claves if clave in existentes)
+    errores.sort(key=lambda e: e['fila'])
+    return {
+        'creados': len(claves) - actualizados,
+        'actualizados': actualizados,
+        'errores': errores,
+    }
+
+
+def _decodificar_lineas(archivo):
+    # Línea por línea (y no por bloques) para que un error de codificación se
+    # detecte en la fila donde ocurre, después de entregar las filas anteriores
+    for numero, linea in enumerate(archivo):
+        yield linea.decode('utf-8-sig' if numero == 0 else 'utf-8')
+
+
+def _leer_csv(archivo):
+    """Lector de filas (dict) de un archivo CSV binario o de texto, sin cargarlo completo"""
+    if isinstance(archivo, io.TextIOBase):
+        texto = archivo
+    else:
+        texto = _decodificar_lineas(archivo)
+    return csv.DictReader(texto)
+
+
+def _producto_desde_fila(fila, rates):
+    """
+    Valida una fila del CSV con las reglas de la entidad de dominio Producto.
+    
+    Los precios en EUR y COP se calculan desde el USD con las tasas dadas, igual
+    que al crear un producto desde el API.
+    
+    Raises:
+        ValueError: Si la fila no cumple las reglas del dominio
+    """
+    datos = {campo: (fila.get(campo) or '').strip() for campo in COLUMNAS_PRODUCTO}
+    try:
+        precio_usd = Decimal(datos['precio_usd'] or '0')
+    except InvalidOperation:
+        raise ValueError(f'Precio USD inválido: "{datos["precio_usd"]}"')
+    # Decimal acepta 'inf', 'NaN' y exponentes enormes, que luego fallan al convertir
+    if not precio_usd.is_finite():
+        raise ValueError(f'Precio USD inválido: "{datos["precio_usd"]}"')
+    if precio_usd > _PRECIO_MAXIMO:
+        raise ValueError('El precio excede el máximo permitido (99.999.999,99)')
+    
+    try:
+        convertido = convert_with_rates(precio_usd, rates)
+        datos['precio_usd'] = convertido['usd'].quantize(Decimal('0.01'))
+        datos['precio_eur'] = convertido['eur']
+        datos['precio_cop'] = convertido['cop']
+        producto = ProductoAdapter.from_dict(datos)
+    except InvalidOperation:
+        raise ValueError(f'Precio USD inválido: "{datos["precio_usd"]}"')
+    if max(producto.precio_usd, producto.precio_eur, producto.precio_cop) > _PRECIO_MAXIMO:
+        raise ValueError('El precio excede el máximo permitido (99.999.999,99)')
+    return producto
+
+
+def _insertar_lote_productos(lote, empresas_validas, resultado):
+    """Valida contra la base de datos un lote de (número de fila, producto) y lo inserta"""
+    # Empresas aún no vistas en el archivo: una consulta por lote
+    nuevas = {p.empresa_nit for _, p in lote} - empresas_validas.keys()
+    if nuevas:
+        existentes = set(Empresa.objects.filter(nit__in=nuevas).values_list('nit', flat=True))
+        empresas_validas.update({nit: nit in existentes for nit in nuevas})
+    
+    # Códigos repetidos en la base de datos (incluye los lotes anteriores del mismo archivo)
+    codigos_existentes = set(
+        Producto.objects.filter(codigo__in={p.codigo for _, p in lote}).values_list('codigo', flat=True)
+    )
+    
+    validos = []
+    codigos_lote = set()
+    for numero, producto in lote:
+        if not empresas_validas[producto.empresa_nit]:
+            _agregar_error(resultado, numero, f'La empresa con NIT "{producto.empresa_nit}" no existe')
+        elif producto.codigo in codigos_existentes or producto.codigo in codigos_lote:
+            _agregar_error(resultado, numero, f'Ya existe un producto con el código "{producto.codigo}"')
+        else:
+            codigos_lote.add(producto.codigo)
+            validos.append(Producto(
+                codigo=producto.codigo,
+                nombre=producto.nombre,
+                caracteristicas=producto.caracteristicas,
+                precio_usd=producto.precio_usd,
+                precio_eur=producto.precio_eur,
+                precio_cop=producto.precio_cop,
+                empresa_id=producto.empresa_nit
+            ))
+    
+    if validos:
+        with transaction.atomic():
+            creados = Producto.objects.bulk_create(validos, batch_size=BULK_BATCH_SIZE)
+        resultado['creados'] += len(creados)
+        
+        # bulk_create no emite post_save: actualizar los índices en memoria directamente
+        summary.invalidar_resumen()
+        for producto in creados:
+            if producto.pk is not None:
+                recommender.producto_guardado(producto)
+                typeahead.producto_guardado(producto)
+
+
+def _agregar_error(resultado, numero, mensaje):
+    resultado['total_errores'] += 1
+    if len(resultado['errores']) < IMPORT_MAX_ERRORES:
+        resultado['errores'].append({'fila': numero, 'error': mensaje})
+
+
+def import_productos_csv(archivo, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Importa productos desde un CSV leyendo el archivo en streaming.
+    
+    Columnas: codigo, nombre, caracteristicas, precio_usd, empresa (NIT).
+    Todas las filas se convierten con una sola consulta de tasas de cambio y se
+    insertan por lotes de `chunk_size`, por lo que la memoria no depende del
+    tamaño del archivo. Cada lote se escribe en su propia transacción.
+    
+    Si el archivo deja de poderse leer a mitad de camino, se insertan las filas
+    leídas hasta ese punto y se lanza ImportacionInterrumpida con lo importado.
+    
+    Args:
+        archivo: Archivo CSV (binario o de texto)
+        chunk_size: Filas por lote
+    
+    Returns:
+        dict: {'creados', 'total_errores', 'errores': [{'fila', 'error'}]}
+    
+    Raises:
+        ValueError: Si faltan columnas obligatorias o el encabezado no se puede leer
+        ImportacionInterrumpida: Si una fila posterior no se puede leer
+    """
+    lector = _leer_csv(archivo)
+    try:
+        columnas = lector.fieldnames or []
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ValueError(f'No se pudo leer el inicio del archivo: {e}')
+    faltantes = [c for c in COLUMNAS_PRODUCTO if c not in columnas]
+    if faltantes:
+        raise ValueError(f'Faltan columnas en el CSV: {", ".join(faltantes)}')
+    
+    rates = get_exchange_rates('USD')
+    resultado = {'creados': 0, 'total_errores': 0, 'errores': []}
+    empresas_validas = {}
+    lote = []
+    
+    # La fila 1 es el encabezado
+    numero = 1
+    filas = iter(lector)
+    while True:
+        try:
+            fila = next(filas, None)
+        except (csv.Error, UnicodeDecodeError) as e:
+            # Los lotes anteriores ya están confirmados: importar también lo leído
+            # hasta aquí y reportar dónde se detuvo la lectura
+            if lote:
+                _insertar_lote_productos(lote, empresas_validas, resultado)
+            resultado['errores'].sort(key=lambda error: error['fila'])
+            raise ImportacionInterrumpida(
+                f'No se pudo leer la fila {numero + 1}: {e}', numero + 1, resultado
+            )
+        if fila is None:
+            break
+        numero += 1
+        try:
+            lote.append((numero, _producto_desde_fila(fila, rates)))
+        except ValueError as e:
+            _agregar_error(resultado, numero, str(e))
+        if len(lote) >= chunk_size:
+            _insertar_lote_productos(lote, empresas_validas, resultado)
+            lote = []
+    if lote:
+        _insertar_lote_productos(lote, empresas_validas, resultado)
+    
+    resultado['errores'].sort(key=lambda e: e['fila'])
+    return resultado
@@ -0,0 +1,184 @@
+"""
+Enrutador de intenciones para el chatbot.
+Responde preguntas estructuradas (conteos, totales, precios y stock) con una
+sola consulta a la base de datos, sin llamar al modelo de IA.
+"""
+import re
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from .models import Empresa, Producto, Inventario
+
+
+# Palabras de relleno que se eliminan del nombre capturado en la pregunta
+_ARTICULOS = ('el ', 'la ', 'los ', 'las ', 'un ', 'una ', 'producto ', 'empresa ')
+
+
+def _limpiar_entidad(texto):
+    """Limpia el nombre de producto o empresa capturado en la pregunta"""
+    entidad = texto.strip(' \t\n¿?¡!.,;:"\'')
+    cambio = True
+    while cambio:
+        cambio = False
+        for articulo in _ARTICULOS:
+            if entidad.lower().startswith(articulo):
+                entidad = entidad[len(articulo):].strip()
+                cambio = True
+    return entidad
+
+
+def _valor_total(prefijo=''):
+    """Expresión de valor (cantidad * precio) para cada moneda"""
+    campos = {}
+    for moneda in ('usd', 'eur', 'cop'):
+        campos[f'valor_{moneda}'] = Sum(
+            ExpressionWrapper(
+                F(f'{prefijo}cantidad') * F(f'{prefijo}producto__precio_{moneda}'),
+                output_field=DecimalField(max_digits=20, decimal_places=2)
+            )
+        )
+    return campos
+
+
+def _responder_total_empresas(match):
+    total = Empresa.objects.count()
+    return f"📊 Total de empresas registradas: **{total}**"
+
+
+def _responder_total_productos(match):
+    total = Producto.objects.count()
+    return f"📦 Total de productos registrados: **{total}**"
+
+
+def _responder_total_unidades(match):
+    resumen = Inventario.objects.aggregate(unidades=Sum('cantidad'), registros=Count('id'))
+    unidades = resumen['unidades'] or 0
+    return (
+        f"📋 Total de unidades en inventario: **{unidades}** "
+        f"({resumen['registros']} registros de inventario)"
+    )
+
+
+def _responder_valor_total(match):
+    resumen = Inventario.objects.aggregate(**_valor_total())
+    respuesta = "💰 **Valor total del inventario:**\n"
+    respuesta += f"   - USD: ${float(resumen['valor_usd'] or 0):,.2f}\n"
+    respuesta += f"   - EUR: €{float(resumen['valor_eur'] or 0):,.2f}\n"
+    respuesta += f"   - COP: ${float(resumen['valor_cop'] or 0):,.2f}\n"
+    return respuesta
+
+
+def _responder_precio(match):
+    nombre = _limpiar_entidad(match.group('entidad'))
+    if not nombre:
+        return None
+
+    productos = list(
+        Producto.objects
+        .filter(Q(nombre__iexact=nombre) | Q(codigo__iexact=nombre))
+        .values('codigo', 'nombre', 'precio_usd', 'precio_eur', 'precio_cop', 'empresa__nombre')[:5]
+    )
+    if not productos:
+        return None
+
+    respuesta = "**Precios encontrados:**\n\n"
+    for prod in productos:
+        respuesta += f"📦 **{prod['nombre']}** (Código: {prod['codigo']})\n"
+        respuesta += f"   - Empresa: {prod['empresa__nombre']}\n"
+        respuesta += f"   - Precio USD: ${float(prod['precio_usd']):,.2f}\n"
+        respuesta += f"   - Precio EUR: €{float(prod['precio_eur']):,.2f}\n"
+        respuesta += f"   - Precio COP: ${float(prod['precio_cop']):,.2f}\n\n"
+    return respuesta
+
+
+def _responder_stock(match):
+    nombre = _limpiar_entidad(match.group('entidad'))
+    if not nombre:
+        return None
+
+    # Una sola consulta: el nombre puede ser de una empresa (nombre o NIT) o de un producto (nombre o código)
+    filas = list(
+        Inventario.objects
+        .filter(
+            Q(empresa__nombre__iexact=nombre) | Q(empresa__nit=nombre) |
+            Q(producto__nombre__iexact=nombre) | Q(producto__codigo__iexact=nombre)
+        )
+        .values('empresa__nombre', 'producto__nombre', 'producto__codigo', 'cantidad')
+        .order_by('empresa__nombre', 'producto__nombre')
+    )
+    if not filas:
+        return None
+
+    total = sum(fila['cantidad'] for fila in filas)
+    respuesta = f"📋 **Stock de {nombre}:** {total} unidades\n\n"
+    for fila in filas:
+        respuesta += (
+            f"   - {fila['producto__nombre']} ({fila['producto__codigo']}) en "
+            f"{fila['empresa__nombre']}: {fila['cantidad']} unidades\n"
+        )
+    return respuesta
+
+
+# Fórmulas que pueden preceder a la pregunta ("dime, ¿cuál es el ...")
+_PREFIJO = (
+    r'(?:(?:dame|dime|mu[eé]strame|ind[ií]came|quiero\s+saber|me\s+(?:dices|puedes\s+decir))[\s,]+)?'
+    r'(?:(?:cu[aá]l|cu[aá]nto)\s+es\s+)?'
+    r'(?:(?:el|la)\s+)?'
+)
+# Complementos que no cambian el sentido de un conteo o total ("... hay en total")
+_SUFIJO = r'(?:\s+(?:hay|existen|tenemos|registrad[oa]s|en\s+total|en\s+el\s+sistema|en\s+(?:el\s+)?inventario))*'
+
+
+def _pregunta(patron, sufijo=''):
+    """Patrón que debe cubrir la pregunta completa (se usa con fullmatch)"""
+    return re.compile(_PREFIJO + patron + sufijo, re.IGNORECASE)
+
+
+# Tabla de intenciones en orden de prioridad: (patrón, función que responde).
+# Cada patrón cubre la pregunta completa: "¿cuántos productos tiene Acme?" o
+# "¿cuántas empresas tienen stock bajo?" no son conteos globales y van al modelo de IA.
+INTENCIONES = [
+    (_pregunta(r'(?:precio|valor)\s+(?:del?\s+)?(?!total\b)(?P<entidad>.+)'), _responder_precio),
+    (_pregunta(r'(?:(?:cu[aá]nto|qu[eé])\s+)?(?:cuesta|vale)\s+(?P<entidad>.+)'), _responder_precio),
+    (
+        _pregunta(
+            r'(?:(?:cu[aá]nt[oa]s?|qu[eé])\s+)?(?:stock|existencias|inventario|unidades)\s+'
+            r'(?:hay\s+)?(?:del?|tiene)\s+(?P<entidad>.+)'
+        ),
+        _responder_stock
+    ),
+    (_pregunta(r'(?:cu[aá]nt[oa]s\s+empresas|(?:total|n[uú]mero|cantidad)\s+de\s+empresas)', _SUFIJO), _responder_total_empresas),
+    (_pregunta(r'(?:cu[aá]nt[oa]s\s+productos|(?:total|n[uú]mero|cantidad)\s+de\s+productos)', _SUFIJO), _responder_total_productos),
+    (_pregunta(r'valor\s+(?:total\s+)?del?\s+inventario(?:\s+total)?|valor\s+total', _SUFIJO), _responder_valor_total),
+    (
+        _pregunta(r'(?:cu[aá]ntas\s+unidades|total\s+de\s+unidades|unidades\s+totales|stock\s+total|inventario\s+total)', _SUFIJO),
+        _responder_total_unidades
+    ),
+]
+
+
+def _normalizar(question):
+    """Quita los signos de interrogación y exclamación y los espacios repetidos"""
+    texto = re.sub(r'[¿?¡!]', ' ', question)
+    return ' '.join(texto.split()).strip(' .,;:')
+
+
+def answer_structured_question(question):
+    """
+    Intenta responder una pregunta estructurada directamente desde la base de datos.
+
+    Args:
+        question: Pregunta del usuario
+
+    Returns:
+        Respuesta del chatbot, o None si la pregunta es abierta y debe ir al modelo de IA
+    """
+    texto = _normalizar(question)
+    if not texto:
+        return None
+
+    for patron, responder in INTENCIONES:
+        match = patron.fullmatch(texto)
+        if match:
+            respuesta = responder(match)
+            if respuesta:
+                return respuesta
+    return None
@@ -0,0 +1,181 @@
+"""
+Compresión de respuestas (Brotli o gzip) según el Accept-Encoding del cliente.
+
+A diferencia de GZipMiddleware de Django, solo comprime los tipos de contenido
+de RESPONSE_COMPRESSION_TYPES (no las imágenes, que ya vienen comprimidas), deja
+sin comprimir las respuestas menores a RESPONSE_COMPRESSION_MIN_SIZE bytes y
+prefiere Brotli cuando el paquete está instalado y el cliente lo acepta. Si la
+versión comprimida no resulta más pequeña se envía la original.
+
+Las respuestas en streaming se comprimen bloque a bloque, vaciando el compresor
+después de cada bloque para que el cliente siga recibiendo datos a medida que
+se generan.
+
+Mitigación de BREACH: como GZipMiddleware de Django 4.2, cada respuesta gzip
+lleva en la cabecera un nombre de archivo aleatorio de 1 a
+RESPONSE_COMPRESSION_GZIP_RANDOM_BYTES bytes, lo que vuelve ruidoso el tamaño
+de la respuesta. Brotli no tiene un campo equivalente, así que las rutas que
+devuelven secretos en el cuerpo (los tokens JWT de login y refresh, en
+RESPONSE_COMPRESSION_EXCLUDED_PATHS) no se comprimen con ninguna codificación.
+"""
+import secrets
+import struct
+import zlib
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import get_random_string
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # Brotli es opcional; sin el paquete se usa solo gzip
+    brotli = None
+
+
+def _calidades(accept_encoding):
+    """Calidad (q) de cada codificación mencionada por el cliente, incluidas las de q=0"""
+    calidades = {}
+    for parte in accept_encoding.split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        nombre = nombre.strip().lower()
+        calidad = 1.0
+        parametro = parametros.strip()
+        if parametro.startswith('q='):
+            try:
+                calidad = float(parametro[2:])
+            except ValueError:
+                calidad = 0.0
+        if nombre:
+            calidades[nombre] = calidad
+    return calidades
+
+
+def elegir_codificacion(accept_encoding):
+    """'br', 'gzip' o None según lo que acepta el cliente y lo que está disponible"""
+    calidades = _calidades(accept_encoding or '')
+
+    def aceptada(nombre):
+        # '*' cubre solo las codificaciones que el cliente no nombró: 'gzip;q=0, *' excluye gzip
+        return calidades.get(nombre, calidades.get('*', 0.0)) > 0
+
+    if brotli is not None and aceptada('br'):
+        return 'br'
+    if aceptada('gzip'):
+        return 'gzip'
+    return None
+
+
+def _cabecera_gzip():
+    """Cabecera gzip (RFC 1952) con un nombre de archivo aleatorio (FNAME) contra BREACH"""
+    maximo = settings.RESPONSE_COMPRESSION_GZIP_RANDOM_BYTES
+    if maximo <= 0:
+        return b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+    nombre = get_random_string(secrets.randbelow(maximo) + 1).encode('ascii')
+    # FLG=FNAME, MTIME=0, XFL=0, OS=255 (desconocido)
+    return b'\x1f\x8b\x08\x08\x00\x00\x00\x00\x00\xff' + nombre + b'\x00'
+
+
+class _Gzip:
+    def __init__(self):
+        # wbits=-15: deflate sin envoltura con ventana de 32 KB; la cabecera y el
+        # final (CRC32 y tamaño) se escriben aquí para poder incluir el nombre aleatorio
+        self._compresor = zlib.compressobj(settings.RESPONSE_COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, -15)
+        self._cabecera = _cabecera_gzip()
+        self._crc = 0
+        self._tamano = 0
+
+    def _comprimir(self, datos):
+        self._crc = zlib.crc32(datos, self._crc)
+        self._tamano += len(datos)
+        salida = self._cabecera + self._compresor.compress(datos)
+        self._cabecera = b''
+        return salida
+
+    def bloque(self, datos):
+        return self._comprimir(datos) + self._compresor.flush(zlib.Z_SYNC_FLUSH)
+
+    def completo(self, datos):
+        return self._comprimir(datos) + self.fin()
+
+    def fin(self):
+        final = struct.pack('<II', self._crc, self._tamano & 0xFFFFFFFF)
+        return self._cabecera + self._compresor.flush() + final
+
+
+class _Brotli:
+    def __init__(self):
+        self._compresor = brotli.Compressor(quality=settings.RESPONSE_COMPRESSION_BROTLI_QUALITY)
+
+    def bloque(self, datos):
+        return self._compresor.process(datos) + self._compresor.flush()
+
+    def completo(self, datos):
+        return self._compresor.process(datos) + self._compresor.finish()
+
+    def fin(self):
+        return self._compresor.finish()
+
+
+_COMPRESORES = {'gzip': _Gzip, 'br': _Brotli}
+
+
+def _comprimir_stream(contenido, compresor):
+    for datos in contenido:
+        if datos:
+            yield compresor.bloque(datos)
+    yield compresor.fin()
+
+
+async def _comprimir_stream_async(contenido, compresor):
+    async for datos in contenido:
+        if datos:
+            yield compresor.bloque(datos)
+    yield compresor.fin()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Comprime las respuestas con Brotli o gzip (ver el docstring del módulo)"""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.tipos = frozenset(settings.RESPONSE_COMPRESSION_TYPES)
+        self.tamano_minimo = settings.RESPONSE_COMPRESSION_MIN_SIZE
+        self.rutas_excluidas = tuple(settings.RESPONSE_COMPRESSION_EXCLUDED_PATHS)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 304):
+            return response
+        if request.path.startswith(self.rutas_excluidas):
+            return response
+        tipo = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if tipo not in self.tipos:
+            return response
+        if not response.streaming and len(response.content) < self.tamano_minimo:
+            return response
+
+        # La respuesta depende del Accept-Encoding aunque este cliente no acepte compresión
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacion = elegir_codificacion(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if codificacion is None:
+            return response
+
+        compresor = _COMPRESORES[codificacion]()
+        if response.streaming:
+            if getattr(response, 'is_async', False):
+                response.streaming_content = _comprimir_stream_async(response.streaming_content, compresor)
+            else:
+                response.streaming_content = _comprimir_stream(response.streaming_content, compresor)
+            del response['Content-Length']
+        else:
+            comprimido = compresor.completo(response.content)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response['Content-Length'] = str(len(comprimido))
+
+        # El cuerpo ya no es idéntico byte a byte: el ETag pasa a ser débil (como en GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codificacion
+        return response
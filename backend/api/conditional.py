@@ -0,0 +1,70 @@
+"""
+GET condicional (ETag / Last-Modified) para los ViewSets del API.
+
+El validador se calcula con una sola consulta de agregación sobre el queryset
+filtrado (máxima fecha de actualización y número de filas). Si el cliente ya
+tiene esa versión se responde 304 sin cargar ni serializar las filas.
+"""
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    Agrega ETag y Last-Modified a `list` y `retrieve`.
+
+    `etag_related_fields` lista las fechas de actualización de los modelos
+    relacionados que aparecen en la respuesta (p. ej. el nombre de la empresa),
+    para que un cambio en ellos también invalide la versión.
+    """
+    etag_updated_field = 'fecha_actualizacion'
+    etag_related_fields = ()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._respuesta_condicional(request, queryset, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        )
+        return self._respuesta_condicional(request, queryset, super().retrieve, *args, **kwargs)
+
+    def _version(self, queryset):
+        """Una consulta: (número de filas, máxima fecha de actualización propia y de cada relación)"""
+        campos = (self.etag_updated_field,) + tuple(self.etag_related_fields)
+        agregados = {f'max_{i}': Max(campo) for i, campo in enumerate(campos)}
+        resultado = queryset.order_by().aggregate(total=Count('pk'), **agregados)
+        fechas = [resultado[f'max_{i}'] for i in range(len(campos))]
+        return resultado['total'], fechas
+
+    def _respuesta_condicional(self, request, queryset, generar_respuesta, *args, **kwargs):
+        total, fechas = self._version(queryset)
+        if not total and self.action == 'retrieve':
+            # Que el flujo normal responda 404
+            return generar_respuesta(request, *args, **kwargs)
+
+        # La misma versión de los datos se ve distinta según la URL (filtros, página) y el formato
+        firma = '|'.join([
+            request.get_full_path(),
+            getattr(request, 'accepted_media_type', '') or '',
+            str(total),
+            *[fecha.isoformat() if fecha else '' for fecha in fechas],
+        ])
+        etag = '"%s"' % hashlib.md5(firma.encode('utf-8')).hexdigest()
+        fechas_validas = [fecha for fecha in fechas if fecha]
+        last_modified = int(max(fechas_validas).timestamp()) if fechas_validas else None
+
+        respuesta = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if respuesta is None:
+            respuesta = generar_respuesta(request, *args, **kwargs)
+
+        respuesta['ETag'] = etag
+        if last_modified is not None:
+            respuesta['Last-Modified'] = http_date(last_modified)
+        # El navegador puede guardar la respuesta pero debe revalidarla en cada uso
+        patch_cache_control(respuesta, private=True, no_cache=True)
+        return respuesta
@@ -5,10 +5,12 @@ import requests
 from decimal import Decimal
 from django.conf import settings
 import logging
+from .metrics import medir, TASAS_DURACION, TASAS_RESPALDO
 
 logger = logging.getLogger(__name__)
 
 
+@medir(TASAS_DURACION)
 def get_exchange_rates(base_currency='USD'):
     """
     Obtiene las tasas de cambio desde una API gratuita
@@ -29,6 +31,7 @@ def get_exchange_rates(base_currency='USD'):
         }
     except requests.exceptions.RequestException as e:
         logger.warning(f'Error al obtener tasas de cambio desde API: {e}')
+        TASAS_RESPALDO.inc()
         # Tasas de cambio por defecto (fallback)
         return {
             'EUR': Decimal('0.85'),
@@ -37,6 +40,7 @@ def get_exchange_rates(base_currency='USD'):
         }
     except Exception as e:
         logger.error(f'Error inesperado al obtener tasas de cambio: {e}')
+        TASAS_RESPALDO.inc()
         # Tasas de cambio por defecto (fallback)
         return {
             'EUR': Decimal('0.85'),
@@ -62,12 +66,27 @@ def convert_currency(amount_usd):
             'cop': Decimal('0')
         }
     
-    # Convertir a Decimal para mayor precisión
-    amount_usd = Decimal(str(amount_usd))
-    
     # Obtener tasas de cambio
     rates = get_exchange_rates('USD')
     
+    return convert_with_rates(amount_usd, rates)
+
+
+def convert_with_rates(amount_usd, rates):
+    """
+    Convierte un monto en USD a EUR y COP con tasas ya obtenidas.
+    Permite convertir muchos montos con una sola consulta a la API de tasas.
+    
+    Args:
+        amount_usd: Monto en dólares (Decimal o float)
+        rates: Tasas retornadas por get_exchange_rates('USD')
+    
+    Returns:
+        dict: {'usd': amount, 'eur': eur_amount, 'cop': cop_amount}
+    """
+    # Convertir a Decimal para mayor precisión
+    amount_usd = Decimal(str(amount_usd))
+    
     # Calcular conversiones
     eur_amount = (amount_usd * rates['EUR']).quantize(Decimal('0.01'))
     cop_amount = (amount_usd * rates['COP']).quantize(Decimal('0.01'))
@@ -0,0 +1,103 @@
+"""
+Enrutamiento de lecturas a réplicas de solo lectura.
+
+- Las escrituras siempre van a 'default' (primario).
+- Las lecturas de solicitudes GET/HEAD/OPTIONS van a una réplica, elegida al azar
+  una vez por solicitud para que todas sus consultas vean el mismo estado.
+- Después de la primera escritura de una solicitud, y dentro de transacciones
+  sobre el primario, las lecturas se quedan en el primario para leer lo que se
+  acaba de escribir (la réplica puede ir retrasada).
+- Fuera de una solicitud (comandos, tareas) se lee del primario, salvo dentro de
+  `lecturas_en_replica()`, pensado para reportes y consultas pesadas de solo lectura.
+
+Las réplicas se declaran con DATABASE_REPLICAS (ver config/settings.py). Sin
+réplicas todo va a 'default' y el router no cambia nada.
+
+Las respuestas en streaming se generan después de que termina el middleware,
+por lo que sus consultas van al primario.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_METODOS_LECTURA = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+
+class _EstadoRuteo:
+    """Estado de una solicitud. Es mutable para que los cambios hechos en otro hilo (sync_to_async) se vean"""
+    __slots__ = ('usar_replica', 'replica', 'fijado_primario')
+
+    def __init__(self, usar_replica):
+        self.usar_replica = usar_replica
+        self.replica = None
+        self.fijado_primario = False
+
+
+_estado = ContextVar('estado_ruteo_bd', default=None)
+
+
+@contextmanager
+def lecturas_en_replica():
+    """
+    Envía a las réplicas las lecturas del bloque (o de la función decorada),
+    aunque sea una solicitud POST o se ejecute fuera de una solicitud.
+    """
+    token = _estado.set(_EstadoRuteo(usar_replica=True))
+    try:
+        yield
+    finally:
+        _estado.reset(token)
+
+
+class ReplicaRouter:
+    """Router de Django: lecturas a réplicas según el estado de la solicitud, escrituras al primario"""
+
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if estado is None or not estado.usar_replica or estado.fijado_primario:
+            return DEFAULT_DB_ALIAS
+        if not settings.DATABASE_REPLICA_ALIASES or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if estado.replica is None:
+            estado.replica = random.choice(settings.DATABASE_REPLICA_ALIASES)
+        return estado.replica
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            estado.fijado_primario = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las réplicas contienen los mismos datos que el primario
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """Marca cada solicitud como de lectura (métodos seguros) o de escritura para ReplicaRouter"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _estado.set(_EstadoRuteo(usar_replica=request.method in _METODOS_LECTURA))
+        try:
+            return self.get_response(request)
+        finally:
+            _estado.reset(token)
+
+    async def __acall__(self, request):
+        token = _estado.set(_EstadoRuteo(usar_replica=request.method in _METODOS_LECTURA))
+        try:
+            return await self.get_response(request)
+        finally:
+            _estado.reset(token)
@@ -77,7 +77,7 @@ class ProductoAdapter:
             precio_usd=Decimal(str(django_producto.precio_usd)),
             precio_eur=Decimal(str(django_producto.precio_eur)),
             precio_cop=Decimal(str(django_producto.precio_cop)),
-            empresa_nit=django_producto.empresa.nit,
+            empresa_nit=django_producto.empresa_id,
             fecha_creacion=django_producto.fecha_creacion,
             fecha_actualizacion=django_producto.fecha_actualizacion
         )
@@ -136,7 +136,7 @@ class InventarioAdapter:
         """Convierte un modelo Django a entidad de dominio"""
         return DomainInventario(
             id=django_inventario.id,
-            empresa_nit=django_inventario.empresa.nit,
+            empresa_nit=django_inventario.empresa_id,
             producto_codigo=django_inventario.producto.codigo,
             cantidad=django_inventario.cantidad,
             fecha_ingreso=django_inventario.fecha_ingreso,
@@ -0,0 +1,115 @@
+"""
+Campos a demanda (?fields=) y listados de solo lectura sin instancias de modelo.
+
+Con ?fields=codigo,nombre,precio_usd el serializer retorna solo esos campos y la
+consulta solo lee esas columnas. Los listados se construyen desde `values()` y
+cada valor se convierte con el `to_representation` del campo del serializer, por
+lo que la salida es la misma que la del ModelSerializer sin crear un objeto
+modelo ni recorrer los campos del serializer por cada fila.
+"""
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+class SparseFieldsetMixin:
+    """
+    Mixin para ModelViewSet con serializers basados en DynamicFieldsModelSerializer.
+    """
+    fields_query_param = 'fields'
+
+    def get_campos_solicitados(self):
+        """Campos pedidos con ?fields=, o None si se piden todos"""
+        if not hasattr(self, '_campos_solicitados'):
+            self._campos_solicitados = None
+            valor = self.request.query_params.get(self.fields_query_param) if self.request else None
+            if valor and self.request.method == 'GET':
+                campos = [campo.strip() for campo in valor.split(',') if campo.strip()]
+                disponibles = list(self.get_serializer_class()().fields)
+                invalidos = [campo for campo in campos if campo not in disponibles]
+                if invalidos:
+                    raise ValidationError({
+                        self.fields_query_param: [
+                            f'Campos no válidos: {", ".join(invalidos)}. '
+                            f'Disponibles: {", ".join(disponibles)}'
+                        ]
+                    })
+                self._campos_solicitados = campos
+        return self._campos_solicitados
+
+    def get_serializer(self, *args, **kwargs):
+        campos = self.get_campos_solicitados()
+        if campos is not None and 'fields' not in kwargs:
+            kwargs['fields'] = campos
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        respuesta = self.listado_valores(self.get_serializer())
+        if respuesta is None:
+            return super().list(request, *args, **kwargs)
+        return respuesta
+
+    def listado_valores(self, serializer):
+        """
+        Listado filtrado y paginado leído con values() para los campos del serializer.
+
+        Returns:
+            Response, o None si algún campo no se puede leer con values()
+        """
+        columnas = self._columnas_lectura(serializer)
+        if columnas is None:
+            return None
+
+        # Campos de ordenamiento que necesita la paginación por cursor
+        rutas = [ruta for _, ruta, _ in columnas]
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        extra = [campo.lstrip('-') for campo in ordering if campo.lstrip('-') not in rutas]
+
+        queryset = self.filter_queryset(self.get_queryset()).values(*rutas, *extra)
+        page = self.paginate_queryset(queryset)
+        filas = page if page is not None else queryset
+        data = [
+            {nombre: convertir(fila[ruta]) for nombre, ruta, convertir in columnas}
+            for fila in filas
+        ]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @staticmethod
+    def _columnas_lectura(serializer):
+        """
+        Retorna [(nombre, ruta ORM, conversión)] para leer el listado con values(),
+        o None si algún campo no se puede leer así (p. ej. SerializerMethodField).
+        """
+        columnas = []
+        for nombre, campo in serializer.fields.items():
+            if campo.write_only:
+                continue
+            if isinstance(campo, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+                return None
+            if campo.source == '*' or not campo.source_attrs:
+                return None
+            ruta = '__'.join(campo.source_attrs)
+            if isinstance(campo, serializers.PrimaryKeyRelatedField):
+                # values() ya retorna la llave primaria del objeto relacionado
+                convertir = _identidad
+            elif isinstance(campo, serializers.RelatedField):
+                return None
+            else:
+                convertir = _conversion(campo)
+            columnas.append((nombre, ruta, convertir))
+        return columnas
+
+
+def _identidad(valor):
+    return valor
+
+
+def _conversion(campo):
+    """to_representation del campo, con None como en Serializer.to_representation"""
+    to_representation = campo.to_representation
+
+    def convertir(valor):
+        return None if valor is None else to_representation(valor)
+    return convertir
@@ -0,0 +1,543 @@
+"""
+Gateway único para las llamadas al modelo de lenguaje (LLM).
+
+Todas las llamadas a Gemini pasan por aquí, con:
+- Límite de concurrencia global y por usuario
+- Limitador de tasa tipo token bucket
+- Plazo máximo (deadline) por llamada
+- Reintentos con backoff exponencial y jitter
+- Backend intercambiable: Gemini o un backend falso local con latencia configurable
+  (LLM_BACKEND='fake') para pruebas de carga sin acceso a red
+"""
+import asyncio
+import random
+import threading
+import time
+import google.generativeai as genai
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .metrics import medir, LLM_DURACION
+
+
+class LLMError(Exception):
+    """Error base del gateway de LLM"""
+
+
+class LLMUnavailable(LLMError):
+    """No hay backend o modelo disponible"""
+
+
+class LLMRateLimited(LLMError):
+    """Se superó el límite de tasa o de concurrencia dentro del plazo"""
+
+
+class LLMTimeout(LLMError):
+    """Se superó el plazo máximo de la llamada"""
+
+
+def _resolver_modelo_gemini(excluir=()):
+    """
+    Intenta obtener un modelo de Gemini disponible consultando el catálogo.
+    Prueba diferentes modelos en orden de preferencia.
+    
+    Args:
+        excluir: Nombres de modelos que fallaron recientemente y no deben usarse
+    
+    Returns:
+        tuple: (nombre, GenerativeModel) del modelo disponible, o (None, None) si ninguno funciona
+    """
+    
+    # Lista de modelos a probar en orden de preferencia
+    # Los modelos más recientes primero
+    # Nota: Los modelos disponibles pueden variar según la región y el plan
+    modelos_a_probar = [
+        'gemini-1.5-flash-latest',  # Versión más reciente de flash
+        'gemini-1.5-pro-latest',    # Versión más reciente de pro
+        'gemini-1.5-flash',         # Versión estable de flash
+        'gemini-1.5-pro',            # Versión estable de pro
+        'gemini-pro',                # Modelo legacy (puede no estar disponible)
+    ]
+    
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    
+    # Intentar listar modelos disponibles primero
+    try:
+        available_models = genai.list_models()
+        # Filtrar modelos que soportan generateContent
+        supported_models = []
+        for m in available_models:
+            try:
+                # Intentar acceder a los atributos del modelo
+                model_name = getattr(m, 'name', None) or getattr(m, 'display_name', None) or str(m)
+                methods = getattr(m, 'supported_generation_methods', [])
+                
+                if model_name and ('generateContent' in methods or len(methods) == 0):
+                    # Limpiar el nombre del modelo
+                    model_clean = model_name.replace('models/', '')
+                    supported_models.append(model_clean)
+            except Exception:
+                continue
+        
+        # Priorizar modelos de nuestra lista que estén disponibles
+        for modelo_preferido in modelos_a_probar:
+            modelo_limpio = modelo_preferido.replace('models/', '')
+            if modelo_limpio in supported_models and modelo_limpio not in excluir:
+                try:
+                    return modelo_limpio, genai.GenerativeModel(modelo_limpio)
+                except Exception:
+                    continue
+        
+        # Si no encontramos ninguno de los preferidos, usar el primero disponible
+        supported_models = [m for m in supported_models if m not in excluir]
+        if supported_models:
+            try:
+                return supported_models[0], genai.GenerativeModel(supported_models[0])
+            except Exception:
+                pass
+    except Exception:
+        # Si falla list_models, intentar directamente con los modelos preferidos
+        pass
+    
+    # Fallback: intentar cada modelo directamente
+    for modelo in modelos_a_probar:
+        modelo_limpio = modelo.replace('models/', '')
+        if modelo_limpio in excluir:
+            continue
+        try:
+            model = genai.GenerativeModel(modelo_limpio)
+            # Intentar una llamada de prueba para verificar que el modelo funciona
+            # (No generamos contenido, solo verificamos que el modelo existe)
+            return modelo_limpio, model
+        except Exception:
+            continue
+    
+    # Si llegamos aquí, ningún modelo funcionó
+    # El error se manejará en las funciones que llaman a esta
+    return None, None
+
+
+# Caché del modelo resuelto, compartido por todo el proceso.
+# Evita llamar a genai.list_models() (un round trip de red) en cada solicitud.
+_modelo_gemini = {
+    'nombre': None,
+    'modelo': None,
+    'expira': 0.0,
+    'fallidos': {},  # nombre -> momento en que falló
+    'resolviendo': False,
+}
+_modelo_gemini_lock = threading.Lock()
+
+
+def _actualizar_modelo_gemini():
+    """Resuelve el modelo y lo guarda en la caché del proceso"""
+    ahora = time.monotonic()
+    with _modelo_gemini_lock:
+        # Los modelos que fallaron se excluyen durante un TTL
+        fallidos = {
+            nombre: momento for nombre, momento in _modelo_gemini['fallidos'].items()
+            if ahora - momento < settings.GEMINI_MODEL_TTL
+        }
+        _modelo_gemini['fallidos'] = fallidos
+    
+    try:
+        nombre, modelo = _resolver_modelo_gemini(excluir=set(fallidos))
+    except Exception:
+        nombre, modelo = None, None
+    
+    with _modelo_gemini_lock:
+        if modelo is not None:
+            _modelo_gemini['nombre'] = nombre
+            _modelo_gemini['modelo'] = modelo
+            _modelo_gemini['expira'] = time.monotonic() + settings.GEMINI_MODEL_TTL
+        _modelo_gemini['resolviendo'] = False
+    return modelo
+
+
+def _resolver_en_segundo_plano():
+    """Lanza la resolución del modelo en un hilo, si no hay otra en curso"""
+    with _modelo_gemini_lock:
+        if _modelo_gemini['resolviendo']:
+            return
+        _modelo_gemini['resolviendo'] = True
+    threading.Thread(target=_actualizar_modelo_gemini, name='gemini-model-resolver', daemon=True).start()
+
+
+def warm_up_gemini_model():
+    """Resuelve el modelo en segundo plano al iniciar la aplicación"""
+    if settings.GEMINI_API_KEY:
+        _resolver_en_segundo_plano()
+
+
+def _get_available_gemini_model():
+    """
+    Obtiene el modelo de Gemini disponible desde la caché del proceso.
+    
+    Si el modelo expiró se sigue usando mientras se vuelve a resolver en segundo plano.
+    Si fue marcado como fallido y la nueva resolución está en curso, retorna None
+    para que quien llama use su respuesta de respaldo sin esperar.
+    
+    Returns:
+        GenerativeModel: Modelo de Gemini disponible, o None si ninguno funciona
+    """
+    if not settings.GEMINI_API_KEY:
+        return None
+    
+    with _modelo_gemini_lock:
+        modelo = _modelo_gemini['modelo']
+        expirado = time.monotonic() >= _modelo_gemini['expira']
+        resolviendo = _modelo_gemini['resolviendo']
+    
+    if modelo is not None:
+        if expirado:
+            _resolver_en_segundo_plano()
+        return modelo
+    
+    if resolviendo:
+        return None
+    
+    # Primer uso sin arranque en caliente: resolver de forma síncrona
+    with _modelo_gemini_lock:
+        _modelo_gemini['resolviendo'] = True
+    return _actualizar_modelo_gemini()
+
+
+def _modelo_en_cache():
+    """Indica si hay un modelo en caché (obtenerlo no requiere E/S)"""
+    with _modelo_gemini_lock:
+        return _modelo_gemini['modelo'] is not None
+
+
+def _registrar_error_modelo(error):
+    """
+    Marca el modelo en caché como fallido si el error indica que el modelo
+    no existe o no está soportado, y lanza su nueva resolución en segundo plano.
+    """
+    error_str = str(error).lower()
+    if not ('404' in error_str or 'not found' in error_str or 'not supported' in error_str):
+        return
+    
+    with _modelo_gemini_lock:
+        nombre = _modelo_gemini['nombre']
+        if nombre:
+            _modelo_gemini['fallidos'][nombre] = time.monotonic()
+        _modelo_gemini['nombre'] = None
+        _modelo_gemini['modelo'] = None
+        _modelo_gemini['expira'] = 0.0
+    _resolver_en_segundo_plano()
+
+
+class GeminiBackend:
+    """Backend que llama a Google Gemini usando el modelo en caché del proceso"""
+    
+    def is_configured(self):
+        return bool(settings.GEMINI_API_KEY)
+    
+    def warm_up(self):
+        warm_up_gemini_model()
+    
+    def _get_model(self):
+        model = _get_available_gemini_model()
+        if model is None:
+            raise LLMUnavailable('No se pudo conectar con ningún modelo de Gemini disponible')
+        return model
+    
+    def generate(self, prompt, timeout):
+        response = self._get_model().generate_content(prompt, request_options={'timeout': timeout})
+        return response.text
+    
+    async def _aget_model(self):
+        if _modelo_en_cache():
+            return self._get_model()
+        # Sin modelo en caché la resolución llama a genai.list_models() (un round trip
+        # de red): se hace en un hilo para no bloquear el event loop
+        return await sync_to_async(self._get_model, thread_sensitive=False)()
+    
+    async def agenerate(self, prompt, timeout):
+        model = await self._aget_model()
+        response = await model.generate_content_async(prompt, request_options={'timeout': timeout})
+        return response.text
+    
+    def registrar_error(self, error):
+        _registrar_error_modelo(error)
+
+
+class FakeBackend:
+    """
+    Backend local para pruebas de carga sin red.
+    Simula la latencia del modelo y, opcionalmente, errores 429.
+    """
+    
+    def is_configured(self):
+        return True
+    
+    def warm_up(self):
+        pass
+    
+    def _latencia(self):
+        return max(0.0, settings.LLM_FAKE_LATENCY + random.uniform(-1, 1) * settings.LLM_FAKE_LATENCY_JITTER)
+    
+    def _respuesta(self, prompt):
+        if random.random() < settings.LLM_FAKE_ERROR_RATE:
+            raise LLMRateLimited('429 rate_limit (backend falso)')
+        # Los prompts que piden JSON reciben un array vacío válido
+        if 'JSON' in prompt:
+            return '[]'
+        return '- Respuesta del modelo falso'
+    
+    def generate(self, prompt, timeout):
+        time.sleep(min(self._latencia(), timeout))
+        return self._respuesta(prompt)
+    
+    async def agenerate(self, prompt, timeout):
+        await asyncio.sleep(min(self._latencia(), timeout))
+        return self._respuesta(prompt)
+    
+    def registrar_error(self, error):
+        pass
+
+
+BACKENDS = {
+    'gemini': GeminiBackend,
+    'fake': FakeBackend,
+}
+
+
+class TokenBucket:
+    """Limitador de tasa: `rate` tokens por segundo con ráfagas de hasta `capacity`"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.actualizado = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def try_consume(self):
+        """
+        Intenta consumir un token.
+        
+        Returns:
+            float: 0 si se consumió, o los segundos a esperar hasta el próximo token
+        """
+        if not self.rate:
+            return 0.0
+        with self.lock:
+            ahora = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (ahora - self.actualizado) * self.rate)
+            self.actualizado = ahora
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class ConcurrencyLimiter:
+    """
+    Límite de llamadas simultáneas, global y por usuario.
+    Compartido entre hilos (vistas síncronas) y tareas asyncio (vistas ASGI).
+    
+    Las llamadas sin usuario (None: tareas y comandos del sistema) solo cuentan
+    para el límite global; no comparten un cupo por usuario entre todas ellas.
+    """
+    
+    def __init__(self, max_global, max_por_usuario):
+        self.max_global = max_global
+        self.max_por_usuario = max_por_usuario
+        self.en_curso = 0
+        self.por_usuario = {}
+        self.condicion = threading.Condition()
+    
+    def _try_acquire(self, usuario):
+        if self.en_curso >= self.max_global:
+            return False
+        if usuario is None:
+            self.en_curso += 1
+            return True
+        if self.por_usuario.get(usuario, 0) >= self.max_por_usuario:
+            return False
+        self.en_curso += 1
+        self.por_usuario[usuario] = self.por_usuario.get(usuario, 0) + 1
+        return True
+    
+    def acquire(self, usuario, deadline):
+        with self.condicion:
+            while not self._try_acquire(usuario):
+                restante = deadline - time.monotonic()
+                if restante <= 0:
+                    raise LLMRateLimited('rate_limit: demasiadas solicitudes simultáneas al modelo')
+                self.condicion.wait(restante)
+    
+    async def aacquire(self, usuario, deadline):
+        # No se puede bloquear el event loop esperando la condición: se sondea
+        espera = 0.005
+        while True:
+            with self.condicion:
+                if self._try_acquire(usuario):
+                    return
+            if time.monotonic() + espera > deadline:
+                raise LLMRateLimited('rate_limit: demasiadas solicitudes simultáneas al modelo')
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, 0.1)
+    
+    def release(self, usuario):
+        with self.condicion:
+            self.en_curso -= 1
+            if usuario is not None:
+                restantes = self.por_usuario.get(usuario, 1) - 1
+                if restantes:
+                    self.por_usuario[usuario] = restantes
+                else:
+                    self.por_usuario.pop(usuario, None)
+            self.condicion.notify_all()
+
+
+def _es_reintentable(error):
+    """Errores temporales que vale la pena reintentar (429, 5xx, timeouts)"""
+    if isinstance(error, (LLMRateLimited, LLMTimeout)):
+        return True
+    error_str = str(error).lower()
+    return any(marca in error_str for marca in (
+        '429', 'rate_limit', 'resource exhausted', '500', '502', '503', '504',
+        'unavailable', 'timeout', 'deadline', 'connection'
+    ))
+
+
+class LLMGateway:
+    """Punto único de acceso al modelo de lenguaje"""
+    
+    def __init__(self, backend):
+        self.backend = backend
+        self.limiter = ConcurrencyLimiter(settings.LLM_MAX_CONCURRENCY, settings.LLM_MAX_CONCURRENCY_PER_USER)
+        self.bucket = TokenBucket(settings.LLM_RATE_LIMIT, settings.LLM_RATE_BURST)
+    
+    def is_available(self):
+        return self.backend.is_configured()
+    
+    def configurar_tasa(self, rate, capacity):
+        """Reemplaza el límite de tasa de este proceso (p. ej. en un comando por lotes)"""
+        self.bucket = TokenBucket(rate, capacity)
+    
+    def _deadline(self, timeout):
+        return time.monotonic() + (timeout if timeout is not None else settings.LLM_TIMEOUT)
+    
+    def _espera_reintento(self, intento, deadline):
+        """Backoff exponencial con jitter completo, acotado por el plazo"""
+        espera = random.uniform(0, settings.LLM_RETRY_BASE_DELAY * (2 ** intento))
+        if time.monotonic() + espera >= deadline:
+            return None
+        return espera
+    
+    def _espera_token(self, deadline):
+        espera = self.bucket.try_consume()
+        if espera and time.monotonic() + espera >= deadline:
+            raise LLMRateLimited('rate_limit: límite de tasa del modelo alcanzado')
+        return espera
+    
+    @medir(LLM_DURACION)
+    def generate(self, prompt, user=None, timeout=None):
+        """
+        Genera una respuesta del modelo.
+        
+        Args:
+            prompt: Texto del prompt
+            user: Usuario que origina la llamada (para el límite por usuario; None
+                en tareas del sistema, que solo cuentan para el límite global)
+            timeout: Plazo máximo en segundos (por defecto LLM_TIMEOUT)
+        
+        Returns:
+            str: Texto generado
+        
+        Raises:
+            LLMError u otro error del backend si se agotan los reintentos
+        """
+        deadline = self._deadline(timeout)
+        usuario = getattr(user, 'pk', None)
+        self.limiter.acquire(usuario, deadline)
+        try:
+            intento = 0
+            while True:
+                espera = self._espera_token(deadline)
+                while espera:
+                    time.sleep(espera)
+                    espera = self._espera_token(deadline)
+                
+                restante = deadline - time.monotonic()
+                if restante <= 0:
+                    raise LLMTimeout('timeout: se superó el plazo de la llamada al modelo')
+                try:
+                    return self.backend.generate(prompt, restante)
+                except Exception as e:
+                    self.backend.registrar_error(e)
+                    espera = self._espera_reintento(intento, deadline)
+                    if intento >= settings.LLM_MAX_RETRIES or not _es_reintentable(e) or espera is None:
+                        raise
+                    intento += 1
+                    time.sleep(espera)
+        finally:
+            self.limiter.release(usuario)
+    
+    @medir(LLM_DURACION)
+    async def agenerate(self, prompt, user=None, timeout=None):
+        """Versión asíncrona de generate"""
+        deadline = self._deadline(timeout)
+        usuario = getattr(user, 'pk', None)
+        await self.limiter.aacquire(usuario, deadline)
+        try:
+            intento = 0
+            while True:
+                espera = self._espera_token(deadline)
+                while espera:
+                    await asyncio.sleep(espera)
+                    espera = self._espera_token(deadline)
+                
+                restante = deadline - time.monotonic()
+                if restante <= 0:
+                    raise LLMTimeout('timeout: se superó el plazo de la llamada al modelo')
+                try:
+                    return await asyncio.wait_for(self.backend.agenerate(prompt, restante), restante)
+                except asyncio.TimeoutError:
+                    raise LLMTimeout('timeout: se superó el plazo de la llamada al modelo')
+                except Exception as e:
+                    self.backend.registrar_error(e)
+                    espera = self._espera_reintento(intento, deadline)
+                    if intento >= settings.LLM_MAX_RETRIES or not _es_reintentable(e) or espera is None:
+                        raise
+                    intento += 1
+                    await asyncio.sleep(espera)
+        finally:
+            self.limiter.release(usuario)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Obtiene el gateway del proceso, creándolo con la configuración actual"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                backend = BACKENDS[settings.LLM_BACKEND]()
+                _gateway = LLMGateway(backend)
+    return _gateway
+
+
+def is_available():
+    """Indica si hay un backend de LLM configurado"""
+    return get_gateway().is_available()
+
+
+def generate(prompt, user=None, timeout=None):
+    """Genera una respuesta del modelo a través del gateway"""
+    return get_gateway().generate(prompt, user=user, timeout=timeout)
+
+
+async def agenerate(prompt, user=None, timeout=None):
+    """Genera una respuesta del modelo a través del gateway (asíncrono)"""
+    return await get_gateway().agenerate(prompt, user=user, timeout=timeout)
+
+
+def warm_up():
+    """Prepara el backend al iniciar la aplicación"""
+    get_gateway().backend.warm_up()
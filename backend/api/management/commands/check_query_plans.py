@@ -0,0 +1,150 @@
+"""
+Verifica que las consultas frecuentes usen sus índices (EXPLAIN).
+
+Ejecutar:
+    python manage.py check_query_plans [--seed 20000] [--verbose]
+
+En PostgreSQL también se comprueba la búsqueda por nombre con los índices de
+trigramas (pg_trgm). Con --seed se insertan datos de prueba dentro de una transacción que se revierte
+al terminar, para que el planificador tenga un volumen realista. Termina con
+error si alguna consulta no usa el índice esperado.
+"""
+import hashlib
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from api.models import User, Empresa, Producto, Inventario
+from api.pagination import InventarioKeysetPagination, ProductoKeysetPagination
+from api.search import buscar_por_nombre
+
+PAGE_SIZE = 20
+
+
+def _sufijo_sembrado(i):
+    # Con nombres casi idénticos ningún índice de trigramas es selectivo
+    return hashlib.md5(str(i).encode()).hexdigest()[:10]
+
+
+def _nombre_sembrado(prefijo, i):
+    return f'{prefijo} {i:07d} {_sufijo_sembrado(i)}'
+
+
+def _consultas(nit):
+    """(descripción, índice esperado, queryset) de cada patrón de acceso frecuente"""
+    return [
+        (
+            'Inventario de una empresa, más reciente primero',
+            'inventario_empresa_fecha_idx',
+            Inventario.objects.select_related('empresa', 'producto').filter(empresa__nit=nit)
+            .order_by(*InventarioKeysetPagination.ordering)[:PAGE_SIZE],
+        ),
+        (
+            'Inventario completo, más reciente primero',
+            'inventario_fecha_id_idx',
+            Inventario.objects.select_related('empresa', 'producto')
+            .order_by(*InventarioKeysetPagination.ordering)[:PAGE_SIZE],
+        ),
+        (
+            'Productos de una empresa por nombre',
+            'producto_empresa_nombre_idx',
+            Producto.objects.select_related('empresa').filter(empresa__nit=nit)
+            .order_by(*ProductoKeysetPagination.ordering)[:PAGE_SIZE],
+        ),
+        (
+            'Productos por nombre',
+            'producto_nombre_id_idx',
+            Producto.objects.select_related('empresa')
+            .order_by(*ProductoKeysetPagination.ordering)[:PAGE_SIZE],
+        ),
+        (
+            'Correos de los administradores',
+            'user_rol_email_idx',
+            User.objects.filter(rol=User.Rol.ADMINISTRADOR).values_list('email', flat=True),
+        ),
+    ]
+
+
+def _consultas_trigramas():
+    """Búsqueda por nombre (?search=) con índices de trigramas; solo existen en PostgreSQL"""
+    return [
+        (
+            'Búsqueda de productos por nombre',
+            'producto_nombre_trgm_idx',
+            buscar_por_nombre(Producto.objects.all(), _sufijo_sembrado(12))[:PAGE_SIZE],
+        ),
+        (
+            'Búsqueda de empresas por nombre',
+            'empresa_nombre_trgm_idx',
+            buscar_por_nombre(Empresa.objects.all(), _sufijo_sembrado(1))[:PAGE_SIZE],
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Comprueba con EXPLAIN que las consultas frecuentes usan los índices compuestos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Productos de prueba a insertar (se revierten al terminar)')
+        parser.add_argument('--verbose', action='store_true', help='Mostrar el plan completo')
+
+    def handle(self, *args, **options):
+        fallas = []
+        with transaction.atomic():
+            nit = self._sembrar(options['seed']) if options['seed'] else None
+            if nit is None:
+                nit = Empresa.objects.values_list('nit', flat=True).first() or '000000000'
+
+            consultas = _consultas(nit)
+            if connection.vendor == 'postgresql':
+                consultas += _consultas_trigramas()
+            for descripcion, indice, queryset in consultas:
+                plan = queryset.explain()
+                usa_indice = indice in plan
+                estilo = self.style.SUCCESS if usa_indice else self.style.ERROR
+                self.stdout.write(estilo(f"{'OK ' if usa_indice else 'NO '} {descripcion} -> {indice}"))
+                if options['verbose'] or not usa_indice:
+                    self.stdout.write(f'    {plan}'.replace('\n', '\n    '))
+                if not usa_indice:
+                    fallas.append(indice)
+
+            transaction.set_rollback(True)
+
+        if fallas:
+            raise CommandError(f"Consultas sin el índice esperado: {', '.join(fallas)}")
+
+    def _sembrar(self, cantidad):
+        """Inserta empresas, productos, inventario y usuarios de prueba; retorna un NIT sembrado"""
+        n_empresas = max(1, cantidad // 500)
+        # Empresas adicionales sin productos para que la búsqueda por nombre tenga volumen
+        empresas = Empresa.objects.bulk_create([
+            Empresa(nit=f'{999000000000 + i:015d}', nombre=_nombre_sembrado('Empresa plan', i), direccion='-', telefono='-')
+            for i in range(max(n_empresas, cantidad // 2))
+        ], batch_size=2000)
+        Producto.objects.bulk_create([
+            Producto(
+                codigo=f'PLAN-{i}', nombre=_nombre_sembrado('Producto plan', i), caracteristicas='-',
+                precio_usd=Decimal('1'), precio_eur=Decimal('1'), precio_cop=Decimal('1'),
+                empresa=empresas[i % n_empresas]
+            )
+            for i in range(cantidad)
+        ], batch_size=2000)
+        Inventario.objects.bulk_create([
+            Inventario(empresa_id=producto.empresa_id, producto_id=producto.pk, cantidad=i % 50)
+            for i, producto in enumerate(Producto.objects.filter(codigo__startswith='PLAN-').only('pk', 'empresa_id'))
+        ], batch_size=2000)
+        User.objects.bulk_create([
+            User(email=f'plan{i}@example.com', rol=User.Rol.ADMINISTRADOR if i % 50 == 0 else User.Rol.EXTERNO)
+            for i in range(max(100, cantidad // 10))
+        ], batch_size=2000)
+
+        # Estadísticas actualizadas para que el planificador conozca el volumen sembrado
+        with connection.cursor() as cursor:
+            for modelo in (User, Empresa, Producto, Inventario):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(modelo._meta.db_table)}')
+            if connection.vendor == 'postgresql':
+                # Las filas recién insertadas quedan en la lista pendiente de los índices GIN
+                # hasta el siguiente VACUUM; mientras tanto el planificador los estima caros
+                for indice in ('empresa_nombre_trgm_idx', 'producto_nombre_trgm_idx'):
+                    cursor.execute('SELECT gin_clean_pending_list(%s::regclass)', [indice])
+        return empresas[0].nit
@@ -0,0 +1,43 @@
+"""
+Importa productos desde un archivo CSV.
+
+Ejecutar:
+    python manage.py import_products productos.csv [--chunk-size 2000]
+
+Columnas: codigo, nombre, caracteristicas, precio_usd, empresa (NIT).
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from api.bulk import import_productos_csv, ImportacionInterrumpida, IMPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Importa productos desde un CSV por lotes, con una sola consulta de tasas de cambio'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Filas por lote')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        interrupcion = None
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = import_productos_csv(archivo, chunk_size=options['chunk_size'])
+        except ImportacionInterrumpida as e:
+            interrupcion, resultado = e, e.resultado
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+        duracion = time.perf_counter() - inicio
+
+        for error in resultado['errores']:
+            self.stderr.write(f"Fila {error['fila']}: {error['error']}")
+        if resultado['total_errores'] > len(resultado['errores']):
+            self.stderr.write(f"... y {resultado['total_errores'] - len(resultado['errores'])} errores más")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Productos creados: {resultado['creados']} | Errores: {resultado['total_errores']} | "
+            f"{duracion:.1f}s"
+        ))
+        if interrupcion is not None:
+            raise CommandError(f'{interrupcion} (las filas anteriores ya se importaron)')
@@ -0,0 +1,107 @@
+"""
+Precalcula las sugerencias de IA de todo el catálogo.
+
+Ejecutar:
+    python manage.py precompute_suggestions [--batch-size 50] [--workers 4] [--rate 2] [--burst 5] [--force]
+
+Las llamadas se hacen sin usuario, por lo que solo cuentan para el límite global
+LLM_MAX_CONCURRENCY (no para LLM_MAX_CONCURRENCY_PER_USER). El ritmo efectivo es
+min(--rate, llamadas simultáneas / latencia del modelo) llamadas por segundo:
+con el LLM_RATE_LIMIT por defecto (0.25/s) son unas 900 sugerencias por hora,
+con --rate 2 y 4 workers a ~1 s por llamada, unas 7200. --rate solo afecta a
+este proceso; debe respetar la cuota de la API de Gemini.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api import llm_gateway
+from api.models import Producto, SugerenciaProducto
+from api.services import hash_contenido_producto, guardar_sugerencias, _prompt_sugerencias
+
+
+class Command(BaseCommand):
+    help = 'Precalcula y guarda las sugerencias de IA de los productos cuyo texto cambió'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Productos por lote')
+        parser.add_argument('--workers', type=int, default=4, help='Llamadas simultáneas al modelo por lote')
+        parser.add_argument(
+            '--rate', type=float, default=settings.LLM_RATE_LIMIT,
+            help='Llamadas por segundo al modelo en este proceso (0 = sin límite; por defecto LLM_RATE_LIMIT)'
+        )
+        parser.add_argument('--burst', type=int, default=settings.LLM_RATE_BURST, help='Ráfaga máxima del límite de tasa')
+        parser.add_argument('--force', action='store_true', help='Regenerar aunque el texto no haya cambiado')
+
+    def handle(self, *args, **options):
+        if not llm_gateway.is_available():
+            self.stderr.write(self.style.ERROR('No hay backend de IA configurado (GEMINI_API_KEY o LLM_BACKEND)'))
+            return
+
+        llm_gateway.get_gateway().configurar_tasa(options['rate'], options['burst'])
+        simultaneas = min(options['workers'], settings.LLM_MAX_CONCURRENCY)
+        # El plazo de cada llamada incluye la espera por un token: con N workers en cola
+        # el último espera unos N / rate segundos antes de llamar al modelo
+        espera_token = options['workers'] / options['rate'] if options['rate'] else 0
+        options['timeout'] = settings.LLM_TIMEOUT + espera_token
+        if options['rate']:
+            self.stdout.write(
+                f"Ritmo máximo: {options['rate']:g} llamadas/s, {simultaneas} simultáneas "
+                f"(~{options['rate'] * 3600:,.0f} sugerencias por hora)"
+            )
+        else:
+            self.stdout.write(f'Ritmo máximo: sin límite de tasa, {simultaneas} llamadas simultáneas')
+
+        batch_size = options['batch_size']
+        generadas = fallidas = 0
+        lote = []
+
+        productos = Producto.objects.only('id', 'nombre', 'caracteristicas').order_by('id').iterator(chunk_size=batch_size)
+        for producto in productos:
+            lote.append(producto)
+            if len(lote) >= batch_size:
+                ok, error = self._procesar_lote(lote, options)
+                generadas, fallidas = generadas + ok, fallidas + error
+                lote = []
+        if lote:
+            ok, error = self._procesar_lote(lote, options)
+            generadas, fallidas = generadas + ok, fallidas + error
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Sugerencias generadas: {generadas} | Fallidas: {fallidas}'
+        ))
+
+    def _procesar_lote(self, lote, options):
+        """Genera en paralelo las sugerencias del lote y las guarda en una sola consulta"""
+        hashes = {p.pk: hash_contenido_producto(p.nombre, p.caracteristicas) for p in lote}
+
+        if not options['force']:
+            # Descartar los productos cuyas sugerencias ya corresponden a su texto actual
+            vigentes = dict(
+                SugerenciaProducto.objects
+                .filter(producto_id__in=hashes.keys())
+                .values_list('producto_id', 'contenido_hash')
+            )
+            lote = [p for p in lote if vigentes.get(p.pk) != hashes[p.pk]]
+        if not lote:
+            return 0, 0
+
+        def generar(producto):
+            try:
+                prompt = _prompt_sugerencias(producto.nombre, producto.caracteristicas)
+                # Sin usuario: tarea del sistema, sujeta solo al límite global de concurrencia
+                return llm_gateway.generate(prompt, user=None, timeout=options['timeout']).strip()
+            except Exception as e:
+                self.stderr.write(f'Error en el producto {producto.pk}: {e}')
+                return None
+
+        # El gateway aplica los límites de concurrencia y de tasa del modelo
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            resultados = list(pool.map(generar, lote))
+
+        nuevas = [
+            SugerenciaProducto(producto_id=producto.pk, contenido_hash=hashes[producto.pk], sugerencias=texto)
+            for producto, texto in zip(lote, resultados) if texto
+        ]
+        if nuevas:
+            guardar_sugerencias(nuevas)
+        return len(nuevas), len(lote) - len(nuevas)
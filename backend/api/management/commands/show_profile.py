@@ -0,0 +1,39 @@
+"""
+Muestra un perfil guardado por ProfilingMiddleware (api/profiling.py).
+
+Ejecutar:
+    python manage.py show_profile <id> [--sort cumulative|tottime|calls] [--limit 30]
+    python manage.py show_profile --list
+"""
+import io
+import os
+import pstats
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.profiling import ruta_perfil
+
+
+class Command(BaseCommand):
+    help = 'Muestra las funciones más costosas de un perfil guardado con X-Profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('perfil_id', nargs='?', help='Valor de X-Profile-Id')
+        parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime', 'calls'])
+        parser.add_argument('--limit', type=int, default=30)
+        parser.add_argument('--list', action='store_true', help='Lista los perfiles guardados')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            if os.path.isdir(settings.PROFILING_DIR):
+                for nombre in sorted(os.listdir(settings.PROFILING_DIR), reverse=True):
+                    if nombre.endswith('.prof'):
+                        self.stdout.write(nombre[:-len('.prof')])
+            return
+
+        ruta = ruta_perfil(options['perfil_id'])
+        if ruta is None or not os.path.isfile(ruta):
+            raise CommandError(f"No existe el perfil {options['perfil_id']!r} en {settings.PROFILING_DIR}")
+        salida = io.StringIO()
+        estadisticas = pstats.Stats(ruta, stream=salida)
+        estadisticas.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(salida.getvalue())
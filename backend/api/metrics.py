@@ -0,0 +1,337 @@
+"""
+Métricas del proceso (contadores e histogramas) en formato de texto de Prometheus.
+
+Registrar una observación cuesta un lock y una actualización de diccionario, sin
+E/S. Con varios workers (gunicorn, uvicorn --workers) cada proceso vuelca sus
+valores a METRICS_MULTIPROC_DIR/<pid>.json cada METRICS_FLUSH_INTERVAL segundos,
+y /metrics suma los archivos de todos los procesos. Los archivos de procesos que
+ya terminaron se conservan para que los contadores no retrocedan; el directorio
+debe vaciarse al desplegar, antes de iniciar los workers.
+
+Sin METRICS_MULTIPROC_DIR, /metrics muestra solo los valores del proceso que
+atiende la solicitud.
+"""
+import atexit
+import functools
+import hmac
+import inspect
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Límites superiores (segundos) por defecto de los histogramas de latencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class _Registro:
+    """Métricas del proceso y volcado periódico al directorio compartido"""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+        self._proxima_escritura = 0.0
+
+    def registrar(self, metrica):
+        if metrica.nombre in self._metricas:
+            raise ValueError(f'La métrica {metrica.nombre} ya está registrada')
+        self._metricas[metrica.nombre] = metrica
+
+    def instantanea(self):
+        return {nombre: metrica.instantanea() for nombre, metrica in self._metricas.items()}
+
+    def quizas_escribir(self):
+        """Vuelca los valores al directorio compartido si ya pasó el intervalo"""
+        if time.monotonic() >= self._proxima_escritura and settings.METRICS_MULTIPROC_DIR:
+            self.escribir()
+
+    def escribir(self):
+        directorio = settings.METRICS_MULTIPROC_DIR
+        if not directorio:
+            return
+        with self._lock:
+            self._proxima_escritura = time.monotonic() + settings.METRICS_FLUSH_INTERVAL
+            os.makedirs(directorio, exist_ok=True)
+            ruta = os.path.join(directorio, f'{os.getpid()}.json')
+            temporal = f'{ruta}.tmp'
+            with open(temporal, 'w') as archivo:
+                json.dump(self.instantanea(), archivo, separators=(',', ':'))
+            # Reemplazo atómico: quien lee nunca ve un archivo a medio escribir
+            os.replace(temporal, ruta)
+
+    def _instantaneas(self):
+        """Instantáneas de todos los procesos (o solo de este, sin directorio compartido)"""
+        directorio = settings.METRICS_MULTIPROC_DIR
+        if not directorio:
+            return [self.instantanea()]
+        self.escribir()
+        instantaneas = []
+        for nombre in os.listdir(directorio):
+            if not nombre.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directorio, nombre)) as archivo:
+                    instantaneas.append(json.load(archivo))
+            except (OSError, ValueError):
+                # El archivo desapareció o está dañado: se omite en esta lectura
+                continue
+        return instantaneas
+
+    def exponer(self):
+        """Texto en formato de exposición de Prometheus con los valores sumados de todos los procesos"""
+        instantaneas = self._instantaneas()
+        lineas = []
+        for nombre, metrica in self._metricas.items():
+            valores = metrica.sumar(instantanea.get(nombre, []) for instantanea in instantaneas)
+            lineas.append(f'# HELP {nombre} {metrica.descripcion}')
+            lineas.append(f'# TYPE {nombre} {metrica.tipo}')
+            lineas.extend(metrica.lineas(valores))
+        return '\n'.join(lineas) + '\n'
+
+
+REGISTRO = _Registro()
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formato_etiquetas(nombres, valores, extra=''):
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, descripcion, etiquetas=()):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+        REGISTRO.registrar(self)
+
+    def _clave(self, etiquetas):
+        return tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+
+    def instantanea(self):
+        """[[valores de las etiquetas, valor]] serializable en JSON"""
+        with self._lock:
+            return [[list(clave), self._copiar(valor)] for clave, valor in self._valores.items()]
+
+    @staticmethod
+    def _copiar(valor):
+        return valor
+
+
+class Contador(_Metrica):
+    """Contador monótono, p. ej. Contador('x_total', 'Descripción', ['resultado']).inc(resultado='ok')"""
+    tipo = 'counter'
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+        REGISTRO.quizas_escribir()
+
+    @staticmethod
+    def sumar(instantaneas):
+        total = {}
+        for instantanea in instantaneas:
+            for clave, valor in instantanea:
+                clave = tuple(clave)
+                total[clave] = total.get(clave, 0) + valor
+        return total
+
+    def lineas(self, valores):
+        for clave, valor in sorted(valores.items()):
+            yield f'{self.nombre}{_formato_etiquetas(self.etiquetas, clave)} {_numero(valor)}'
+
+
+class Histograma(_Metrica):
+    """
+    Histograma de valores (p. ej. duraciones en segundos).
+
+    Por cada combinación de etiquetas guarda el conteo de cada intervalo (no
+    acumulado, más el intervalo +Inf) y la suma de los valores observados.
+    """
+    tipo = 'histogram'
+
+    def __init__(self, nombre, descripcion, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        super().__init__(nombre, descripcion, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        # Primer intervalo cuyo límite es >= valor (len(buckets) es +Inf)
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            estado = self._valores.get(clave)
+            if estado is None:
+                estado = self._valores[clave] = [[0] * (len(self.buckets) + 1), 0.0]
+            estado[0][indice] += 1
+            estado[1] += valor
+        REGISTRO.quizas_escribir()
+
+    @staticmethod
+    def _copiar(valor):
+        return [list(valor[0]), valor[1]]
+
+    def sumar(self, instantaneas):
+        total = {}
+        for instantanea in instantaneas:
+            for clave, (conteos, suma) in instantanea:
+                clave = tuple(clave)
+                if len(conteos) != len(self.buckets) + 1:
+                    # Archivo de una versión con otros intervalos
+                    continue
+                if clave not in total:
+                    total[clave] = [[0] * len(conteos), 0.0]
+                acumulado = total[clave]
+                acumulado[0] = [a + b for a, b in zip(acumulado[0], conteos)]
+                acumulado[1] += suma
+        return total
+
+    def lineas(self, valores):
+        for clave, (conteos, suma) in sorted(valores.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + ('+Inf',), conteos):
+                acumulado += conteo
+                le = limite if limite == '+Inf' else _numero(float(limite))
+                etiquetas = _formato_etiquetas(self.etiquetas, clave, 'le="%s"' % le)
+                yield f'{self.nombre}_bucket{etiquetas} {acumulado}'
+            yield f'{self.nombre}_sum{_formato_etiquetas(self.etiquetas, clave)} {_numero(suma)}'
+            yield f'{self.nombre}_count{_formato_etiquetas(self.etiquetas, clave)} {acumulado}'
+
+
+def medir(histograma, resultado=None, **etiquetas):
+    """
+    Decorador que observa la duración de la función (síncrona o asíncrona) en el histograma.
+
+    La etiqueta `resultado` vale 'error' si la función lanza una excepción; si no,
+    'ok' o lo que retorne `resultado(valor_retornado)`.
+    """
+    def decorador(funcion):
+        def observar(inicio, valor, error):
+            if error:
+                estado = 'error'
+            else:
+                estado = resultado(valor) if resultado else 'ok'
+            histograma.observe(time.perf_counter() - inicio, resultado=estado, **etiquetas)
+
+        if inspect.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def envoltura_async(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    valor = await funcion(*args, **kwargs)
+                except BaseException:
+                    observar(inicio, None, True)
+                    raise
+                observar(inicio, valor, False)
+                return valor
+            return envoltura_async
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                valor = funcion(*args, **kwargs)
+            except BaseException:
+                observar(inicio, None, True)
+                raise
+            observar(inicio, valor, False)
+            return valor
+        return envoltura
+    return decorador
+
+
+# Métricas de la aplicación
+HTTP_DURACION = Histograma(
+    'http_request_duration_seconds', 'Duración de las solicitudes HTTP por vista',
+    ['view', 'method', 'status']
+)
+PDF_DURACION = Histograma(
+    'pdf_generation_seconds', 'Duración de la generación de PDF de inventario', ['resultado']
+)
+EMAIL_ALERTA_DURACION = Histograma(
+    'stock_alert_email_seconds', 'Duración del envío de correos de alerta de stock', ['resultado']
+)
+TASAS_DURACION = Histograma(
+    'exchange_rates_seconds', 'Duración de la consulta de tasas de cambio', ['resultado']
+)
+TASAS_RESPALDO = Contador(
+    'exchange_rates_fallback_total', 'Consultas de tasas de cambio respondidas con las tasas por defecto'
+)
+LLM_DURACION = Histograma(
+    'llm_request_seconds', 'Duración de las llamadas al modelo de IA (incluye esperas y reintentos)',
+    ['resultado']
+)
+
+
+class MetricsMiddleware:
+    """Observa la duración de cada solicitud, etiquetada con el nombre de la vista (p. ej. inventario-list)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        response = self.get_response(request)
+        self._observar(request, response, inicio)
+        return response
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        response = await self.get_response(request)
+        self._observar(request, response, inicio)
+        return response
+
+    @staticmethod
+    def _observar(request, response, inicio):
+        coincidencia = getattr(request, 'resolver_match', None)
+        HTTP_DURACION.observe(
+            time.perf_counter() - inicio,
+            view=coincidencia.view_name if coincidencia else 'sin_ruta',
+            method=request.method,
+            status=response.status_code,
+        )
+
+
+def vista_metricas(request):
+    """
+    GET /metrics. Si METRICS_TOKEN está configurado exige 'Authorization: Bearer <token>'.
+
+    Sin METRICS_TOKEN el endpoint solo responde con DEBUG=True (desarrollo); en
+    producción responde 403 para no exponer las métricas sin autenticación.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponse('Defina METRICS_TOKEN para habilitar /metrics\n', status=403, content_type='text/plain')
+    if token:
+        recibido = request.META.get('HTTP_AUTHORIZATION', '')
+        if not hmac.compare_digest(recibido.encode(), f'Bearer {token}'.encode()):
+            return HttpResponse('No autorizado\n', status=401, content_type='text/plain')
+    return HttpResponse(REGISTRO.exponer(), content_type=CONTENT_TYPE)
+
+
+atexit.register(REGISTRO.escribir)
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SugerenciaProducto',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sugerencia', serialize=False, to='api.producto', verbose_name='Producto')),
+                ('contenido_hash', models.CharField(max_length=64, verbose_name='Hash del contenido')),
+                ('sugerencias', models.TextField(verbose_name='Sugerencias')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Sugerencia de producto',
+                'verbose_name_plural': 'Sugerencias de productos',
+            },
+        ),
+    ]
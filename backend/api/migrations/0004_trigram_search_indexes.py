@@ -0,0 +1,73 @@
+"""
+Índices GIN de trigramas (pg_trgm) sobre UPPER(nombre) para la búsqueda por nombre.
+Es la expresión que Django genera para `icontains` en PostgreSQL.
+
+Los índices están declarados en Meta.indexes de Empresa y Producto. En la base de
+datos solo se crean en PostgreSQL; en otras (SQLite en desarrollo) la migración
+solo actualiza el estado de los modelos. Se crean con CONCURRENTLY para no
+bloquear las tablas, por eso la migración no es atómica.
+
+Crear la extensión pg_trgm requiere el privilegio CREATE sobre la base de datos
+(es una extensión de confianza desde PostgreSQL 13). Si el rol de la aplicación
+no lo tiene, un superusuario debe ejecutar `CREATE EXTENSION pg_trgm;` antes de
+migrar; si la extensión ya existe, la migración no intenta crearla.
+"""
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import DatabaseError, migrations
+
+
+class CrearExtensionTrigramas(TrigramExtension):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        try:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        except DatabaseError as e:
+            raise DatabaseError(
+                'No se pudo crear la extensión pg_trgm (el rol de la base de datos no tiene '
+                'permiso). Un superusuario debe ejecutar "CREATE EXTENSION pg_trgm;" en esta '
+                f'base de datos y luego repetir migrate. Error original: {e}'
+            ) from e
+
+
+class AgregarIndicePostgres(AddIndexConcurrently):
+    """AddIndexConcurrently que en bases de datos distintas de PostgreSQL solo cambia el estado"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('api', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        CrearExtensionTrigramas(),
+        AgregarIndicePostgres(
+            model_name='empresa',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper('nombre'), name='gin_trgm_ops'
+                ),
+                name='empresa_nombre_trgm_idx',
+            ),
+        ),
+        AgregarIndicePostgres(
+            model_name='producto',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper('nombre'), name='gin_trgm_ops'
+                ),
+                name='producto_nombre_trgm_idx',
+            ),
+        ),
+    ]
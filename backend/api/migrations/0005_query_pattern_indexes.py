@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['empresa', '-fecha_ingreso', '-id'], name='inventario_empresa_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['empresa', 'nombre', 'id'], name='producto_empresa_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['rol', 'email'], name='user_rol_email_idx'),
+        ),
+    ]
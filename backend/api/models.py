@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.validators import RegexValidator
 
 
@@ -51,6 +53,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
+        indexes = [
+            # Correos de los administradores (alertas de stock): la consulta se resuelve solo con el índice
+            models.Index(fields=['rol', 'email'], name='user_rol_email_idx'),
+        ]
     
     def __str__(self):
         return self.email
@@ -79,6 +85,10 @@ class Empresa(models.Model):
         verbose_name = 'Empresa'
         verbose_name_plural = 'Empresas'
         ordering = ['nombre']
+        indexes = [
+            # Búsqueda por nombre (?search=, api/search.py): trigramas sobre UPPER(nombre), solo PostgreSQL
+            GinIndex(OpClass(Upper('nombre'), name='gin_trgm_ops'), name='empresa_nombre_trgm_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nombre} - {self.nit}"
@@ -113,6 +123,14 @@ class Producto(models.Model):
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
         ordering = ['nombre']
+        indexes = [
+            # Paginación por cursor sobre (nombre, id)
+            models.Index(fields=['nombre', 'id'], name='producto_nombre_id_idx'),
+            # Productos de una empresa (?empresa=) en el mismo orden, sin ordenar en memoria
+            models.Index(fields=['empresa', 'nombre', 'id'], name='producto_empresa_nombre_idx'),
+            # Búsqueda por nombre (?search=, api/search.py): trigramas sobre UPPER(nombre), solo PostgreSQL
+            GinIndex(OpClass(Upper('nombre'), name='gin_trgm_ops'), name='producto_nombre_trgm_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nombre} ({self.codigo})"
@@ -147,6 +165,12 @@ class Inventario(models.Model):
         verbose_name_plural = 'Inventarios'
         unique_together = ['empresa', 'producto']
         ordering = ['-fecha_ingreso']
+        indexes = [
+            # Paginación por cursor sobre (fecha_ingreso, id), del más reciente al más antiguo
+            models.Index(fields=['-fecha_ingreso', '-id'], name='inventario_fecha_id_idx'),
+            # Inventario de una empresa (?empresa=, by_empresa, PDF) del más reciente al más antiguo
+            models.Index(fields=['empresa', '-fecha_ingreso', '-id'], name='inventario_empresa_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.empresa.nombre} - {self.producto.nombre} - Cantidad: {self.cantidad}"
@@ -167,3 +191,25 @@ class Inventario(models.Model):
         django_inventario.save()
         return django_inventario
 
+
+
+class SugerenciaProducto(models.Model):
+    """Sugerencias de IA guardadas por producto"""
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='sugerencia',
+        verbose_name='Producto'
+    )
+    # Hash SHA-256 del nombre y las características con los que se generaron las sugerencias
+    contenido_hash = models.CharField(max_length=64, verbose_name='Hash del contenido')
+    sugerencias = models.TextField(verbose_name='Sugerencias')
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Sugerencia de producto'
+        verbose_name_plural = 'Sugerencias de productos'
+    
+    def __str__(self):
+        return f"Sugerencias para el producto {self.producto_id}"
@@ -0,0 +1,204 @@
+"""
+Paginación por cursor (keyset) para listados grandes.
+
+En lugar de OFFSET, cada página continúa desde los valores de ordenamiento de
+la última fila de la página anterior, por lo que la página 10.000 cuesta lo mismo
+que la primera si existe un índice con el mismo orden.
+"""
+import base64
+import binascii
+import json
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor sobre un ordenamiento compuesto y único, p. ej. ('-fecha_ingreso', '-id').
+
+    A diferencia de CursorPagination de DRF (que solo usa el primer campo y un
+    offset para los empates), el cursor guarda los valores de todos los campos,
+    así que los empates del primer campo no degradan la consulta.
+
+    Parámetros:
+        ?cursor=      Cursor retornado en `next` o `previous`
+        ?page_size=   Tamaño de página (máximo `max_page_size`)
+        ?count=false  No calcular el total (evita el COUNT(*) en cada solicitud)
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.campos = [campo.lstrip('-') for campo in self.ordering]
+        self.count = queryset.count() if self.incluir_total(request) else None
+
+        valores, reverso = self.decode_cursor(request)
+        ordering = self._invertir(self.ordering) if reverso else self.ordering
+
+        if valores is not None:
+            queryset = queryset.filter(self._filtro_posterior(ordering, valores))
+
+        # Una fila adicional indica si hay otra página en esa dirección
+        filas = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+        if reverso:
+            filas.reverse()
+
+        if reverso:
+            self.has_next = valores is not None
+            self.has_previous = hay_mas
+        else:
+            self.has_next = hay_mas
+            self.has_previous = valores is not None
+
+        self.page = filas
+        return filas
+
+    def get_paginated_response(self, data):
+        respuesta = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            respuesta = {'count': self.count, **respuesta}
+        return Response(respuesta)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            tamano = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(tamano, self.max_page_size))
+
+    def incluir_total(self, request):
+        return request.query_params.get(self.count_query_param, 'true').lower() not in ('false', '0', 'no')
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverso=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverso=True)
+
+    def _link(self, fila, reverso):
+        valores = [self._valor(fila, campo) for campo in self.campos]
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(valores, reverso))
+
+    @staticmethod
+    def _valor(fila, campo):
+        # Las filas pueden ser instancias o dicts (listados construidos con values())
+        valor = fila[campo] if isinstance(fila, dict) else getattr(fila, campo)
+        return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+    @staticmethod
+    def _invertir(ordering):
+        return tuple(campo[1:] if campo.startswith('-') else f'-{campo}' for campo in ordering)
+
+    @staticmethod
+    def _filtro_posterior(ordering, valores):
+        """
+        Filtro de las filas que van después de `valores` en el orden dado.
+
+        Para ('-a', '-b') genera: a <= va AND (a < va OR (a = va AND b < vb)).
+        La primera condición redundante permite que la base de datos use el índice
+        para saltar directamente a la posición del cursor.
+        """
+        filtro = Q()
+        iguales = Q()
+        for campo, valor in zip(ordering, valores):
+            nombre = campo.lstrip('-')
+            operador = 'lt' if campo.startswith('-') else 'gt'
+            filtro |= iguales & Q(**{f'{nombre}__{operador}': valor})
+            iguales &= Q(**{nombre: valor})
+
+        primero = ordering[0]
+        operador = 'lte' if primero.startswith('-') else 'gte'
+        return Q(**{f'{primero.lstrip("-")}__{operador}': valores[0]}) & filtro
+
+    def encode_cursor(self, valores, reverso):
+        datos = json.dumps({'v': valores, 'r': reverso}, separators=(',', ':'), default=str)
+        return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        """
+        Returns:
+            tuple: (valores del cursor o None en la primera página, si la dirección es hacia atrás)
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            valores, reverso = datos['v'], bool(datos.get('r', False))
+        except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+            raise NotFound('Cursor inválido')
+        if not isinstance(valores, list) or len(valores) != len(self.ordering):
+            raise NotFound('Cursor inválido')
+        return valores, reverso
+
+
+class InventarioKeysetPagination(KeysetPagination):
+    """Inventario del más reciente al más antiguo (índice inventario_fecha_id_idx)"""
+    ordering = ('-fecha_ingreso', '-id')
+
+
+class ProductoKeysetPagination(KeysetPagination):
+    """Productos por nombre (índice producto_nombre_id_idx)"""
+    ordering = ('nombre', 'id')
+
+
+class CursorPaginationMixin:
+    """
+    Permite elegir la paginación por cursor con ?pagination=cursor (o enviando ?cursor=).
+    Sin el parámetro se mantiene la paginación por número de página.
+
+    El cursor impone el orden de `ordering`, por lo que no se combina con los
+    parámetros que ordenan de otra forma (?search= ordena por relevancia).
+    """
+    cursor_pagination_class = None
+    cursor_incompatible_params = ('search',)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params if self.request else {}
+            usar_cursor = params.get('pagination') == 'cursor' or 'cursor' in params
+            if usar_cursor and self.cursor_pagination_class is not None:
+                incompatibles = [p for p in self.cursor_incompatible_params if (params.get(p) or '').strip()]
+                if incompatibles:
+                    raise ValidationError({
+                        'pagination': f"La paginación por cursor no se puede combinar con ?{incompatibles[0]}="
+                    })
+                self._paginator = self.cursor_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -0,0 +1,141 @@
+"""
+Perfilado a demanda de solicitudes (solo administradores).
+
+Una solicitud con el encabezado `X-Profile: 1` o el parámetro `?profile=1`,
+autenticada con el token JWT de un administrador, se ejecuta bajo cProfile. El
+resultado se guarda en PROFILING_DIR/<id>.prof (formato pstats: se abre con
+`python manage.py show_profile <id>`, `python -m pstats`, snakeviz o flameprof) y
+la respuesta incluye `X-Profile-Id: <id>`.
+
+Se perfila una solicitud a la vez; si ya hay otra en curso la solicitud se
+atiende sin perfilar y sin X-Profile-Id. Se conservan como máximo
+PROFILING_MAX_FILES perfiles, y ninguno más antiguo que PROFILING_MAX_AGE_HOURS.
+
+Con ASGI se perfila el hilo del event loop mientras se atiende la solicitud: el
+perfil incluye las demás corrutinas que avanzan en ese lapso y no incluye el
+código que corre en hilos de sync_to_async (p. ej. las consultas del ORM).
+"""
+import cProfile
+import os
+import threading
+import time
+import uuid
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .models import User
+
+_EXTENSION = '.prof'
+_VALORES_ACTIVOS = ('1', 'true', 'yes')
+
+# cProfile no admite dos perfiles activos a la vez en Python 3.12+
+_lock_perfil = threading.Lock()
+
+
+def ruta_perfil(perfil_id):
+    """Ruta del archivo de un perfil; None si el id no es válido"""
+    if not perfil_id or not all(c.isalnum() or c == '-' for c in perfil_id):
+        return None
+    return os.path.join(settings.PROFILING_DIR, f'{perfil_id}{_EXTENSION}')
+
+
+def _solicitado(request):
+    valor = request.META.get('HTTP_X_PROFILE') or request.GET.get('profile') or ''
+    return valor.lower() in _VALORES_ACTIVOS
+
+
+def _es_administrador(request):
+    try:
+        resultado = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return resultado is not None and resultado[0].rol == User.Rol.ADMINISTRADOR
+
+
+def _aplicar_retencion(directorio):
+    """Borra los perfiles que exceden la cantidad máxima o la antigüedad máxima"""
+    limite = time.time() - settings.PROFILING_MAX_AGE_HOURS * 3600
+    perfiles = []
+    for entrada in os.scandir(directorio):
+        if entrada.name.endswith(_EXTENSION):
+            perfiles.append((entrada.stat().st_mtime, entrada.path))
+    perfiles.sort(reverse=True)
+    for posicion, (modificado, ruta) in enumerate(perfiles):
+        if posicion >= settings.PROFILING_MAX_FILES or modificado < limite:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+
+
+def _guardar(perfil):
+    """Escribe el perfil en PROFILING_DIR, aplica la retención y retorna su id"""
+    perfil_id = f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}'
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    perfil.dump_stats(ruta_perfil(perfil_id))
+    _aplicar_retencion(settings.PROFILING_DIR)
+    return perfil_id
+
+
+class ProfilingMiddleware:
+    """Ejecuta bajo cProfile las solicitudes marcadas por un administrador (ver el docstring del módulo)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.PROFILING_ENABLED or not _solicitado(request) or not _es_administrador(request):
+            return self.get_response(request)
+        if not _lock_perfil.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            perfil = cProfile.Profile()
+            try:
+                perfil.enable()
+            except ValueError:
+                # Otro perfilador (p. ej. un depurador) ya está activo en el proceso
+                return self.get_response(request)
+            try:
+                response = self.get_response(request)
+            finally:
+                perfil.disable()
+            perfil_id = _guardar(perfil)
+        finally:
+            _lock_perfil.release()
+
+        response['X-Profile-Id'] = perfil_id
+        return response
+
+    async def __acall__(self, request):
+        if not settings.PROFILING_ENABLED or not _solicitado(request):
+            return await self.get_response(request)
+        # La autenticación consulta la base de datos
+        if not await sync_to_async(_es_administrador)(request):
+            return await self.get_response(request)
+        if not _lock_perfil.acquire(blocking=False):
+            return await self.get_response(request)
+
+        try:
+            perfil = cProfile.Profile()
+            try:
+                perfil.enable()
+            except ValueError:
+                return await self.get_response(request)
+            try:
+                response = await self.get_response(request)
+            finally:
+                perfil.disable()
+            perfil_id = await sync_to_async(_guardar)(perfil)
+        finally:
+            _lock_perfil.release()
+
+        response['X-Profile-Id'] = perfil_id
+        return response
@@ -0,0 +1,145 @@
+"""
+Inspección de consultas SQL por solicitud: número, tiempo y consultas repetidas.
+
+Las consultas se interceptan con `connection.execute_wrapper`. Django pasa el SQL
+con marcadores (%s) y los parámetros aparte, por lo que el mismo texto de SQL
+repetido con distintos parámetros es la huella de un N+1 (una consulta por fila).
+
+- Con DEBUG=True la respuesta incluye X-DB-Query-Count, X-DB-Time-Ms,
+  X-DB-Duplicate-Queries y Server-Timing (visibles en las herramientas del navegador).
+- Si la solicitud supera QUERY_BUDGET_COUNT consultas, QUERY_BUDGET_DB_MS
+  milisegundos en la base de datos, o alguna consulta se repite
+  QUERY_BUDGET_DUPLICATES veces o más, se registra una advertencia con las
+  consultas más repetidas.
+
+Las consultas que hace una respuesta en streaming mientras se envía no se cuentan.
+
+Las conexiones de Django son propias de cada hilo y, con ASGI, el ORM se ejecuta
+en hilos de sync_to_async. Por eso cada conexión lleva un único execute_wrapper
+(`_despachar`) que anota la consulta en el registro de la solicitud actual,
+guardado en una ContextVar que se propaga a esos hilos.
+"""
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Caracteres del SQL que se muestran por cada consulta repetida en el log
+_LARGO_SQL_LOG = 300
+
+
+class RegistroConsultas:
+    """execute_wrapper que acumula el número, el tiempo y la huella de cada consulta"""
+
+    def __init__(self):
+        self.total = 0
+        self.duracion = 0.0
+        self.huellas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duracion += time.perf_counter() - inicio
+            self.total += 1
+            self.huellas[sql] += 1
+
+    @property
+    def duracion_ms(self):
+        return self.duracion * 1000
+
+    def repetidas(self, minimo):
+        """[(sql, veces)] de las consultas ejecutadas `minimo` veces o más, de la más repetida a la menos"""
+        return [(sql, veces) for sql, veces in self.huellas.most_common() if veces >= minimo]
+
+
+_registro_actual = ContextVar('registro_consultas', default=None)
+
+
+def _despachar(execute, sql, params, many, context):
+    registro = _registro_actual.get()
+    if registro is None:
+        return execute(sql, params, many, context)
+    return registro(execute, sql, params, many, context)
+
+
+def _instalar(connection, **kwargs):
+    """Agrega `_despachar` a la conexión (el primario o una réplica) una sola vez"""
+    if _despachar not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_despachar)
+
+
+connection_created.connect(_instalar, dispatch_uid='query_inspector')
+
+
+class QueryInspectorMiddleware:
+    """Mide las consultas de cada solicitud (ver el docstring del módulo)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Conexiones abiertas antes de cargar el middleware (p. ej. por los checks)
+        for conexion in connections.all(initialized_only=True):
+            _instalar(conexion)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.QUERY_INSPECTOR_ENABLED:
+            return self.get_response(request)
+
+        registro = RegistroConsultas()
+        token = _registro_actual.set(registro)
+        try:
+            response = self.get_response(request)
+        finally:
+            _registro_actual.reset(token)
+        return self._procesar(request, response, registro)
+
+    async def __acall__(self, request):
+        if not settings.QUERY_INSPECTOR_ENABLED:
+            return await self.get_response(request)
+
+        registro = RegistroConsultas()
+        token = _registro_actual.set(registro)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _registro_actual.reset(token)
+        return self._procesar(request, response, registro)
+
+    def _procesar(self, request, response, registro):
+        repetidas = registro.repetidas(settings.QUERY_BUDGET_DUPLICATES)
+        if settings.DEBUG:
+            response['X-DB-Query-Count'] = str(registro.total)
+            response['X-DB-Time-Ms'] = f'{registro.duracion_ms:.1f}'
+            response['X-DB-Duplicate-Queries'] = str(len(repetidas))
+            response['Server-Timing'] = f'db;dur={registro.duracion_ms:.1f}'
+
+        if (
+            registro.total > settings.QUERY_BUDGET_COUNT
+            or registro.duracion_ms > settings.QUERY_BUDGET_DB_MS
+            or repetidas
+        ):
+            self._advertir(request, registro, repetidas)
+        return response
+
+    @staticmethod
+    def _advertir(request, registro, repetidas):
+        detalle = ''.join(
+            f'\n  {veces}x {sql[:_LARGO_SQL_LOG]}' for sql, veces in repetidas[:5]
+        )
+        logger.warning(
+            '%s %s excede el presupuesto de consultas: %d consultas, %.1f ms en BD, %d consultas repetidas%s',
+            request.method, request.path, registro.total, registro.duracion_ms, len(repetidas), detalle
+        )
@@ -0,0 +1,328 @@
+"""
+Recomendador local de productos similares (TF-IDF + similitud coseno).
+
+Alternativa rápida y sin red a las sugerencias de Gemini: en lugar de inventar
+productos relacionados, busca en el catálogo real los productos cuyo nombre y
+características más se parecen a los del producto consultado.
+
+El índice se construye una vez por proceso a partir de la base de datos y se
+actualiza de forma incremental con las señales de guardado y borrado de Producto.
+Las escrituras no recalculan la matriz TF-IDF en la solicitud: la siguiente
+versión se calcula en un hilo en segundo plano mientras se sigue usando la anterior.
+"""
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from .models import Producto
+
+logger = logging.getLogger(__name__)
+
+# Palabras vacías en español que no aportan al parecido entre productos
+_PALABRAS_VACIAS = frozenset("""
+    a al con de del el en es la las lo los para por que se sin su sus un una y o u
+    muy mas más ideal tipo color marca modelo incluye unidad unidades
+""".split())
+
+_PALABRA = re.compile(r'[a-z0-9]+')
+
+# El nombre pesa más que las características al comparar productos
+_PESO_NOMBRE = 2
+
+
+def _normalizar(texto):
+    """Minúsculas y sin tildes"""
+    texto = unicodedata.normalize('NFKD', (texto or '').lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def tokenizar(nombre, caracteristicas):
+    """
+    Convierte el texto de un producto en un conteo de términos.
+
+    Returns:
+        Counter: término -> frecuencia (las palabras del nombre cuentan doble)
+    """
+    terminos = Counter()
+    for texto, peso in ((nombre, _PESO_NOMBRE), (caracteristicas, 1)):
+        for palabra in _PALABRA.findall(_normalizar(texto)):
+            if len(palabra) > 1 and palabra not in _PALABRAS_VACIAS:
+                terminos[palabra] += peso
+    return terminos
+
+
+class _IndicePublicado:
+    """
+    Matriz TF-IDF normalizada (CSR de scipy) de una versión del catálogo.
+
+    No se modifica después de creada: las consultas la leen sin lock mientras
+    otro hilo calcula la siguiente.
+    """
+
+    def __init__(self, filas, frecuencia_doc, n_terminos, version):
+        ids = list(filas)
+        longitudes = np.fromiter((len(filas[i][0]) for i in ids), dtype=np.int64, count=len(ids))
+        indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(longitudes, out=indptr[1:])
+        columnas = np.concatenate([filas[i][0] for i in ids]) if ids else np.zeros(0, dtype=np.int32)
+        conteos = np.concatenate([filas[i][1] for i in ids]) if ids else np.zeros(0, dtype=np.float32)
+
+        # idf suavizado: log((1 + n) / (1 + df)) + 1
+        df = np.zeros(n_terminos, dtype=np.float32)
+        if frecuencia_doc:
+            cols, valores = zip(*frecuencia_doc.items())
+            df[list(cols)] = valores
+        self.idf = np.log((1 + len(ids)) / (1 + df)) + 1
+        # idf de un término que aparece por primera vez después de esta versión (df = 1)
+        self.idf_nuevo = np.float32(np.log((1 + len(ids)) / 2) + 1)
+
+        datos = (1 + np.log(conteos)) * self.idf[columnas]
+        matriz = sparse.csr_matrix((datos, columnas, indptr), shape=(len(ids), n_terminos))
+        normas = np.sqrt(matriz.multiply(matriz).sum(axis=1)).A1
+        normas[normas == 0] = 1
+        self.matriz = sparse.diags(1 / normas).dot(matriz).tocsr()
+        self.ids = np.array(ids)
+        self.nombres = [filas[i][2] for i in ids]
+        self.posicion = {producto_id: i for i, producto_id in enumerate(ids)}
+        self.version = version
+
+    def vector(self, columnas, conteos):
+        """
+        Vector TF-IDF normalizado (1 x términos) de un producto que no está en la matriz.
+
+        Usa el idf de esta versión; los términos posteriores a ella cuentan en la
+        norma pero no pueden coincidir con ninguna fila de la matriz.
+        """
+        n_terminos = self.matriz.shape[1]
+        conocidas = columnas < n_terminos
+        idf = np.full(len(columnas), self.idf_nuevo, dtype=np.float32)
+        idf[conocidas] = self.idf[columnas[conocidas]]
+        pesos = (1 + np.log(conteos)) * idf
+        norma = float(np.sqrt(np.square(pesos).sum())) or 1.0
+        return sparse.csr_matrix(
+            (pesos[conocidas] / norma, columnas[conocidas], [0, int(conocidas.sum())]),
+            shape=(1, n_terminos)
+        )
+
+
+class RecomendadorTFIDF:
+    """
+    Índice TF-IDF en memoria sobre el catálogo de productos.
+
+    Guarda el conteo de términos de cada producto y la frecuencia de documento
+    de cada término. Las consultas usan la última matriz publicada; después de
+    un cambio, un hilo en segundo plano calcula la siguiente sin bloquear las
+    consultas. Mientras tanto los productos modificados se comparan con un
+    vector calculado en el momento con el idf de la matriz publicada.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vocabulario = {}          # término -> columna
+        self._frecuencia_doc = Counter()  # columna -> número de productos que la contienen
+        self._filas = {}                # producto_id -> (columnas, conteos, nombre)
+        self._version = 0               # aumenta con cada cambio
+        self._pendientes = {}           # producto_id -> versión del cambio que aún no está en _indice
+        self._indice = None
+        self._reconstruyendo = False
+        self.construido_en = None
+
+    def __len__(self):
+        return len(self._filas)
+
+    def __contains__(self, producto_id):
+        return producto_id in self._filas
+
+    def construir(self, productos):
+        """
+        Construye el índice completo.
+
+        Args:
+            productos: Iterable de tuplas (id, nombre, caracteristicas)
+        """
+        with self._lock:
+            self._vocabulario = {}
+            self._frecuencia_doc = Counter()
+            self._filas = {}
+            for producto_id, nombre, caracteristicas in productos:
+                self._agregar(producto_id, nombre, caracteristicas)
+            self._version += 1
+            self._indice = self._publicar()
+            self._pendientes = {}
+            self.construido_en = time.monotonic()
+
+    def actualizar(self, producto_id, nombre, caracteristicas):
+        """Agrega o reemplaza un producto en el índice"""
+        with self._lock:
+            self._quitar(producto_id)
+            self._agregar(producto_id, nombre, caracteristicas)
+            self._registrar_cambio(producto_id)
+
+    def eliminar(self, producto_id):
+        """Quita un producto del índice"""
+        with self._lock:
+            if self._quitar(producto_id):
+                self._registrar_cambio(producto_id)
+
+    def _agregar(self, producto_id, nombre, caracteristicas):
+        terminos = tokenizar(nombre, caracteristicas)
+        columnas = np.fromiter(
+            (self._vocabulario.setdefault(t, len(self._vocabulario)) for t in terminos),
+            dtype=np.int32, count=len(terminos)
+        )
+        conteos = np.fromiter(terminos.values(), dtype=np.float32, count=len(terminos))
+        self._frecuencia_doc.update(columnas.tolist())
+        self._filas[producto_id] = (columnas, conteos, nombre)
+
+    def _quitar(self, producto_id):
+        fila = self._filas.pop(producto_id, None)
+        if fila is None:
+            return False
+        self._frecuencia_doc.subtract(fila[0].tolist())
+        return True
+
+    def _publicar(self):
+        """Matriz de la versión actual (llamar con el lock tomado)"""
+        return _IndicePublicado(self._filas, self._frecuencia_doc, len(self._vocabulario), self._version)
+
+    def _registrar_cambio(self, producto_id):
+        """Marca el producto como pendiente y agenda la reconstrucción (con el lock tomado)"""
+        self._version += 1
+        self._pendientes[producto_id] = self._version
+        if not self._reconstruyendo:
+            self._reconstruyendo = True
+            threading.Thread(target=self._reconstruir_en_segundo_plano, name='recomendador-tfidf', daemon=True).start()
+
+    def _reconstruir_en_segundo_plano(self):
+        """Publica matrices nuevas hasta que no queden cambios pendientes"""
+        try:
+            while True:
+                # Las filas son tuplas que no se modifican: basta copiar los diccionarios
+                with self._lock:
+                    filas = dict(self._filas)
+                    frecuencia_doc = {c: n for c, n in self._frecuencia_doc.items() if n}
+                    n_terminos = len(self._vocabulario)
+                    version = self._version
+                indice = _IndicePublicado(filas, frecuencia_doc, n_terminos, version)
+                with self._lock:
+                    # construir() pudo publicar una versión más nueva mientras tanto
+                    if self._indice is None or self._indice.version < indice.version:
+                        self._indice = indice
+                    self._pendientes = {
+                        p: v for p, v in self._pendientes.items() if v > self._indice.version
+                    }
+                    if not self._pendientes:
+                        self._reconstruyendo = False
+                        return
+        except Exception:
+            logger.exception('Error al reconstruir la matriz del recomendador')
+            with self._lock:
+                self._reconstruyendo = False
+
+    def similares(self, producto_id, k=5):
+        """
+        Retorna los k productos más parecidos al producto dado.
+
+        Returns:
+            Lista de tuplas (producto_id, nombre, similitud) ordenada de mayor a menor
+        """
+        with self._lock:
+            if self._indice is None:
+                self._indice = self._publicar()
+                self._pendientes = {}
+            indice = self._indice
+            consulta = self._filas.get(producto_id)
+            pendientes = {p: self._filas.get(p) for p in self._pendientes}
+
+        if consulta is None or k <= 0:
+            return []
+
+        fila = indice.posicion.get(producto_id)
+        if fila is not None and producto_id not in pendientes:
+            vector = indice.matriz[fila]
+        else:
+            vector = indice.vector(consulta[0], consulta[1])
+
+        puntajes = indice.matriz.dot(vector.T).toarray().ravel()
+        # Las filas de productos modificados o borrados están desactualizadas en la matriz
+        for pendiente in pendientes:
+            posicion = indice.posicion.get(pendiente)
+            if posicion is not None:
+                puntajes[posicion] = 0
+        if fila is not None:
+            puntajes[fila] = 0
+
+        candidatos = []
+        n = min(k, int(np.count_nonzero(puntajes > 0)))
+        if n > 0:
+            mejores = np.argpartition(-puntajes, n - 1)[:n]
+            mejores = mejores[np.argsort(-puntajes[mejores], kind='stable')]
+            candidatos = [(float(puntajes[i]), int(indice.ids[i]), indice.nombres[i]) for i in mejores]
+        for pendiente, datos in pendientes.items():
+            if datos is not None and pendiente != producto_id:
+                similitud = float(indice.vector(datos[0], datos[1]).dot(vector.T).toarray()[0, 0])
+                if similitud > 0:
+                    candidatos.append((similitud, pendiente, datos[2]))
+
+        candidatos.sort(key=lambda candidato: -candidato[0])
+        return [(producto_id, nombre, similitud) for similitud, producto_id, nombre in candidatos[:k]]
+
+
+_recomendador = RecomendadorTFIDF()
+_lock_construccion = threading.Lock()
+
+
+def get_recommender():
+    """
+    Retorna el recomendador del proceso, construyéndolo si hace falta.
+
+    Cada proceso tiene su propio índice; las señales solo actualizan el del proceso
+    que guardó el producto, por lo que el índice se reconstruye completo cada
+    PRODUCT_RECOMMENDER_TTL segundos para incorporar cambios de otros workers.
+    """
+    construido_en = _recomendador.construido_en
+    if construido_en is None or time.monotonic() - construido_en > settings.PRODUCT_RECOMMENDER_TTL:
+        with _lock_construccion:
+            construido_en = _recomendador.construido_en
+            if construido_en is None or time.monotonic() - construido_en > settings.PRODUCT_RECOMMENDER_TTL:
+                _recomendador.construir(
+                    Producto.objects.values_list('id', 'nombre', 'caracteristicas').iterator(chunk_size=2000)
+                )
+    return _recomendador
+
+
+def producto_guardado(producto):
+    """Actualiza el índice cuando se guarda un producto (si ya fue construido)"""
+    if _recomendador.construido_en is not None:
+        _recomendador.actualizar(producto.pk, producto.nombre, producto.caracteristicas)
+
+
+def producto_eliminado(producto_id):
+    """Quita un producto del índice (si ya fue construido)"""
+    if _recomendador.construido_en is not None:
+        _recomendador.eliminar(producto_id)
+
+
+def get_similar_products(producto, k=5):
+    """
+    Sugerencias de productos relacionados tomadas del catálogo real.
+
+    Returns:
+        tuple: (texto de sugerencias en el mismo formato que la IA, lista de productos similares)
+    """
+    recomendador = get_recommender()
+    if producto.pk not in recomendador:
+        recomendador.actualizar(producto.pk, producto.nombre, producto.caracteristicas)
+
+    similares = recomendador.similares(producto.pk, k=k)
+    productos = [
+        {'id': producto_id, 'nombre': nombre, 'similitud': round(similitud, 4)}
+        for producto_id, nombre, similitud in similares
+    ]
+    texto = "\n".join(f"- {p['nombre']}" for p in productos)
+    return texto, productos
@@ -0,0 +1,52 @@
+"""
+Búsqueda por nombre de empresas y productos.
+
+En PostgreSQL usa los índices GIN de trigramas sobre UPPER(nombre) (pg_trgm,
+migración 0004_trigram_search_indexes): tanto `icontains` (que Django traduce a
+UPPER(nombre) LIKE UPPER('%texto%')) como el operador de similitud `%` se
+resuelven con el índice en lugar de recorrer toda la tabla, y los resultados se
+ordenan por similitud. En otras bases de datos (SQLite en
+desarrollo y pruebas) se usa `icontains`.
+"""
+from django.db import connections
+from django.db.models import Q
+from django.db.models.functions import Upper
+
+
+def _usa_trigramas(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def buscar_por_nombre(queryset, termino, campo='nombre', desempate=('nombre', 'pk')):
+    """
+    Filtra el queryset por el término de búsqueda y ordena por relevancia.
+    
+    Args:
+        queryset: QuerySet de Empresa o Producto
+        termino: Texto buscado
+        campo: Campo de texto indexado con trigramas
+        desempate: Ordenamiento para resultados con la misma similitud
+    
+    Returns:
+        QuerySet filtrado (anotado con `similitud` en PostgreSQL)
+    """
+    termino = termino.strip()
+    if not termino:
+        return queryset
+    
+    coincide = Q(**{f'{campo}__icontains': termino})
+    if not _usa_trigramas(queryset):
+        return queryset.filter(coincide)
+    
+    from django.contrib.postgres.search import TrigramSimilarity
+    
+    # Subcadena o nombre parecido (tolera errores de digitación). Ambas condiciones
+    # se expresan sobre UPPER(campo) para que coincidan con la expresión del índice.
+    parecido = Q(**{f'{campo}_busqueda__trigram_similar': termino.upper()})
+    return (
+        queryset
+        .annotate(**{f'{campo}_busqueda': Upper(campo)})
+        .filter(coincide | parecido)
+        .annotate(similitud=TrigramSimilarity(campo, termino))
+        .order_by('-similitud', *desempate)
+    )
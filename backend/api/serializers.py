@@ -33,7 +33,21 @@ class LoginSerializer(serializers.Serializer):
         return attrs
 
 
-class EmpresaSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer que acepta `fields` en el constructor para retornar solo
+    esos campos (usado por ?fields= en los listados).
+    """
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for nombre in set(self.fields) - set(fields):
+                self.fields.pop(nombre)
+
+
+class EmpresaSerializer(DynamicFieldsModelSerializer):
     """Serializer para el modelo Empresa"""
     
     class Meta:
@@ -42,7 +56,7 @@ class EmpresaSerializer(serializers.ModelSerializer):
         read_only_fields = ('fecha_creacion', 'fecha_actualizacion')
 
 
-class ProductoSerializer(serializers.ModelSerializer):
+class ProductoSerializer(DynamicFieldsModelSerializer):
     """Serializer para el modelo Producto"""
     empresa_nombre = serializers.CharField(source='empresa.nombre', read_only=True)
     
@@ -78,7 +92,7 @@ class ProductoSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
-class InventarioSerializer(serializers.ModelSerializer):
+class InventarioSerializer(DynamicFieldsModelSerializer):
     """Serializer para el modelo Inventario"""
     empresa_nombre = serializers.CharField(source='empresa.nombre', read_only=True)
     producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
@@ -100,3 +114,15 @@ class InventarioCreateSerializer(serializers.ModelSerializer):
         model = Inventario
         fields = ('empresa', 'producto', 'cantidad')
 
+
+
+class InventarioBulkItemSerializer(serializers.Serializer):
+    """Fila de la carga masiva de inventario (las llaves foráneas se resuelven por lote)"""
+    empresa = serializers.CharField(max_length=15)
+    producto = serializers.IntegerField(min_value=1)
+    cantidad = serializers.IntegerField(min_value=0)
+
+
+class MovimientoStockSerializer(serializers.Serializer):
+    """Cantidad a sumar o restar del stock"""
+    cantidad = serializers.IntegerField(min_value=1)
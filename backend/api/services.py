@@ -1,274 +1,151 @@
 """
 Servicios para funcionalidades adicionales con IA usando Google Gemini (Plan Gratuito)
 """
-import google.generativeai as genai
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from .models import User, Empresa, Producto, Inventario
+from django.core.cache import cache
+from .models import User, Empresa, Producto, Inventario, SugerenciaProducto
 from .utils import send_stock_alert_email
+from .chatbot_intents import answer_structured_question
+from .basic_suggestions import get_basic_suggestions
+from . import llm_gateway
+from .llm_gateway import LLMUnavailable
+from .db_router import lecturas_en_replica
+import hashlib
 import json
 
 
-def _get_available_gemini_model():
+def _prompt_sugerencias(producto_nombre, caracteristicas):
+    """Construye el prompt de sugerencias de productos"""
+    return f"""
+        Eres un asistente experto en sugerencias de productos para inventarios.
+        
+        Basándote en el siguiente producto:
+        Nombre: {producto_nombre}
+        Características: {caracteristicas}
+        
+        Proporciona 3 sugerencias de productos complementarios o relacionados que podrían interesar a los clientes.
+        Formato: Lista con nombres cortos de productos.
+        """
+
+
+def hash_contenido_producto(nombre, caracteristicas):
+    """Hash del texto del que dependen las sugerencias: nombre y características"""
+    return hashlib.sha256(f"{nombre}\n{caracteristicas or ''}".encode()).hexdigest()
+
+
+def _clave_cache_sugerencias(contenido_hash):
+    return f'sugerencias_producto:{contenido_hash}'
+
+
+def guardar_sugerencias(sugerencias_producto):
+    """Guarda (inserta o actualiza) sugerencias de productos en una sola consulta"""
+    SugerenciaProducto.objects.bulk_create(
+        sugerencias_producto,
+        update_conflicts=True,
+        unique_fields=['producto'],
+        update_fields=['contenido_hash', 'sugerencias', 'fecha_actualizacion']
+    )
+
+
+def get_product_suggestions(producto, user=None):
     """
-    Intenta obtener un modelo de Gemini disponible.
-    Prueba diferentes modelos en orden de preferencia.
+    Obtiene las sugerencias de un producto reutilizando las ya generadas por la IA.
     
-    Returns:
-        GenerativeModel: Modelo de Gemini disponible, o None si ninguno funciona
+    Las sugerencias se guardan contra el hash del nombre y las características,
+    por lo que solo se vuelven a pedir a Gemini cuando cambia el texto del producto.
     """
-    if not settings.GEMINI_API_KEY:
-        return None
-    
-    # Lista de modelos a probar en orden de preferencia
-    # Los modelos más recientes primero
-    # Nota: Los modelos disponibles pueden variar según la región y el plan
-    modelos_a_probar = [
-        'gemini-1.5-flash-latest',  # Versión más reciente de flash
-        'gemini-1.5-pro-latest',    # Versión más reciente de pro
-        'gemini-1.5-flash',         # Versión estable de flash
-        'gemini-1.5-pro',            # Versión estable de pro
-        'gemini-pro',                # Modelo legacy (puede no estar disponible)
-    ]
+    contenido_hash = hash_contenido_producto(producto.nombre, producto.caracteristicas)
+    clave = _clave_cache_sugerencias(contenido_hash)
     
-    genai.configure(api_key=settings.GEMINI_API_KEY)
+    sugerencias = cache.get(clave)
+    if sugerencias is not None:
+        return sugerencias
     
-    # Intentar listar modelos disponibles primero
-    try:
-        available_models = genai.list_models()
-        # Filtrar modelos que soportan generateContent
-        supported_models = []
-        for m in available_models:
-            try:
-                # Intentar acceder a los atributos del modelo
-                model_name = getattr(m, 'name', None) or getattr(m, 'display_name', None) or str(m)
-                methods = getattr(m, 'supported_generation_methods', [])
-                
-                if model_name and ('generateContent' in methods or len(methods) == 0):
-                    # Limpiar el nombre del modelo
-                    model_clean = model_name.replace('models/', '')
-                    supported_models.append(model_clean)
-            except Exception:
-                continue
-        
-        # Priorizar modelos de nuestra lista que estén disponibles
-        for modelo_preferido in modelos_a_probar:
-            modelo_limpio = modelo_preferido.replace('models/', '')
-            if modelo_limpio in supported_models:
-                try:
-                    return genai.GenerativeModel(modelo_limpio)
-                except Exception:
-                    continue
-        
-        # Si no encontramos ninguno de los preferidos, usar el primero disponible
-        if supported_models:
-            try:
-                return genai.GenerativeModel(supported_models[0])
-            except Exception:
-                pass
-    except Exception:
-        # Si falla list_models, intentar directamente con los modelos preferidos
-        pass
-    
-    # Fallback: intentar cada modelo directamente
-    last_error = None
-    for modelo in modelos_a_probar:
-        modelo_limpio = modelo.replace('models/', '')
+    sugerencias = (
+        SugerenciaProducto.objects
+        .filter(producto_id=producto.pk, contenido_hash=contenido_hash)
+        .values_list('sugerencias', flat=True)
+        .first()
+    )
+    if sugerencias is None:
+        if not llm_gateway.is_available():
+            return get_basic_suggestions(producto.nombre, producto.caracteristicas)
         try:
-            model = genai.GenerativeModel(modelo_limpio)
-            # Intentar una llamada de prueba para verificar que el modelo funciona
-            # (No generamos contenido, solo verificamos que el modelo existe)
-            return model
-        except Exception as e:
-            last_error = e
-            continue
+            sugerencias = llm_gateway.generate(_prompt_sugerencias(producto.nombre, producto.caracteristicas), user=user).strip()
+        except Exception:
+            # Las sugerencias básicas no se guardan: la próxima consulta vuelve a intentar con la IA
+            return get_basic_suggestions(producto.nombre, producto.caracteristicas)
+        guardar_sugerencias([SugerenciaProducto(producto_id=producto.pk, contenido_hash=contenido_hash, sugerencias=sugerencias)])
     
-    # Si llegamos aquí, ningún modelo funcionó
-    # El error se manejará en las funciones que llaman a esta
-    return None
+    cache.set(clave, sugerencias, settings.PRODUCT_SUGGESTIONS_CACHE_TTL)
+    return sugerencias
 
 
-def get_ai_product_suggestions(producto_nombre, caracteristicas):
-    """Obtiene sugerencias de productos usando OpenAI"""
-    
-    # Generar sugerencias básicas como fallback
-    def get_basic_suggestions(nombre, caracteristicas):
-        """Genera sugerencias básicas basadas en el producto"""
-        sugerencias = []
-        nombre_lower = nombre.lower()
-        caracteristicas_lower = caracteristicas.lower() if caracteristicas else ""
-        texto_completo = f"{nombre_lower} {caracteristicas_lower}"
-        
-        # Categorías más específicas con sugerencias detalladas
-        # Tecnología y electrónicos
-        if any(palabra in texto_completo for palabra in ['computador', 'laptop', 'pc', 'ordenador', 'portatil']):
-            sugerencias = [
-                "Mouse inalámbrico",
-                "Teclado mecánico",
-                "Monitor adicional"
-            ]
-        elif any(palabra in texto_completo for palabra in ['telefono', 'smartphone', 'celular', 'movil', 'iphone', 'android']):
-            sugerencias = [
-                "Cable de carga USB-C/Lightning",
-                "Funda protectora resistente",
-                "Auriculares inalámbricos"
-            ]
-        elif any(palabra in texto_completo for palabra in ['tablet', 'ipad']):
-            sugerencias = [
-                "Estuche con teclado",
-                "Lápiz digital compatible",
-                "Soporte ajustable"
-            ]
-        elif any(palabra in texto_completo for palabra in ['electronico', 'tecnologia', 'gadget', 'dispositivo']):
-            sugerencias = [
-                "Cable de carga compatible",
-                "Funda o protector",
-                "Accesorio de soporte"
-            ]
-        # Ropa y moda
-        elif any(palabra in texto_completo for palabra in ['camisa', 'camiseta', 'polo', 'blusa']):
-            sugerencias = [
-                "Pantalón o falda coordinada",
-                "Cinturón complementario",
-                "Chaqueta o abrigo"
-            ]
-        elif any(palabra in texto_completo for palabra in ['pantalon', 'jeans', 'pantalones']):
-            sugerencias = [
-                "Cinturón de cuero",
-                "Zapatos o zapatillas",
-                "Camisa o blusa"
-            ]
-        elif any(palabra in texto_completo for palabra in ['vestido', 'falda']):
-            sugerencias = [
-                "Zapatos de tacón o planos",
-                "Bolso o cartera",
-                "Accesorios de joyería"
-            ]
-        elif any(palabra in texto_completo for palabra in ['ropa', 'vestimenta', 'moda', 'prenda']):
-            sugerencias = [
-                "Complemento de moda relacionado",
-                "Accesorio de vestimenta",
-                "Producto de cuidado textil"
-            ]
-        # Alimentos y bebidas
-        elif any(palabra in texto_completo for palabra in ['bebida', 'refresco', 'jugo', 'agua', 'cerveza', 'vino']):
-            sugerencias = [
-                "Vaso o copa apropiada",
-                "Hielo o enfriador",
-                "Snacks complementarios"
-            ]
-        elif any(palabra in texto_completo for palabra in ['comida', 'alimento', 'comestible', 'snack']):
-            sugerencias = [
-                "Plato o recipiente para servir",
-                "Utensilios de cocina",
-                "Bebida complementaria"
-            ]
-        # Herramientas y construcción
-        elif any(palabra in texto_completo for palabra in ['herramienta', 'taladro', 'martillo', 'destornillador']):
-            sugerencias = [
-                "Caja de herramientas",
-                "Guantes de protección",
-                "Accesorios o repuestos"
-            ]
-        # Muebles
-        elif any(palabra in texto_completo for palabra in ['mueble', 'silla', 'mesa', 'sofa', 'cama']):
-            sugerencias = [
-                "Almohadas o cojines",
-                "Mesa auxiliar",
-                "Lámpara o iluminación"
-            ]
-        # Libros y material educativo
-        elif any(palabra in texto_completo for palabra in ['libro', 'texto', 'manual', 'guia']):
-            sugerencias = [
-                "Marcador o resaltador",
-                "Cuaderno o libreta",
-                "Estuche o portafolio"
-            ]
-        # Deportes
-        elif any(palabra in texto_completo for palabra in ['deporte', 'futbol', 'balon', 'pelota', 'gimnasio']):
-            sugerencias = [
-                "Equipamiento deportivo relacionado",
-                "Ropa deportiva",
-                "Accesorios de entrenamiento"
-            ]
-        # Si no se detecta ninguna categoría específica, analizar palabras clave más generales
-        else:
-            # Intentar detectar el tipo de producto por palabras más generales
-            if any(palabra in texto_completo for palabra in ['cable', 'conexion', 'conector']):
-                sugerencias = [
-                    "Adaptador compatible",
-                    "Extensión o prolongador",
-                    "Organizador de cables"
-                ]
-            elif any(palabra in texto_completo for palabra in ['bateria', 'pilas', 'energia']):
-                sugerencias = [
-                    "Cargador compatible",
-                    "Cable de carga",
-                    "Power bank o banco de energía"
-                ]
-            elif any(palabra in texto_completo for palabra in ['limpieza', 'detergente', 'jabon', 'shampoo']):
-                sugerencias = [
-                    "Esponja o cepillo",
-                    "Recipiente o dispensador",
-                    "Producto complementario de cuidado"
-                ]
-            else:
-                # Si realmente no se puede determinar, dar sugerencias más genéricas pero útiles
-                sugerencias = [
-                    f"Accesorio compatible para {nombre}",
-                    "Producto complementario relacionado",
-                    "Solución adicional recomendada"
-                ]
-        
-        return "\n".join([f"- {sug}" for sug in sugerencias])
+async def aget_product_suggestions(producto_id, nombre, caracteristicas, user=None):
+    """Versión asíncrona de get_product_suggestions para vistas ASGI"""
+    contenido_hash = hash_contenido_producto(nombre, caracteristicas)
+    clave = _clave_cache_sugerencias(contenido_hash)
     
-    # Si no hay API key, retornar sugerencias básicas
-    if not settings.GEMINI_API_KEY:
-        return get_basic_suggestions(producto_nombre, caracteristicas)
+    sugerencias = await cache.aget(clave)
+    if sugerencias is not None:
+        return sugerencias
     
-    try:
-        # Obtener modelo disponible
-        model = _get_available_gemini_model()
-        if not model:
-            return get_basic_suggestions(producto_nombre, caracteristicas)
-        
-        prompt = f"""
-        Eres un asistente experto en sugerencias de productos para inventarios.
-        
-        Basándote en el siguiente producto:
-        Nombre: {producto_nombre}
-        Características: {caracteristicas}
-        
-        Proporciona 3 sugerencias de productos complementarios o relacionados que podrían interesar a los clientes.
-        Formato: Lista con nombres cortos de productos.
-        """
-        
-        response = model.generate_content(prompt)
-        
-        return response.text.strip()
+    sugerencias = await (
+        SugerenciaProducto.objects
+        .filter(producto_id=producto_id, contenido_hash=contenido_hash)
+        .values_list('sugerencias', flat=True)
+        .afirst()
+    )
+    if sugerencias is None:
+        if not llm_gateway.is_available():
+            return get_basic_suggestions(nombre, caracteristicas)
+        try:
+            texto = await llm_gateway.agenerate(_prompt_sugerencias(nombre, caracteristicas), user=user)
+        except Exception:
+            return get_basic_suggestions(nombre, caracteristicas)
+        sugerencias = texto.strip()
+        await sync_to_async(guardar_sugerencias)([
+            SugerenciaProducto(producto_id=producto_id, contenido_hash=contenido_hash, sugerencias=sugerencias)
+        ])
     
-    except Exception as e:
-        error_str = str(e).lower()
-        
-        # Si hay error con la IA, retornar sugerencias básicas
-        return get_basic_suggestions(producto_nombre, caracteristicas)
+    await cache.aset(clave, sugerencias, settings.PRODUCT_SUGGESTIONS_CACHE_TTL)
+    return sugerencias
+
+
+def _consulta_emails_admin():
+    """Emails de los administradores; solo lee columnas del índice user_rol_email_idx"""
+    return User.objects.filter(rol=User.Rol.ADMINISTRADOR).values_list('email', flat=True)
 
 
-def get_inventory_predictions(inventario_data):
+def _get_admin_emails():
+    """Obtiene los emails de los administradores para enviar alertas"""
+    return [email for email in _consulta_emails_admin() if email]
+
+
+def _enviar_alertas_email(producto_nombre, empresa_nombre, cantidad, dias_hasta_quiebre, nivel_riesgo, admin_emails):
+    """Envía el email de alerta de stock a cada administrador"""
+    for admin_email in admin_emails:
+        try:
+            send_stock_alert_email(
+                producto_nombre=producto_nombre,
+                empresa_nombre=empresa_nombre,
+                cantidad=cantidad,
+                dias_hasta_quiebre=dias_hasta_quiebre,
+                nivel_riesgo=nivel_riesgo,
+                admin_email=admin_email
+            )
+        except Exception as e:
+            # No interrumpir el proceso si falla el envío de email
+            print(f"Error al enviar email de alerta a {admin_email}: {str(e)}")
+
+
+def _alertas_stock_bajo(inventario_data, admin_emails):
     """
-    Analiza el historial de inventario y predice cuándo un producto se quedará sin stock usando IA
-    
-    Args:
-        inventario_data: Lista de diccionarios con información del inventario
-            Cada diccionario debe tener: producto_nombre, cantidad, fecha_ingreso, fecha_actualizacion, empresa_nombre
-    
-    Returns:
-        Lista de alertas con predicciones
+    Valida productos con bajo stock directamente, sin IA.
+    Se usa como fallback si la IA falla o no está configurada.
     """
-    # Primero, validar productos con bajo stock directamente (fallback si IA falla o no está configurada)
     alerts_basicas = []
-    # Obtener emails de administradores para enviar alertas
-    administradores = User.objects.filter(rol=User.Rol.ADMINISTRADOR)
-    admin_emails = [admin.email for admin in administradores if admin.email]
     
     for item in inventario_data:
         cantidad = item.get('cantidad', 0)
@@ -305,43 +182,25 @@ def get_inventory_predictions(inventario_data):
             
             # Enviar email de alerta si es nivel ALTO (crítico o muy bajo)
             if nivel == 'ALTO' and admin_emails:
-                for admin_email in admin_emails:
-                    try:
-                        send_stock_alert_email(
-                            producto_nombre=producto_nombre,
-                            empresa_nombre=empresa_nombre,
-                            cantidad=cantidad,
-                            dias_hasta_quiebre=dias,
-                            nivel_riesgo=nivel,
-                            admin_email=admin_email
-                        )
-                    except Exception as e:
-                        # No interrumpir el proceso si falla el envío de email
-                        print(f"Error al enviar email de alerta a {admin_email}: {str(e)}")
-    
-    # Si no hay API key, retornar alertas básicas
-    if not settings.GEMINI_API_KEY:
-        return alerts_basicas
+                _enviar_alertas_email(producto_nombre, empresa_nombre, cantidad, dias, nivel, admin_emails)
     
-    try:
-        # Obtener modelo disponible
-        model = _get_available_gemini_model()
-        if not model:
-            return alerts_basicas
-        
-        # Preparar datos para el análisis
-        productos_info = []
-        for item in inventario_data:
-            productos_info.append({
-                'producto': item.get('producto_nombre', ''),
-                'cantidad_actual': item.get('cantidad', 0),
-                'empresa': item.get('empresa_nombre', ''),
-                'fecha_ingreso': item.get('fecha_ingreso', ''),
-                'fecha_actualizacion': item.get('fecha_actualizacion', '')
-            })
-        
-        # Crear prompt más específico para Gemini
-        prompt = f"""
+    return alerts_basicas
+
+
+def _prompt_predicciones(inventario_data):
+    """Construye el prompt de predicción de inventario"""
+    # Preparar datos para el análisis
+    productos_info = []
+    for item in inventario_data:
+        productos_info.append({
+            'producto': item.get('producto_nombre', ''),
+            'cantidad_actual': item.get('cantidad', 0),
+            'empresa': item.get('empresa_nombre', ''),
+            'fecha_ingreso': item.get('fecha_ingreso', ''),
+            'fecha_actualizacion': item.get('fecha_actualizacion', '')
+        })
+    
+    return f"""
         Eres un experto en análisis de inventario y predicción de stock. DEBES detectar productos con bajo stock (<=10 unidades) y generar alertas. Responde siempre en formato JSON válido.
         
         Analiza el siguiente inventario de productos y predice cuándo cada producto se quedará sin stock.
@@ -371,166 +230,171 @@ def get_inventory_predictions(inventario_data):
         
         Responde SOLO con el JSON, sin texto adicional.
         """
-        
-        response = model.generate_content(prompt)
-        result = response.text.strip()
-        
-        # Limpiar el resultado (puede tener markdown code blocks)
-        if result.startswith('```'):
-            result = result.split('```')[1]
-            if result.startswith('json'):
-                result = result[4:]
-            result = result.strip()
-        
-        import json
-        predictions = json.loads(result)
-        
-        # Procesar predicciones y asegurar que productos con bajo stock siempre generen alertas
-        alerts = []
-        productos_procesados = set()
-        
-        # Obtener emails de todos los administradores
-        administradores = User.objects.filter(rol=User.Rol.ADMINISTRADOR)
-        admin_emails = [admin.email for admin in administradores if admin.email]
-        
-        for pred in predictions:
-            cantidad = pred.get('cantidad_actual', 0)
-            nivel_riesgo = pred.get('nivel_riesgo', 'NINGUNO')
-            dias_hasta_quiebre = pred.get('dias_hasta_quiebre')
-            producto_nombre = pred.get('producto', '')
-            empresa_nombre = pred.get('empresa', '')
-            
-            # Si tiene bajo stock (<=10), SIEMPRE generar alerta
-            if cantidad <= 10:
-                if nivel_riesgo == 'NINGUNO' or dias_hasta_quiebre is None:
-                    # Corregir automáticamente si la IA no detectó el riesgo
-                    if cantidad == 0:
-                        dias_hasta_quiebre = 0
-                        nivel_riesgo = 'ALTO'
-                        alerta = f"El producto {producto_nombre} está SIN STOCK. Reabastecimiento urgente requerido."
-                    elif cantidad <= 3:
-                        dias_hasta_quiebre = 1
-                        nivel_riesgo = 'ALTO'
-                        alerta = f"El producto {producto_nombre} tiene stock CRÍTICO ({cantidad} unidades). Quiebre de inventario inminente."
-                    elif cantidad <= 5:
-                        dias_hasta_quiebre = 3
-                        nivel_riesgo = 'ALTO'
-                        alerta = f"El producto {producto_nombre} tiene stock MUY BAJO ({cantidad} unidades). Quiebre de inventario en aproximadamente 3 días."
-                    else:  # 6-10
-                        dias_hasta_quiebre = 7
-                        nivel_riesgo = 'MEDIO'
-                        alerta = f"El producto {producto_nombre} tiene stock BAJO ({cantidad} unidades). Quiebre de inventario en aproximadamente 7 días."
-                else:
-                    alerta = pred.get('alerta', f"El producto {producto_nombre} tendrá quiebre de inventario en {dias_hasta_quiebre} días")
-                
-                alert_data = {
-                    'producto': producto_nombre,
-                    'empresa': empresa_nombre,
-                    'cantidad_actual': cantidad,
-                    'dias_hasta_quiebre': dias_hasta_quiebre,
-                    'alerta': alerta,
-                    'nivel_riesgo': nivel_riesgo
-                }
-                alerts.append(alert_data)
-                productos_procesados.add((producto_nombre, empresa_nombre))
-                
-                # Enviar email de alerta si es nivel ALTO (crítico o muy bajo)
-                if nivel_riesgo == 'ALTO' and admin_emails:
-                    for admin_email in admin_emails:
-                        try:
-                            send_stock_alert_email(
-                                producto_nombre=producto_nombre,
-                                empresa_nombre=empresa_nombre,
-                                cantidad=cantidad,
-                                dias_hasta_quiebre=dias_hasta_quiebre,
-                                nivel_riesgo=nivel_riesgo,
-                                admin_email=admin_email
-                            )
-                        except Exception as e:
-                            # No interrumpir el proceso si falla el envío de email
-                            print(f"Error al enviar email de alerta a {admin_email}: {str(e)}")
-            # Si tiene stock moderado o alto pero la IA detectó riesgo, incluirla
-            elif nivel_riesgo != 'NINGUNO' and dias_hasta_quiebre is not None:
-                alerts.append({
-                    'producto': producto_nombre,
-                    'empresa': empresa_nombre,
-                    'cantidad_actual': cantidad,
-                    'dias_hasta_quiebre': dias_hasta_quiebre,
-                    'alerta': pred.get('alerta', f"El producto {producto_nombre} tendrá quiebre de inventario en {dias_hasta_quiebre} días"),
-                    'nivel_riesgo': nivel_riesgo
-                })
-                productos_procesados.add((producto_nombre, empresa_nombre))
-        
-        # Asegurar que todos los productos con bajo stock estén en las alertas
-        # Obtener emails de administradores si no se obtuvieron antes
-        if not admin_emails:
-            administradores = User.objects.filter(rol=User.Rol.ADMINISTRADOR)
-            admin_emails = [admin.email for admin in administradores if admin.email]
-        
-        for item in inventario_data:
-            cantidad = item.get('cantidad', 0)
-            producto = item.get('producto_nombre', '')
-            empresa = item.get('empresa_nombre', '')
-            key = (producto, empresa)
-            
-            if cantidad <= 10 and key not in productos_procesados:
-                # Agregar alerta básica si no fue procesada por la IA
+
+
+def _procesar_predicciones(result, inventario_data, admin_emails):
+    """
+    Procesa la respuesta de la IA y asegura que los productos con bajo stock
+    siempre generen alertas.
+    """
+    # Limpiar el resultado (puede tener markdown code blocks)
+    if result.startswith('```'):
+        result = result.split('```')[1]
+        if result.startswith('json'):
+            result = result[4:]
+        result = result.strip()
+    
+    predictions = json.loads(result)
+    
+    alerts = []
+    productos_procesados = set()
+    
+    for pred in predictions:
+        cantidad = pred.get('cantidad_actual', 0)
+        nivel_riesgo = pred.get('nivel_riesgo', 'NINGUNO')
+        dias_hasta_quiebre = pred.get('dias_hasta_quiebre')
+        producto_nombre = pred.get('producto', '')
+        empresa_nombre = pred.get('empresa', '')
+
+        # Si tiene bajo stock (<=10), SIEMPRE generar alerta
+        if cantidad <= 10:
+            if nivel_riesgo == 'NINGUNO' or dias_hasta_quiebre is None:
+                # Corregir automáticamente si la IA no detectó el riesgo
                 if cantidad == 0:
-                    dias = 0
-                    nivel = 'ALTO'
-                    mensaje = f"El producto {producto} está SIN STOCK. Reabastecimiento urgente requerido."
+                    dias_hasta_quiebre = 0
+                    nivel_riesgo = 'ALTO'
+                    alerta = f"El producto {producto_nombre} está SIN STOCK. Reabastecimiento urgente requerido."
                 elif cantidad <= 3:
-                    dias = 1
-                    nivel = 'ALTO'
-                    mensaje = f"El producto {producto} tiene stock CRÍTICO ({cantidad} unidades). Quiebre de inventario inminente."
+                    dias_hasta_quiebre = 1
+                    nivel_riesgo = 'ALTO'
+                    alerta = f"El producto {producto_nombre} tiene stock CRÍTICO ({cantidad} unidades). Quiebre de inventario inminente."
                 elif cantidad <= 5:
-                    dias = 3
-                    nivel = 'ALTO'
-                    mensaje = f"El producto {producto} tiene stock MUY BAJO ({cantidad} unidades). Quiebre de inventario en aproximadamente 3 días."
+                    dias_hasta_quiebre = 3
+                    nivel_riesgo = 'ALTO'
+                    alerta = f"El producto {producto_nombre} tiene stock MUY BAJO ({cantidad} unidades). Quiebre de inventario en aproximadamente 3 días."
                 else:  # 6-10
-                    dias = 7
-                    nivel = 'MEDIO'
-                    mensaje = f"El producto {producto} tiene stock BAJO ({cantidad} unidades). Quiebre de inventario en aproximadamente 7 días."
-                
-                alert_data = {
-                    'producto': producto,
-                    'empresa': empresa,
-                    'cantidad_actual': cantidad,
-                    'dias_hasta_quiebre': dias,
-                    'alerta': mensaje,
-                    'nivel_riesgo': nivel
-                }
-                alerts.append(alert_data)
-                
-                # Enviar email de alerta si es nivel ALTO (crítico o muy bajo)
-                if nivel == 'ALTO' and admin_emails:
-                    for admin_email in admin_emails:
-                        try:
-                            send_stock_alert_email(
-                                producto_nombre=producto,
-                                empresa_nombre=empresa,
-                                cantidad=cantidad,
-                                dias_hasta_quiebre=dias,
-                                nivel_riesgo=nivel,
-                                admin_email=admin_email
-                            )
-                        except Exception as e:
-                            # No interrumpir el proceso si falla el envío de email
-                            print(f"Error al enviar email de alerta a {admin_email}: {str(e)}")
-        
-        return alerts
+                    dias_hasta_quiebre = 7
+                    nivel_riesgo = 'MEDIO'
+                    alerta = f"El producto {producto_nombre} tiene stock BAJO ({cantidad} unidades). Quiebre de inventario en aproximadamente 7 días."
+            else:
+                alerta = pred.get('alerta', f"El producto {producto_nombre} tendrá quiebre de inventario en {dias_hasta_quiebre} días")
+
+            alert_data = {
+                'producto': producto_nombre,
+                'empresa': empresa_nombre,
+                'cantidad_actual': cantidad,
+                'dias_hasta_quiebre': dias_hasta_quiebre,
+                'alerta': alerta,
+                'nivel_riesgo': nivel_riesgo
+            }
+            alerts.append(alert_data)
+            productos_procesados.add((producto_nombre, empresa_nombre))
+
+            # Enviar email de alerta si es nivel ALTO (crítico o muy bajo)
+            if nivel_riesgo == 'ALTO' and admin_emails:
+                _enviar_alertas_email(producto_nombre, empresa_nombre, cantidad, dias_hasta_quiebre, nivel_riesgo, admin_emails)
+        # Si tiene stock moderado o alto pero la IA detectó riesgo, incluirla
+        elif nivel_riesgo != 'NINGUNO' and dias_hasta_quiebre is not None:
+            alerts.append({
+                'producto': producto_nombre,
+                'empresa': empresa_nombre,
+                'cantidad_actual': cantidad,
+                'dias_hasta_quiebre': dias_hasta_quiebre,
+                'alerta': pred.get('alerta', f"El producto {producto_nombre} tendrá quiebre de inventario en {dias_hasta_quiebre} días"),
+                'nivel_riesgo': nivel_riesgo
+            })
+            productos_procesados.add((producto_nombre, empresa_nombre))
+
+    # Asegurar que todos los productos con bajo stock estén en las alertas
+    for item in inventario_data:
+        cantidad = item.get('cantidad', 0)
+        producto = item.get('producto_nombre', '')
+        empresa = item.get('empresa_nombre', '')
+        key = (producto, empresa)
+
+        if cantidad <= 10 and key not in productos_procesados:
+            # Agregar alerta básica si no fue procesada por la IA
+            if cantidad == 0:
+                dias = 0
+                nivel = 'ALTO'
+                mensaje = f"El producto {producto} está SIN STOCK. Reabastecimiento urgente requerido."
+            elif cantidad <= 3:
+                dias = 1
+                nivel = 'ALTO'
+                mensaje = f"El producto {producto} tiene stock CRÍTICO ({cantidad} unidades). Quiebre de inventario inminente."
+            elif cantidad <= 5:
+                dias = 3
+                nivel = 'ALTO'
+                mensaje = f"El producto {producto} tiene stock MUY BAJO ({cantidad} unidades). Quiebre de inventario en aproximadamente 3 días."
+            else:  # 6-10
+                dias = 7
+                nivel = 'MEDIO'
+                mensaje = f"El producto {producto} tiene stock BAJO ({cantidad} unidades). Quiebre de inventario en aproximadamente 7 días."
+
+            alert_data = {
+                'producto': producto,
+                'empresa': empresa,
+                'cantidad_actual': cantidad,
+                'dias_hasta_quiebre': dias,
+                'alerta': mensaje,
+                'nivel_riesgo': nivel
+            }
+            alerts.append(alert_data)
+
+            # Enviar email de alerta si es nivel ALTO (crítico o muy bajo)
+            if nivel == 'ALTO' and admin_emails:
+                _enviar_alertas_email(producto, empresa, cantidad, dias, nivel, admin_emails)
+
+    return alerts
+
+
+def get_inventory_predictions(inventario_data, user=None):
+    """
+    Analiza el historial de inventario y predice cuándo un producto se quedará sin stock usando IA
     
-    except Exception as e:
-        error_str = str(e).lower()
-        
-        # Si hay error con la IA, retornar alertas básicas basadas en cantidad
-        if 'insufficient_quota' in error_str or 'quota' in error_str:
-            return alerts_basicas
-        elif 'invalid_api_key' in error_str or 'authentication' in error_str:
-            return alerts_basicas
-        else:
-            # En caso de cualquier otro error, retornar alertas básicas
-            return alerts_basicas
+    Args:
+        inventario_data: Lista de diccionarios con información del inventario
+            Cada diccionario debe tener: producto_nombre, cantidad, fecha_ingreso, fecha_actualizacion, empresa_nombre
+    
+        user: Usuario que hace la solicitud (para el límite de concurrencia por usuario)
+    
+    Returns:
+        Lista de alertas con predicciones
+    """
+    admin_emails = _get_admin_emails()
+    alerts_basicas = _alertas_stock_bajo(inventario_data, admin_emails)
+    
+    # Si no hay backend de IA configurado, retornar alertas básicas
+    if not llm_gateway.is_available():
+        return alerts_basicas
+    
+    try:
+        texto = llm_gateway.generate(_prompt_predicciones(inventario_data), user=user)
+        return _procesar_predicciones(texto.strip(), inventario_data, admin_emails)
+    
+    except Exception:
+        # Si hay error con la IA (cuota, clave inválida, etc.), retornar alertas básicas basadas en cantidad
+        return alerts_basicas
+
+
+async def aget_inventory_predictions(inventario_data, user=None):
+    """Versión asíncrona de get_inventory_predictions para vistas ASGI"""
+    admin_emails = [
+        email async for email in _consulta_emails_admin()
+        if email
+    ]
+    # El envío de emails usa SMTP bloqueante, se ejecuta fuera del event loop
+    alerts_basicas = await sync_to_async(_alertas_stock_bajo)(inventario_data, admin_emails)
+    
+    if not llm_gateway.is_available():
+        return alerts_basicas
+    
+    try:
+        texto = await llm_gateway.agenerate(_prompt_predicciones(inventario_data), user=user)
+        return await sync_to_async(_procesar_predicciones)(texto.strip(), inventario_data, admin_emails)
+    
+    except Exception:
+        return alerts_basicas
 
 
 def _search_in_data(question, productos_data, empresas_data, inventarios_data):
@@ -612,23 +476,16 @@ def _search_in_data(question, productos_data, empresas_data, inventarios_data):
     return None
 
 
-def get_chatbot_response(question, user):
+def _preparar_datos_chatbot(empresas, productos, inventarios):
     """
-    Responde preguntas del usuario sobre el sistema usando IA con contexto de los datos.
+    Prepara los datos del sistema en formato legible para el chatbot.
     
     Args:
-        question: Pregunta del usuario
-        user: Usuario que hace la pregunta
+        empresas, productos, inventarios: Instancias ya cargadas (con empresa y producto relacionados)
     
     Returns:
-        Respuesta del chatbot
+        dict con los datos y las estadísticas generales del sistema
     """
-    # Obtener datos del sistema para proporcionar contexto
-    empresas = Empresa.objects.all()
-    productos = Producto.objects.select_related('empresa').all()
-    inventarios = Inventario.objects.select_related('empresa', 'producto').all()
-    
-    # Preparar datos en formato legible
     empresas_data = []
     for emp in empresas:
         empresas_data.append({
@@ -666,77 +523,70 @@ def get_chatbot_response(question, user):
         })
     
     # Calcular estadísticas generales
-    total_productos = productos.count()
-    total_empresas = empresas.count()
-    total_inventario = sum(inv.cantidad for inv in inventarios)
-    valor_total_usd = sum(float(inv.cantidad * inv.producto.precio_usd) for inv in inventarios)
-    valor_total_eur = sum(float(inv.cantidad * inv.producto.precio_eur) for inv in inventarios)
-    valor_total_cop = sum(float(inv.cantidad * inv.producto.precio_cop) for inv in inventarios)
+    return {
+        'empresas': empresas_data,
+        'productos': productos_data,
+        'inventarios': inventarios_data,
+        'total_empresas': len(empresas_data),
+        'total_productos': len(productos_data),
+        'total_inventario': sum(inv['cantidad'] for inv in inventarios_data),
+        'valor_total_usd': sum(inv['valor_total_usd'] for inv in inventarios_data),
+        'valor_total_eur': sum(inv['valor_total_eur'] for inv in inventarios_data),
+        'valor_total_cop': sum(inv['valor_total_cop'] for inv in inventarios_data),
+    }
+
+
+def _respuesta_sin_ia(question, datos, aviso='', encabezado='', nota=''):
+    """
+    Responde usando búsqueda básica y, si no encuentra nada, el resumen del sistema.
     
-    # SIEMPRE intentar usar IA primero si está configurada
-    if not settings.GEMINI_API_KEY:
-        # Si no hay API key, usar búsqueda básica
-        respuesta_basica = _search_in_data(question, productos_data, empresas_data, inventarios_data)
-        if respuesta_basica:
-            return respuesta_basica
-        
-        # Si no encuentra nada, retornar respuesta con estadísticas
-        respuesta = "**Resumen del sistema:**\n\n"
-        respuesta += f"📊 Total de empresas: {total_empresas}\n"
-        respuesta += f"📦 Total de productos: {total_productos}\n"
-        respuesta += f"📋 Total de unidades en inventario: {total_inventario}\n"
-        respuesta += f"💰 Valor total del inventario:\n"
-        respuesta += f"   - USD: ${valor_total_usd:,.2f}\n"
-        respuesta += f"   - EUR: €{valor_total_eur:,.2f}\n"
-        respuesta += f"   - COP: ${valor_total_cop:,.2f}\n\n"
-        respuesta += "⚠️ La funcionalidad de IA no está configurada (falta GEMINI_API_KEY).\n\n"
-        respuesta += "No encontré información específica sobre tu pregunta. Por favor, intenta con el nombre exacto del producto o empresa."
-        return respuesta
+    Args:
+        aviso: Texto que se antepone siempre a la respuesta
+        encabezado: Texto que se antepone solo al resumen del sistema
+        nota: Texto que se agrega después del resumen del sistema
+    """
+    respuesta_basica = _search_in_data(question, datos['productos'], datos['empresas'], datos['inventarios'])
+    if respuesta_basica:
+        return aviso + respuesta_basica
     
-    try:
-        # Obtener modelo disponible
-        model = _get_available_gemini_model()
-        if not model:
-            # Si no hay modelo disponible, usar búsqueda básica
-            respuesta_basica = _search_in_data(question, productos_data, empresas_data, inventarios_data)
-            if respuesta_basica:
-                return respuesta_basica
-            
-            # Si no encuentra nada, retornar respuesta con estadísticas
-            respuesta = "⚠️ **Error con el servicio de IA**: No se pudo conectar con ningún modelo de Gemini disponible.\n\n"
-            respuesta += "**Resumen del sistema:**\n\n"
-            respuesta += f"📊 Total de empresas: {total_empresas}\n"
-            respuesta += f"📦 Total de productos: {total_productos}\n"
-            respuesta += f"📋 Total de unidades en inventario: {total_inventario}\n"
-            respuesta += f"💰 Valor total del inventario:\n"
-            respuesta += f"   - USD: ${valor_total_usd:,.2f}\n"
-            respuesta += f"   - EUR: €{valor_total_eur:,.2f}\n"
-            respuesta += f"   - COP: ${valor_total_cop:,.2f}\n\n"
-            respuesta += "No encontré información específica sobre tu pregunta. Por favor, intenta con el nombre exacto del producto o empresa."
-            return respuesta
-        
-        # Crear contexto con los datos del sistema
-        contexto = f"""
+    # Si no encuentra nada, retornar respuesta con estadísticas
+    respuesta = aviso + encabezado
+    respuesta += "**Resumen del sistema:**\n\n"
+    respuesta += f"📊 Total de empresas: {datos['total_empresas']}\n"
+    respuesta += f"📦 Total de productos: {datos['total_productos']}\n"
+    respuesta += f"📋 Total de unidades en inventario: {datos['total_inventario']}\n"
+    respuesta += f"💰 Valor total del inventario:\n"
+    respuesta += f"   - USD: ${datos['valor_total_usd']:,.2f}\n"
+    respuesta += f"   - EUR: €{datos['valor_total_eur']:,.2f}\n"
+    respuesta += f"   - COP: ${datos['valor_total_cop']:,.2f}\n\n"
+    respuesta += nota
+    respuesta += "No encontré información específica sobre tu pregunta. Por favor, intenta con el nombre exacto del producto o empresa."
+    return respuesta
+
+
+def _prompt_chatbot(question, datos):
+    """Construye el prompt del chatbot con el contexto de los datos del sistema"""
+    contexto = f"""
         Eres un asistente virtual experto en gestión de inventario, empresas y productos.
         
         DATOS DEL SISTEMA:
         
         RESUMEN GENERAL:
-        - Total de empresas: {total_empresas}
-        - Total de productos: {total_productos}
-        - Total de unidades en inventario: {total_inventario}
-        - Valor total del inventario en USD: ${valor_total_usd:,.2f}
-        - Valor total del inventario en EUR: €{valor_total_eur:,.2f}
-        - Valor total del inventario en COP: ${valor_total_cop:,.2f}
+        - Total de empresas: {datos['total_empresas']}
+        - Total de productos: {datos['total_productos']}
+        - Total de unidades en inventario: {datos['total_inventario']}
+        - Valor total del inventario en USD: ${datos['valor_total_usd']:,.2f}
+        - Valor total del inventario en EUR: €{datos['valor_total_eur']:,.2f}
+        - Valor total del inventario en COP: ${datos['valor_total_cop']:,.2f}
         
-        EMPRESAS ({len(empresas_data)}):
-        {json.dumps(empresas_data, indent=2, ensure_ascii=False)}
+        EMPRESAS ({len(datos['empresas'])}):
+        {json.dumps(datos['empresas'], indent=2, ensure_ascii=False)}
         
-        PRODUCTOS ({len(productos_data)}):
-        {json.dumps(productos_data, indent=2, ensure_ascii=False)}
+        PRODUCTOS ({len(datos['productos'])}):
+        {json.dumps(datos['productos'], indent=2, ensure_ascii=False)}
         
-        INVENTARIO ({len(inventarios_data)}):
-        {json.dumps(inventarios_data, indent=2, ensure_ascii=False)}
+        INVENTARIO ({len(datos['inventarios'])}):
+        {json.dumps(datos['inventarios'], indent=2, ensure_ascii=False)}
         
         INSTRUCCIONES:
         1. Responde preguntas sobre empresas, productos, inventario, cantidades, valores, precios en USD/EUR/COP, etc.
@@ -747,65 +597,127 @@ def get_chatbot_response(question, user):
         6. Si no encuentras información específica, indícalo claramente.
         7. Para cálculos de valores totales, usa las cantidades del inventario multiplicadas por los precios.
         """
-        
-        prompt = f"""
+    
+    return f"""
         {contexto}
         
         PREGUNTA DEL USUARIO: {question}
         
         Responde de forma clara y útil usando los datos proporcionados.
         """
-        
-        response = model.generate_content(prompt)
-        
-        return response.text.strip()
+
+
+def _motivo_error_ia(error):
+    """
+    Determina el mensaje a mostrar según el error devuelto por Gemini.
     
-    except Exception as e:
-        error_str = str(e).lower()
-        error_message = str(e)
-        
-        # Determinar el tipo de error y mensaje apropiado
-        motivo_error = ""
-        mostrar_error = True  # Flag para decidir si mostrar el mensaje de error
-        
-        # Detectar errores de modelo no encontrado (404) - estos son diferentes a límites de cuota
-        if '404' in error_str or 'not found' in error_str or 'is not found' in error_str or 'not supported' in error_str:
-            motivo_error = "ℹ️ **Nota**: El servicio de IA no está disponible temporalmente. Continuando con búsqueda básica...\n\n"
-            mostrar_error = False  # No mostrar error si encontramos resultados en búsqueda básica
-        elif 'insufficient_quota' in error_str or ('quota' in error_str and 'exceeded' in error_str):
+    Returns:
+        tuple: (motivo_error, mostrar_error)
+    """
+    error_str = str(error).lower()
+    mostrar_error = True  # Flag para decidir si mostrar el mensaje de error
+    
+    # Detectar errores de modelo no encontrado (404) - estos son diferentes a límites de cuota
+    if '404' in error_str or 'not found' in error_str or 'is not found' in error_str or 'not supported' in error_str:
+        motivo_error = "ℹ️ **Nota**: El servicio de IA no está disponible temporalmente. Continuando con búsqueda básica...\n\n"
+        mostrar_error = False  # No mostrar error si encontramos resultados en búsqueda básica
+    elif 'insufficient_quota' in error_str or ('quota' in error_str and 'exceeded' in error_str):
+        motivo_error = "⚠️ **Límite de uso excedido**: Has alcanzado el límite del plan gratuito de Gemini. Por favor, espera unos momentos o verifica tu cuenta en: https://makersuite.google.com/app/apikey\n\n"
+    elif 'invalid_api_key' in error_str or 'authentication' in error_str or '401' in error_str or '403' in error_str:
+        motivo_error = "⚠️ **Clave API inválida**: La clave de Gemini configurada no es válida. Verifica que GEMINI_API_KEY en el archivo .env sea correcta. Obtén una clave gratuita en: https://makersuite.google.com/app/apikey\n\n"
+    elif 'rate_limit' in error_str or '429' in error_str:
+        motivo_error = "ℹ️ **Nota**: Demasiadas solicitudes en poco tiempo. Continuando con búsqueda básica...\n\n"
+        mostrar_error = False
+    elif 'connection' in error_str or 'timeout' in error_str:
+        motivo_error = "ℹ️ **Nota**: No se pudo conectar con la API de Gemini. Continuando con búsqueda básica...\n\n"
+        mostrar_error = False
+    else:
+        # Para otros errores, verificar si es un error de límite real
+        if ('quota' in error_str or 'limit' in error_str) and ('exceeded' in error_str or 'reached' in error_str):
             motivo_error = "⚠️ **Límite de uso excedido**: Has alcanzado el límite del plan gratuito de Gemini. Por favor, espera unos momentos o verifica tu cuenta en: https://makersuite.google.com/app/apikey\n\n"
-        elif 'invalid_api_key' in error_str or 'authentication' in error_str or '401' in error_str or '403' in error_str:
-            motivo_error = "⚠️ **Clave API inválida**: La clave de Gemini configurada no es válida. Verifica que GEMINI_API_KEY en el archivo .env sea correcta. Obtén una clave gratuita en: https://makersuite.google.com/app/apikey\n\n"
-        elif 'rate_limit' in error_str or '429' in error_str:
-            motivo_error = "ℹ️ **Nota**: Demasiadas solicitudes en poco tiempo. Continuando con búsqueda básica...\n\n"
-            mostrar_error = False
-        elif 'connection' in error_str or 'timeout' in error_str:
-            motivo_error = "ℹ️ **Nota**: No se pudo conectar con la API de Gemini. Continuando con búsqueda básica...\n\n"
-            mostrar_error = False
         else:
-            # Para otros errores, verificar si es un error de límite real
-            if ('quota' in error_str or 'limit' in error_str) and ('exceeded' in error_str or 'reached' in error_str):
-                motivo_error = "⚠️ **Límite de uso excedido**: Has alcanzado el límite del plan gratuito de Gemini. Por favor, espera unos momentos o verifica tu cuenta en: https://makersuite.google.com/app/apikey\n\n"
-            else:
-                motivo_error = f"ℹ️ **Nota**: Error con el servicio de IA. Continuando con búsqueda básica...\n\n"
-                mostrar_error = False
-        
+            motivo_error = f"ℹ️ **Nota**: Error con el servicio de IA. Continuando con búsqueda básica...\n\n"
+            mostrar_error = False
+    
+    return motivo_error, mostrar_error
+
+
+_NOTA_SIN_API_KEY = "⚠️ La funcionalidad de IA no está configurada (falta GEMINI_API_KEY).\n\n"
+_ENCABEZADO_SIN_MODELO = "⚠️ **Error con el servicio de IA**: No se pudo conectar con ningún modelo de Gemini disponible.\n\n"
+
+
+# Solo lee datos: aunque llegue por POST, las consultas pueden ir a una réplica
+@lecturas_en_replica()
+def get_chatbot_response(question, user):
+    """
+    Responde preguntas del usuario sobre el sistema usando IA con contexto de los datos.
+    
+    Args:
+        question: Pregunta del usuario
+        user: Usuario que hace la pregunta
+    
+    Returns:
+        Respuesta del chatbot
+    """
+    # Preguntas estructuradas (conteos, totales, precios, stock) se responden
+    # con una sola consulta, sin cargar todo el sistema ni llamar a Gemini
+    respuesta_directa = answer_structured_question(question)
+    if respuesta_directa:
+        return respuesta_directa
+    
+    # Obtener datos del sistema para proporcionar contexto
+    datos = _preparar_datos_chatbot(
+        Empresa.objects.all(),
+        Producto.objects.select_related('empresa').all(),
+        Inventario.objects.select_related('empresa', 'producto').all()
+    )
+    
+    # SIEMPRE intentar usar IA primero si está configurada
+    if not llm_gateway.is_available():
+        # Si no hay API key, usar búsqueda básica
+        return _respuesta_sin_ia(question, datos, nota=_NOTA_SIN_API_KEY)
+    
+    try:
+        return llm_gateway.generate(_prompt_chatbot(question, datos), user=user).strip()
+    
+    except LLMUnavailable:
+        # Si no hay modelo disponible, usar búsqueda básica
+        return _respuesta_sin_ia(question, datos, encabezado=_ENCABEZADO_SIN_MODELO)
+    
+    except Exception as e:
         # Si hay error con la IA, intentar búsqueda básica como fallback
-        respuesta_basica = _search_in_data(question, productos_data, empresas_data, inventarios_data)
-        if respuesta_basica:
-            # Si encontramos resultados, solo mostrar el error si es importante (no para errores temporales)
-            return (motivo_error if mostrar_error else "") + respuesta_basica
-        
-        # Si no encuentra nada, retornar respuesta con estadísticas
-        respuesta = motivo_error if mostrar_error else ""
-        respuesta += "**Resumen del sistema:**\n\n"
-        respuesta += f"📊 Total de empresas: {total_empresas}\n"
-        respuesta += f"📦 Total de productos: {total_productos}\n"
-        respuesta += f"📋 Total de unidades en inventario: {total_inventario}\n"
-        respuesta += f"💰 Valor total del inventario:\n"
-        respuesta += f"   - USD: ${valor_total_usd:,.2f}\n"
-        respuesta += f"   - EUR: €{valor_total_eur:,.2f}\n"
-        respuesta += f"   - COP: ${valor_total_cop:,.2f}\n\n"
-        respuesta += "No encontré información específica sobre tu pregunta. Por favor, intenta con el nombre exacto del producto o empresa."
-        return respuesta
+        # (solo mostrar el error si es importante, no para errores temporales)
+        motivo_error, mostrar_error = _motivo_error_ia(e)
+        return _respuesta_sin_ia(question, datos, aviso=motivo_error if mostrar_error else '')
 
+
+async def aget_chatbot_response(question, user):
+    """
+    Versión asíncrona de get_chatbot_response para vistas ASGI.
+    Usa el ORM asíncrono y la llamada asíncrona a Gemini, sin ocupar un hilo
+    durante la espera del modelo.
+    """
+    with lecturas_en_replica():
+        respuesta_directa = await sync_to_async(answer_structured_question)(question)
+        if respuesta_directa:
+            return respuesta_directa
+        
+        datos = _preparar_datos_chatbot(
+            [emp async for emp in Empresa.objects.all()],
+            [prod async for prod in Producto.objects.select_related('empresa').all()],
+            [inv async for inv in Inventario.objects.select_related('empresa', 'producto').all()]
+        )
+    
+    if not llm_gateway.is_available():
+        return _respuesta_sin_ia(question, datos, nota=_NOTA_SIN_API_KEY)
+    
+    try:
+        texto = await llm_gateway.agenerate(_prompt_chatbot(question, datos), user=user)
+        return texto.strip()
+    
+    except LLMUnavailable:
+        return _respuesta_sin_ia(question, datos, encabezado=_ENCABEZADO_SIN_MODELO)
+    
+    except Exception as e:
+        motivo_error, mostrar_error = _motivo_error_ia(e)
+        return _respuesta_sin_ia(question, datos, aviso=motivo_error if mostrar_error else '')
@@ -0,0 +1,40 @@
+"""
+Señales del API: mantienen al día los índices en memoria cuando cambia el catálogo
+y la versión de datos del resumen por empresa.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Empresa, Producto, Inventario
+from . import recommender, summary, typeahead
+
+
+@receiver(post_save, sender=Producto)
+def actualizar_indices_producto(sender, instance, **kwargs):
+    recommender.producto_guardado(instance)
+    typeahead.producto_guardado(instance)
+
+
+@receiver(post_delete, sender=Producto)
+def eliminar_de_indices_producto(sender, instance, **kwargs):
+    recommender.producto_eliminado(instance.pk)
+    typeahead.producto_eliminado(instance.pk)
+
+
+@receiver(post_save, sender=Empresa)
+def actualizar_indices_empresa(sender, instance, **kwargs):
+    typeahead.empresa_guardada(instance)
+
+
+@receiver(post_delete, sender=Empresa)
+def eliminar_de_indices_empresa(sender, instance, **kwargs):
+    typeahead.empresa_eliminada(instance.pk)
+
+
+@receiver(post_save, sender=Empresa)
+@receiver(post_delete, sender=Empresa)
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Inventario)
+@receiver(post_delete, sender=Inventario)
+def invalidar_resumen_empresas(sender, **kwargs):
+    summary.invalidar_resumen()
@@ -0,0 +1,108 @@
+"""
+Resumen por empresa para el tablero: productos, unidades, stock bajo y valorización.
+
+El resumen se calcula con una sola consulta agrupada y se guarda en caché bajo
+una versión de los datos. Cada escritura de empresas, productos o inventario
+incrementa la versión (señales, o llamada directa en los caminos que usan
+update()/bulk_create), por lo que la siguiente lectura recalcula el resumen.
+
+La versión es un token aleatorio y no un contador: si la caché la descarta, el
+token nuevo no coincide con resúmenes viejos que sigan guardados. El ETag se
+deriva del contenido del resumen, así que nunca valida datos distintos aunque
+cada worker tenga su propia caché (LocMemCache). Con caché por proceso, un
+worker que no recibió la escritura puede servir el resumen anterior hasta
+EMPRESAS_SUMMARY_CACHE_TTL segundos; con una caché compartida (Redis,
+Memcached) la invalidación llega a todos.
+
+El resumen se calcula siempre en el primario: una réplica retrasada guardaría
+datos viejos bajo la versión nueva.
+"""
+import hashlib
+import json
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .models import Empresa, Producto
+from .chatbot_intents import _valor_total
+
+_CLAVE_VERSION = 'resumen_empresas:version'
+_MONEDAS = ('usd', 'eur', 'cop')
+
+
+def _nuevo_token():
+    return uuid.uuid4().hex
+
+
+def version_datos():
+    """Versión actual de los datos del resumen"""
+    return cache.get_or_set(_CLAVE_VERSION, _nuevo_token, None)
+
+
+def invalidar_resumen():
+    """
+    Cambia la versión de los datos cuando la transacción actual confirma,
+    para que nadie guarde en caché el resumen anterior con la versión nueva.
+    """
+    transaction.on_commit(_cambiar_version)
+
+
+def _cambiar_version():
+    cache.set(_CLAVE_VERSION, _nuevo_token(), None)
+
+
+def calcular_resumen():
+    """
+    Una consulta: empresas con sus totales de inventario agregados por GROUP BY.
+
+    El número de productos se cuenta con una subconsulta para que el JOIN con
+    inventario no lo multiplique.
+    """
+    productos = (
+        Producto.objects
+        .filter(empresa=OuterRef('pk'))
+        .order_by()
+        .values('empresa')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    filas = (
+        Empresa.objects
+        .using(DEFAULT_DB_ALIAS)
+        .order_by('nombre', 'nit')
+        .annotate(
+            total_productos=Coalesce(Subquery(productos, output_field=IntegerField()), Value(0)),
+            total_unidades=Coalesce(Sum('inventarios__cantidad'), Value(0)),
+            filas_stock_bajo=Count('inventarios', filter=Q(inventarios__cantidad__lte=settings.INVENTARIO_STOCK_BAJO)),
+            **_valor_total('inventarios__')
+        )
+        .values('nit', 'nombre', 'total_productos', 'total_unidades', 'filas_stock_bajo', *[f'valor_{m}' for m in _MONEDAS])
+    )
+    resumen = []
+    for fila in filas:
+        for moneda in _MONEDAS:
+            valor = fila[f'valor_{moneda}']
+            fila[f'valor_{moneda}'] = f'{valor or 0:.2f}'
+        resumen.append(fila)
+    return resumen
+
+
+def _etag(resumen):
+    contenido = json.dumps([settings.INVENTARIO_STOCK_BAJO, resumen], sort_keys=True)
+    return '"%s"' % hashlib.md5(contenido.encode('utf-8')).hexdigest()
+
+
+def get_resumen_empresas():
+    """
+    Returns:
+        tuple: (ETag derivado del contenido, lista de resúmenes por empresa)
+    """
+    clave = f'resumen_empresas:{version_datos()}'
+    guardado = cache.get(clave)
+    if guardado is None:
+        resumen = calcular_resumen()
+        guardado = (_etag(resumen), resumen)
+        cache.set(clave, guardado, settings.EMPRESAS_SUMMARY_CACHE_TTL)
+    return guardado
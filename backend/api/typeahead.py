@@ -0,0 +1,208 @@
+"""
+Autocompletado (typeahead) por prefijo para empresas y productos.
+
+Cada proceso mantiene un trie en memoria con los nombres (y cada palabra del
+nombre), los códigos de producto y los NIT de empresa. Buscar un prefijo recorre
+solo los nodos de ese prefijo, sin consultar la base de datos.
+
+El trie se construye en la primera consulta, se actualiza con las señales de
+guardado y borrado, y se reconstruye completo cada TYPEAHEAD_TTL segundos para
+incorporar los cambios hechos por otros procesos.
+"""
+import threading
+import time
+import unicodedata
+from django.conf import settings
+from .models import Empresa, Producto
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes, para comparar prefijos"""
+    texto = unicodedata.normalize('NFKD', (texto or '').lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c)).strip()
+
+
+def _claves(*textos):
+    """Texto completo y cada palabra a partir de la segunda (para encontrar 'dell' en 'laptop dell')"""
+    claves = set()
+    for texto in textos:
+        texto = normalizar(texto)
+        if not texto:
+            continue
+        claves.add(texto)
+        palabras = texto.split()
+        for i in range(1, len(palabras)):
+            claves.add(' '.join(palabras[i:]))
+    return claves
+
+
+class Trie:
+    """
+    Trie de prefijos. Cada nodo es un dict letra -> nodo; la clave '' guarda el
+    conjunto de ids cuya clave termina en ese nodo.
+    """
+
+    def __init__(self):
+        self._raiz = {}
+        self._lock = threading.Lock()
+        self._claves_por_id = {}
+        self._datos = {}
+        self.construido_en = None
+
+    def __len__(self):
+        return len(self._datos)
+
+    def construir(self, registros):
+        """
+        Args:
+            registros: Iterable de tuplas (id, datos, claves)
+        """
+        raiz, claves_por_id, datos_por_id = {}, {}, {}
+        for id_, datos, claves in registros:
+            self._insertar(raiz, id_, claves)
+            claves_por_id[id_] = claves
+            datos_por_id[id_] = datos
+        with self._lock:
+            self._raiz, self._claves_por_id, self._datos = raiz, claves_por_id, datos_por_id
+            self.construido_en = time.monotonic()
+
+    def actualizar(self, id_, datos, claves):
+        with self._lock:
+            self._quitar(id_)
+            self._insertar(self._raiz, id_, claves)
+            self._claves_por_id[id_] = claves
+            self._datos[id_] = datos
+
+    def eliminar(self, id_):
+        with self._lock:
+            self._quitar(id_)
+
+    @staticmethod
+    def _insertar(raiz, id_, claves):
+        for clave in claves:
+            nodo = raiz
+            for letra in clave:
+                nodo = nodo.setdefault(letra, {})
+            nodo.setdefault('', set()).add(id_)
+
+    def _quitar(self, id_):
+        for clave in self._claves_por_id.pop(id_, ()):
+            camino = [self._raiz]
+            for letra in clave:
+                camino.append(camino[-1].get(letra))
+                if camino[-1] is None:
+                    break
+            else:
+                ids = camino[-1].get('')
+                if ids:
+                    ids.discard(id_)
+                    if not ids:
+                        del camino[-1]['']
+                # Podar las ramas que quedaron vacías
+                for i in range(len(clave), 0, -1):
+                    if camino[i]:
+                        break
+                    del camino[i - 1][clave[i - 1]]
+        self._datos.pop(id_, None)
+
+    def buscar(self, prefijo, limite=10, filtro=None):
+        """
+        Retorna hasta `limite` registros cuya clave empieza por el prefijo, en orden alfabético.
+
+        Args:
+            prefijo: Texto escrito por el usuario
+            limite: Máximo de resultados
+            filtro: Función opcional datos -> bool
+        """
+        prefijo = normalizar(prefijo)
+        if not prefijo:
+            return []
+
+        with self._lock:
+            nodo = self._raiz
+            for letra in prefijo:
+                nodo = nodo.get(letra)
+                if nodo is None:
+                    return []
+
+            resultados = []
+            vistos = set()
+            # Recorrido en profundidad en orden alfabético; se detiene al completar el límite
+            pendientes = [nodo]
+            while pendientes and len(resultados) < limite:
+                nodo = pendientes.pop()
+                for id_ in sorted(nodo.get('', ())):
+                    if id_ in vistos:
+                        continue
+                    vistos.add(id_)
+                    datos = self._datos[id_]
+                    if filtro is None or filtro(datos):
+                        resultados.append(datos)
+                        if len(resultados) >= limite:
+                            break
+                pendientes.extend(nodo[letra] for letra in sorted(nodo, reverse=True) if letra)
+            return resultados
+
+
+def _registros_empresas():
+    for nit, nombre in Empresa.objects.values_list('nit', 'nombre').iterator(chunk_size=2000):
+        yield nit, {'nit': nit, 'nombre': nombre}, _claves(nombre, nit)
+
+
+def _registros_productos():
+    productos = Producto.objects.values_list('id', 'codigo', 'nombre', 'empresa_id').iterator(chunk_size=2000)
+    for id_, codigo, nombre, empresa_nit in productos:
+        yield id_, _datos_producto(id_, codigo, nombre, empresa_nit), _claves(nombre, codigo)
+
+
+def _datos_producto(id_, codigo, nombre, empresa_nit):
+    return {'id': id_, 'codigo': codigo, 'nombre': nombre, 'empresa': empresa_nit}
+
+
+TRIES = {
+    'empresas': (Trie(), _registros_empresas),
+    'productos': (Trie(), _registros_productos),
+}
+_lock_construccion = threading.Lock()
+
+
+def get_trie(tipo):
+    """Retorna el trie del tipo ('empresas' o 'productos'), construyéndolo si hace falta"""
+    trie, registros = TRIES[tipo]
+    if trie.construido_en is None or time.monotonic() - trie.construido_en > settings.TYPEAHEAD_TTL:
+        with _lock_construccion:
+            if trie.construido_en is None or time.monotonic() - trie.construido_en > settings.TYPEAHEAD_TTL:
+                trie.construir(registros())
+    return trie
+
+
+def empresa_guardada(empresa):
+    """Actualiza el trie cuando se guarda una empresa (si ya fue construido)"""
+    trie = TRIES['empresas'][0]
+    if trie.construido_en is not None:
+        trie.actualizar(empresa.nit, {'nit': empresa.nit, 'nombre': empresa.nombre}, _claves(empresa.nombre, empresa.nit))
+
+
+def empresa_eliminada(nit):
+    """Quita una empresa del trie (si ya fue construido)"""
+    trie = TRIES['empresas'][0]
+    if trie.construido_en is not None:
+        trie.eliminar(nit)
+
+
+def producto_guardado(producto):
+    """Actualiza el trie cuando se guarda un producto (si ya fue construido)"""
+    trie = TRIES['productos'][0]
+    if trie.construido_en is not None:
+        trie.actualizar(
+            producto.pk,
+            _datos_producto(producto.pk, producto.codigo, producto.nombre, producto.empresa_id),
+            _claves(producto.nombre, producto.codigo)
+        )
+
+
+def producto_eliminado(producto_id):
+    """Quita un producto del trie (si ya fue construido)"""
+    trie = TRIES['productos'][0]
+    if trie.construido_en is not None:
+        trie.eliminar(producto_id)
@@ -6,8 +6,10 @@ from .views import (
     EmpresaViewSet,
     ProductoViewSet,
     InventarioViewSet,
-    ChatbotView
+    ChatbotView,
+    TypeaheadView
 )
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'empresas', EmpresaViewSet, basename='empresa')
@@ -18,6 +20,11 @@ urlpatterns = [
     path('login/', LoginView.as_view(), name='login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('chatbot/', ChatbotView.as_view(), name='chatbot'),
+    path('typeahead/', TypeaheadView.as_view(), name='typeahead'),
+    # Versiones asíncronas de los endpoints de IA (requieren servidor ASGI)
+    path('async/chatbot/', async_views.chatbot, name='async_chatbot'),
+    path('async/productos/<int:pk>/ai_suggestions/', async_views.ai_suggestions, name='async_ai_suggestions'),
+    path('async/inventario/predictions/', async_views.inventory_predictions, name='async_inventory_predictions'),
     path('', include(router.urls)),
 ]
 
@@ -11,11 +11,13 @@ from django.core.mail import EmailMessage
 from django.http import HttpResponse
 from io import BytesIO
 from .models import Inventario
+from .metrics import medir, PDF_DURACION, EMAIL_ALERTA_DURACION
 import hashlib
 import json
 from datetime import datetime
 
 
+@medir(PDF_DURACION)
 def generate_pdf(inventario_list, empresa_nombre):
     """Genera un PDF con la información del inventario"""
     buffer = BytesIO()
@@ -164,6 +166,7 @@ def send_pdf_email(pdf_buffer, empresa_nombre, recipient_email):
         raise ValueError(f'Error al enviar email: {error_str}')
 
 
+@medir(EMAIL_ALERTA_DURACION, resultado=lambda enviado: 'ok' if enviado else 'error')
 def send_stock_alert_email(producto_nombre, empresa_nombre, cantidad, dias_hasta_quiebre, nivel_riesgo, admin_email):
     """Envía un correo de alerta de stock bajo al administrador"""
     # Verificar que la configuración de email esté completa
@@ -288,21 +291,45 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
         return False
 
 
-def generate_blockchain_hash(empresa_nit, producto_codigo, cantidad):
-    """Genera un hash tipo blockchain para la transacción de inventario"""
-    # Simula una transacción de blockchain generando un hash
+def _hash_transaccion(empresa_nit, producto_codigo, cantidad, timestamp, tipo='inventory_transaction'):
+    """Hash SHA-256 (similar a blockchain) de una transacción de inventario"""
     transaction_data = {
         'empresa_nit': empresa_nit,
         'producto_codigo': producto_codigo,
         'cantidad': str(cantidad),
-        'timestamp': datetime.now().isoformat(),
-        'type': 'inventory_transaction'
+        'timestamp': timestamp,
+        'type': tipo
     }
-    
-    # Crear hash SHA-256 (similar a blockchain)
     transaction_string = json.dumps(transaction_data, sort_keys=True)
     hash_object = hashlib.sha256(transaction_string.encode())
-    hash_hex = '0x' + hash_object.hexdigest()
+    return '0x' + hash_object.hexdigest()
+
+
+def generate_blockchain_hash(empresa_nit, producto_codigo, cantidad, tipo='inventory_transaction'):
+    """
+    Genera un hash tipo blockchain para la transacción de inventario.
     
-    return hash_hex
+    `tipo` distingue los movimientos de stock ('inventory_increment' o
+    'inventory_decrement', con `cantidad` igual a la variación) del registro de
+    una cantidad absoluta.
+    """
+    # Simula una transacción de blockchain generando un hash
+    return _hash_transaccion(empresa_nit, producto_codigo, cantidad, datetime.now().isoformat(), tipo)
+
+
+def generate_blockchain_hashes(transacciones):
+    """
+    Genera los hashes de un lote de transacciones de inventario.
+    
+    Args:
+        transacciones: Iterable de tuplas (empresa_nit, producto_codigo, cantidad)
+    
+    Returns:
+        Lista de hashes en el mismo orden (todas las transacciones del lote comparten el timestamp)
+    """
+    timestamp = datetime.now().isoformat()
+    return [
+        _hash_transaccion(empresa_nit, producto_codigo, cantidad, timestamp)
+        for empresa_nit, producto_codigo, cantidad in transacciones
+    ]
 
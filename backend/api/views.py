@@ -1,10 +1,17 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 from .models import User, Empresa, Producto, Inventario
 from .serializers import (
     UserSerializer,
@@ -12,11 +19,21 @@ from .serializers import (
     EmpresaSerializer,
     ProductoSerializer,
     InventarioSerializer,
-    InventarioCreateSerializer
+    InventarioCreateSerializer,
+    MovimientoStockSerializer
 )
 from .permissions import IsAdministrador, IsAdministradorOrReadOnly
+from .conditional import ConditionalGetMixin
+from .fieldsets import SparseFieldsetMixin
+from .pagination import CursorPaginationMixin, InventarioKeysetPagination, ProductoKeysetPagination
 from .utils import generate_pdf, send_pdf_email, generate_blockchain_hash
-from .services import get_ai_product_suggestions, get_inventory_predictions, get_chatbot_response
+from .search import buscar_por_nombre
+from .bulk import bulk_upsert_inventario, import_productos_csv, ImportacionInterrumpida
+from .services import get_product_suggestions, get_inventory_predictions, get_chatbot_response
+from .recommender import get_similar_products
+from .basic_suggestions import get_basic_suggestions
+from .typeahead import get_trie
+from .summary import get_resumen_empresas, invalidar_resumen
 
 
 class LoginView(APIView):
@@ -36,7 +53,7 @@ class LoginView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class EmpresaViewSet(viewsets.ModelViewSet):
+class EmpresaViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet para Empresa"""
     queryset = Empresa.objects.all()
     serializer_class = EmpresaSerializer
@@ -46,15 +63,34 @@ class EmpresaViewSet(viewsets.ModelViewSet):
         queryset = Empresa.objects.all()
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(nombre__icontains=search)
+            queryset = buscar_por_nombre(queryset, search)
         return queryset
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAdministrador])
+    def summary(self, request):
+        """
+        Resumen por empresa: productos, unidades, filas con stock bajo y valor del
+        inventario en USD, EUR y COP. Responde 304 si el resumen no cambió.
+        """
+        etag, resumen = get_resumen_empresas()
+        respuesta = get_conditional_response(request, etag=etag)
+        if respuesta is None:
+            respuesta = Response({
+                'umbral_stock_bajo': settings.INVENTARIO_STOCK_BAJO,
+                'results': resumen,
+            })
+        respuesta['ETag'] = etag
+        patch_cache_control(respuesta, private=True, no_cache=True)
+        return respuesta
+
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(ConditionalGetMixin, SparseFieldsetMixin, CursorPaginationMixin, viewsets.ModelViewSet):
     """ViewSet para Producto"""
     queryset = Producto.objects.select_related('empresa').all()
     serializer_class = ProductoSerializer
     permission_classes = [IsAdministrador]
+    cursor_pagination_class = ProductoKeysetPagination
+    etag_related_fields = ('empresa__fecha_actualizacion',)
     
     def get_queryset(self):
         queryset = Producto.objects.select_related('empresa').all()
@@ -63,16 +99,62 @@ class ProductoViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(empresa__nit=empresa)
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(nombre__icontains=search)
+            queryset = buscar_por_nombre(queryset, search)
         return queryset
     
     @action(detail=True, methods=['get'])
     def ai_suggestions(self, request, pk=None):
-        """Obtiene sugerencias de productos usando IA"""
+        """
+        Obtiene sugerencias de productos.
+        
+        ?backend=gemini usa IA; ?backend=tfidf retorna productos similares del
+        catálogo (recomendador local, sin red). Por defecto: PRODUCT_SUGGESTIONS_BACKEND.
+        """
         producto = self.get_object()
-        suggestions = get_ai_product_suggestions(producto.nombre, producto.caracteristicas)
+        backend = request.query_params.get('backend', settings.PRODUCT_SUGGESTIONS_BACKEND)
+        
+        if backend == 'tfidf':
+            suggestions, similares = get_similar_products(producto)
+            if not similares:
+                suggestions = get_basic_suggestions(producto.nombre, producto.caracteristicas)
+            return Response({'suggestions': suggestions, 'similar_products': similares, 'backend': 'tfidf'})
+        if backend != 'gemini':
+            return Response(
+                {'error': "El parámetro backend debe ser 'gemini' o 'tfidf'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        suggestions = get_product_suggestions(producto, user=request.user)
         return Response({'suggestions': suggestions})
     
+    @action(detail=False, methods=['post'], url_path='import-csv', parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        """
+        Importa productos desde un archivo CSV (campo "archivo").
+        Columnas: codigo, nombre, caracteristicas, precio_usd, empresa (NIT).
+        Si el archivo deja de poderse leer a mitad de camino responde 400 con lo
+        importado hasta ese punto (`creados`, `errores`) y la `fila` donde se detuvo.
+        """
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response(
+                {'error': 'Debe enviar el archivo CSV en el campo "archivo"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            resultado = import_productos_csv(archivo)
+        except ImportacionInterrumpida as e:
+            # Las filas anteriores a la fila ilegible ya se importaron
+            return Response(
+                {'error': f'Archivo CSV inválido: {str(e)}', 'fila': e.fila, **e.resultado},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({'error': f'Archivo CSV inválido: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(resultado, status=status.HTTP_200_OK)
+    
     @action(detail=False, methods=['get'], url_path='convert-currency')
     def convert_currency(self, request):
         """Convierte un monto en USD a EUR y COP"""
@@ -100,11 +182,13 @@ class ProductoViewSet(viewsets.ModelViewSet):
             )
 
 
-class InventarioViewSet(viewsets.ModelViewSet):
+class InventarioViewSet(ConditionalGetMixin, SparseFieldsetMixin, CursorPaginationMixin, viewsets.ModelViewSet):
     """ViewSet para Inventario"""
     queryset = Inventario.objects.select_related('empresa', 'producto').all()
     serializer_class = InventarioSerializer
     permission_classes = [IsAdministrador]
+    cursor_pagination_class = InventarioKeysetPagination
+    etag_related_fields = ('empresa__fecha_actualizacion', 'producto__fecha_actualizacion')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -119,37 +203,151 @@ class InventarioViewSet(viewsets.ModelViewSet):
         return queryset
     
     def perform_create(self, serializer):
-        """Crea el inventario y genera hash de blockchain"""
-        inventario = serializer.save()
+        """Crea el inventario con su hash de blockchain en un solo INSERT"""
+        datos = serializer.validated_data
         
-        # Generar hash de blockchain para la transacción
+        # Generar hash de blockchain para la transacción a partir de los datos validados
+        # (empresa y producto ya fueron cargados al validar las llaves foráneas)
         hash_transaccion = generate_blockchain_hash(
-            inventario.empresa.nit,
-            inventario.producto.codigo,
-            inventario.cantidad
+            datos['empresa'].nit,
+            datos['producto'].codigo,
+            datos.get('cantidad', Inventario._meta.get_field('cantidad').default)
         )
-        inventario.transaccion_hash = hash_transaccion
-        inventario.save()
+        serializer.save(transaccion_hash=hash_transaccion)
     
     def perform_update(self, serializer):
-        """Actualiza el inventario y regenera hash de blockchain"""
-        inventario = serializer.save()
+        """Actualiza el inventario y regenera su hash de blockchain en un solo UPDATE"""
+        datos = serializer.validated_data
+        inventario = serializer.instance
         
-        # Regenerar hash de blockchain para la transacción actualizada
+        # En una actualización parcial se usan los valores actuales de los campos omitidos
+        # (get_object carga empresa y producto con select_related)
         hash_transaccion = generate_blockchain_hash(
-            inventario.empresa.nit,
-            inventario.producto.codigo,
-            inventario.cantidad
+            datos['empresa'].nit if 'empresa' in datos else inventario.empresa_id,
+            datos['producto'].codigo if 'producto' in datos else inventario.producto.codigo,
+            datos.get('cantidad', inventario.cantidad)
         )
-        inventario.transaccion_hash = hash_transaccion
-        inventario.save()
+        serializer.save(transaccion_hash=hash_transaccion)
+    
+    @action(detail=True, methods=['post'])
+    def increment(self, request, pk=None):
+        """Suma unidades al stock de forma atómica"""
+        return self._mover_stock(request, signo=1)
+    
+    @action(detail=True, methods=['post'])
+    def decrement(self, request, pk=None):
+        """Resta unidades del stock de forma atómica (sin dejarlo negativo)"""
+        return self._mover_stock(request, signo=-1)
+    
+    def _mover_stock(self, request, signo):
+        """
+        Aplica la variación con un solo UPDATE condicional:
+        SET cantidad = cantidad + delta WHERE id = pk AND cantidad >= -delta.
+        
+        No hay lectura-modificación-escritura en Python, así que dos movimientos
+        simultáneos sobre la misma fila no se pisan y no hacen falta bloqueos.
+        Como en las demás escrituras, el hash se calcula sobre la cantidad
+        resultante: se lee en la misma transacción, mientras el UPDATE mantiene
+        bloqueada la fila, y se guarda con un segundo UPDATE.
+        """
+        serializer = MovimientoStockSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        delta = signo * serializer.validated_data['cantidad']
+        
+        inventario = self.get_object()
+        with transaction.atomic():
+            actualizados = (
+                Inventario.objects
+                .filter(pk=inventario.pk, cantidad__gte=-delta)
+                .update(cantidad=F('cantidad') + delta, fecha_actualizacion=timezone.now())
+            )
+            inventario.refresh_from_db(fields=['cantidad', 'fecha_actualizacion'])
+            if actualizados:
+                inventario.transaccion_hash = generate_blockchain_hash(
+                    inventario.empresa_id,
+                    inventario.producto.codigo,
+                    inventario.cantidad,
+                    tipo='inventory_increment' if delta > 0 else 'inventory_decrement'
+                )
+                Inventario.objects.filter(pk=inventario.pk).update(transaccion_hash=inventario.transaccion_hash)
+        
+        if not actualizados:
+            return Response(
+                {
+                    'error': 'Stock insuficiente para realizar el movimiento',
+                    'cantidad_disponible': inventario.cantidad
+                },
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        # update() no emite post_save
+        invalidar_resumen()
+        return Response(InventarioSerializer(inventario).data)
+    
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Crea o actualiza muchas filas de inventario en una sola transacción.
+        
+        Recibe una lista de filas {empresa, producto, cantidad} (o {"items": [...]})
+        y retorna los conteos y los errores de cada fila inválida.
+        """
+        filas = request.data.get('items') if isinstance(request.data, dict) else request.data
+        if not isinstance(filas, list) or not filas:
+            return Response(
+                {'error': 'Debe enviar una lista de filas con empresa, producto y cantidad'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(filas) > settings.INVENTARIO_BULK_MAX_ROWS:
+            return Response(
+                {'error': f'Máximo {settings.INVENTARIO_BULK_MAX_ROWS} filas por solicitud'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        resultado = bulk_upsert_inventario(filas)
+        procesados = resultado['creados'] + resultado['actualizados']
+        codigo = status.HTTP_200_OK if procesados else status.HTTP_400_BAD_REQUEST
+        return Response({'procesados': procesados, **resultado}, status=codigo)
     
     @action(detail=False, methods=['get'], url_path='empresa/(?P<empresa_nit>[^/.]+)')
     def by_empresa(self, request, empresa_nit=None):
-        """Obtiene inventario por empresa"""
+        """
+        Obtiene inventario por empresa, paginado.
+        
+        Con ?stream=true retorna todas las filas como un arreglo JSON que se
+        serializa de forma incremental, sin construir la respuesta completa en memoria.
+        """
         inventarios = self.queryset.filter(empresa__nit=empresa_nit)
-        serializer = self.get_serializer(inventarios, many=True)
-        return Response(serializer.data)
+        
+        if request.query_params.get('stream', '').lower() == 'true':
+            response = StreamingHttpResponse(
+                self._stream_json(inventarios.order_by('-fecha_ingreso', '-id')),
+                content_type='application/json'
+            )
+            response['X-Accel-Buffering'] = 'no'
+            return response
+        
+        page = self.paginate_queryset(inventarios)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    def _stream_json(self, queryset, chunk_size=500):
+        """Genera un arreglo JSON leyendo las filas con un cursor del lado del servidor"""
+        serializer = self.get_serializer()
+        encoder = JSONEncoder(ensure_ascii=False)
+        
+        yield '['
+        bloque = []
+        primero = True
+        for inventario in queryset.iterator(chunk_size=chunk_size):
+            bloque.append(encoder.encode(serializer.to_representation(inventario)))
+            if len(bloque) >= chunk_size:
+                yield ('' if primero else ',') + ','.join(bloque)
+                primero = False
+                bloque = []
+        if bloque:
+            yield ('' if primero else ',') + ','.join(bloque)
+        yield ']'
     
     @action(detail=False, methods=['get'], url_path='pdf/(?P<empresa_nit>[^/.]+)')
     def download_pdf(self, request, empresa_nit=None):
@@ -211,6 +409,35 @@ class InventarioViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    # Campos del inventario que usa la página de Inventario
+    bootstrap_fields = (
+        'id', 'empresa', 'empresa_nombre', 'producto', 'producto_codigo', 'producto_nombre',
+        'cantidad', 'precio_usd', 'precio_eur', 'precio_cop', 'transaccion_hash',
+    )
+    # Empresas y productos del primer lote de los selectores; el resto se busca con /api/typeahead/
+    bootstrap_select_limit = 20
+
+    @action(detail=False, methods=['get'])
+    def bootstrap(self, request):
+        """
+        Datos iniciales de la página de Inventario en una sola solicitud: la primera
+        página del inventario (acepta los mismos filtros y parámetros de paginación
+        que el listado) y un primer lote de empresas y productos para los selectores,
+        con la misma forma que los resultados de /api/typeahead/.
+
+        Evita autenticar y cargar el usuario una vez por cada listado; las tres
+        consultas se ejecutan seguidas y solo leen las columnas que la página muestra.
+        """
+        inventario = self.listado_valores(self.get_serializer(fields=self.bootstrap_fields))
+        limite = self.bootstrap_select_limit
+        return Response({
+            'empresas': list(Empresa.objects.order_by('nombre', 'nit').values('nit', 'nombre')[:limite]),
+            'productos': list(
+                Producto.objects.order_by('nombre', 'id').values('id', 'codigo', 'nombre', 'empresa')[:limite]
+            ),
+            'inventario': inventario.data,
+        })
+
     @action(detail=False, methods=['get'], url_path='predictions')
     def inventory_predictions(self, request):
         """Obtiene predicciones de inventario usando IA"""
@@ -243,7 +470,7 @@ class InventarioViewSet(viewsets.ModelViewSet):
                 })
             
             # Obtener predicciones usando IA
-            alerts = get_inventory_predictions(inventario_data)
+            alerts = get_inventory_predictions(inventario_data, user=request.user)
             
             return Response({
                 'alerts': alerts,
@@ -285,3 +512,40 @@ class ChatbotView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+
+class TypeaheadView(APIView):
+    """
+    Autocompletado por prefijo de nombre, código o NIT, servido desde un trie en memoria.
+
+    Parámetros:
+        ?q=        Texto escrito por el usuario
+        ?tipo=     empresas | productos
+        ?limit=    Máximo de resultados (por defecto 10, máximo 50)
+        ?empresa=  NIT para limitar los productos a una empresa
+    """
+    permission_classes = [IsAuthenticated]
+    max_limit = 50
+
+    def get(self, request):
+        tipo = request.query_params.get('tipo', 'productos')
+        if tipo not in ('empresas', 'productos'):
+            return Response(
+                {'error': "El parámetro tipo debe ser 'empresas' o 'productos'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Igual que en los ViewSets: los productos solo los ven los administradores
+        if tipo == 'productos' and not IsAdministrador().has_permission(request, self):
+            self.permission_denied(request)
+
+        try:
+            limite = max(1, min(int(request.query_params.get('limit', 10)), self.max_limit))
+        except ValueError:
+            limite = 10
+
+        filtro = None
+        empresa = request.query_params.get('empresa')
+        if tipo == 'productos' and empresa:
+            filtro = lambda datos: datos['empresa'] == empresa
+
+        resultados = get_trie(tipo).buscar(request.query_params.get('q', ''), limite, filtro)
+        return Response({'results': resultados})
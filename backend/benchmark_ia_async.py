@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Benchmark de concurrencia de los endpoints de IA: vista síncrona vs vista asíncrona.
+Usa el backend falso del gateway de LLM (LLM_BACKEND='fake'), sin acceso a red.
+
+Ejecutar:
+    python benchmark_ia_async.py [--solicitudes 200] [--workers 4] [--latencia 1.0]
+
+La vista síncrona se ejecuta con un pool de `workers` hilos (como un servidor WSGI
+con ese número de hilos); la asíncrona atiende todas las solicitudes en un único
+event loop (como un worker ASGI).
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--solicitudes', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latencia', type=float, default=1.0, help='Latencia simulada del modelo en segundos')
+    return parser.parse_args()
+
+
+ARGS = _argumentos()
+
+# El gateway se crea al iniciar Django: configurar el backend falso antes de django.setup().
+# Los límites del gateway se abren para medir solo la concurrencia de las vistas.
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ['LLM_BACKEND'] = 'fake'
+os.environ['LLM_FAKE_LATENCY'] = str(ARGS.latencia)
+os.environ['LLM_MAX_CONCURRENCY'] = str(ARGS.solicitudes)
+os.environ['LLM_MAX_CONCURRENCY_PER_USER'] = str(ARGS.solicitudes)
+os.environ['LLM_RATE_LIMIT'] = '0'
+django.setup()
+
+from django.test import AsyncClient, Client
+from rest_framework_simplejwt.tokens import RefreshToken
+from api.models import User
+
+PREGUNTA = 'Recomiéndame qué productos reabastecer esta semana'
+
+
+def obtener_token():
+    user, _ = User.objects.get_or_create(
+        email='benchmark@local.test',
+        defaults={'rol': User.Rol.ADMINISTRADOR}
+    )
+    return str(RefreshToken.for_user(user).access_token)
+
+
+def benchmark_sincrono(token, solicitudes, workers):
+    client = Client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def llamar(_):
+        return client.post(
+            '/api/chatbot/', {'question': PREGUNTA}, content_type='application/json', headers=headers
+        ).status_code
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        codigos = list(pool.map(llamar, range(solicitudes)))
+    return time.perf_counter() - inicio, codigos
+
+
+async def benchmark_asincrono(token, solicitudes):
+    client = AsyncClient()
+    headers = {'Authorization': f'Bearer {token}'}
+    inicio = time.perf_counter()
+    respuestas = await asyncio.gather(*[
+        client.post('/api/async/chatbot/', {'question': PREGUNTA}, content_type='application/json', headers=headers)
+        for _ in range(solicitudes)
+    ])
+    return time.perf_counter() - inicio, [r.status_code for r in respuestas]
+
+
+def main():
+    args = ARGS
+    token = obtener_token()
+
+    print('=' * 60)
+    print(f'Solicitudes: {args.solicitudes} | Workers síncronos: {args.workers} | Latencia: {args.latencia}s')
+    print('=' * 60)
+
+    duracion, codigos = benchmark_sincrono(token, args.solicitudes, args.workers)
+    print(f'Síncrono : {duracion:8.2f}s  {args.solicitudes / duracion:8.1f} req/s  códigos={set(codigos)}')
+
+    duracion, codigos = asyncio.run(benchmark_asincrono(token, args.solicitudes))
+    print(f'Asíncrono: {duracion:8.2f}s  {args.solicitudes / duracion:8.1f} req/s  códigos={set(codigos)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
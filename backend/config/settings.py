@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -48,7 +49,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero para medir la duración completa de la solicitud
+    'api.metrics.MetricsMiddleware',
+    # Perfilado a demanda (X-Profile: 1, solo administradores) de todo lo que sigue
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Antes que los demás para comprimir la respuesta final
+    'api.compression.CompressionMiddleware',
+    'api.db_router.ReplicaRoutingMiddleware',
+    # Antes de sesiones y autenticación para contar también sus consultas
+    'api.query_inspector.QueryInspectorMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -93,6 +103,26 @@ DATABASES = {
     }
 }
 
+# Réplicas de solo lectura: DATABASE_REPLICAS=host1,host2:5433 (mismos nombre,
+# usuario y contraseña que el primario). Las lecturas de solicitudes GET van a
+# una réplica; ver api/db_router.py
+DATABASE_REPLICA_ALIASES = []
+for i, replica in enumerate(r.strip() for r in os.getenv('DATABASE_REPLICAS', '').split(',')):
+    if not replica:
+        continue
+    host, _, port = replica.partition(':')
+    alias = f'replica_{i}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        # En pruebas las réplicas apuntan a la base de datos de prueba del primario
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICA_ALIASES.append(alias)
+
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -186,3 +216,93 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 # Google Gemini API Key (para funcionalidad de IA - Plan gratuito)
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
 
+# Tiempo (segundos) que se reutiliza el modelo de Gemini resuelto antes de volver a consultar el catálogo
+GEMINI_MODEL_TTL = int(os.getenv('GEMINI_MODEL_TTL', '3600'))
+
+# Resolver el modelo de Gemini en segundo plano al iniciar el servidor (config/asgi.py,
+# config/wsgi.py); los comandos de manage.py distintos de runserver no lo hacen
+GEMINI_WARM_START = os.getenv('GEMINI_WARM_START', 'True') == 'True'
+
+# Tiempo (segundos) que las sugerencias de IA de un producto se mantienen en la caché
+# (además quedan guardadas en la base de datos hasta que cambie el texto del producto)
+PRODUCT_SUGGESTIONS_CACHE_TTL = int(os.getenv('PRODUCT_SUGGESTIONS_CACHE_TTL', '86400'))
+
+# Backend por defecto de las sugerencias de productos: 'gemini' (IA) o 'tfidf'
+# (productos similares del catálogo, sin red). Se puede elegir por solicitud con ?backend=
+PRODUCT_SUGGESTIONS_BACKEND = os.getenv('PRODUCT_SUGGESTIONS_BACKEND', 'gemini')
+# Tiempo (segundos) tras el cual cada proceso reconstruye completo su índice TF-IDF
+PRODUCT_RECOMMENDER_TTL = int(os.getenv('PRODUCT_RECOMMENDER_TTL', '600'))
+# Tiempo (segundos) tras el cual cada proceso reconstruye completo el trie de autocompletado
+TYPEAHEAD_TTL = int(os.getenv('TYPEAHEAD_TTL', '600'))
+
+# Máximo de filas por solicitud en la carga masiva de inventario
+INVENTARIO_BULK_MAX_ROWS = int(os.getenv('INVENTARIO_BULK_MAX_ROWS', '10000'))
+
+# Cantidad máxima con la que una fila de inventario cuenta como stock bajo en el resumen
+INVENTARIO_STOCK_BAJO = int(os.getenv('INVENTARIO_STOCK_BAJO', '10'))
+# Vida máxima (segundos) del resumen por empresa en caché; cada escritura lo invalida antes
+EMPRESAS_SUMMARY_CACHE_TTL = int(os.getenv('EMPRESAS_SUMMARY_CACHE_TTL', '300'))
+
+# Compresión de respuestas (api/compression.py); Brotli se usa si el paquete está instalado
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', '1024'))
+RESPONSE_COMPRESSION_TYPES = [
+    tipo.strip() for tipo in os.getenv(
+        'RESPONSE_COMPRESSION_TYPES',
+        'application/json,text/html,text/plain,text/css,text/csv,text/javascript,application/javascript,image/svg+xml,application/pdf'
+    ).split(',') if tipo.strip()
+]
+RESPONSE_COMPRESSION_GZIP_LEVEL = int(os.getenv('RESPONSE_COMPRESSION_GZIP_LEVEL', '6'))
+# Calidad 4-5: buena relación de compresión sin el costo de la calidad máxima (11) por solicitud
+RESPONSE_COMPRESSION_BROTLI_QUALITY = int(os.getenv('RESPONSE_COMPRESSION_BROTLI_QUALITY', '5'))
+# Mitigación de BREACH: bytes aleatorios máximos en la cabecera gzip (0 los desactiva, como
+# max_random_bytes de GZipMiddleware) y rutas que devuelven secretos y nunca se comprimen
+RESPONSE_COMPRESSION_GZIP_RANDOM_BYTES = int(os.getenv('RESPONSE_COMPRESSION_GZIP_RANDOM_BYTES', '100'))
+RESPONSE_COMPRESSION_EXCLUDED_PATHS = [
+    ruta.strip() for ruta in os.getenv(
+        'RESPONSE_COMPRESSION_EXCLUDED_PATHS', '/api/login/,/api/token/refresh/'
+    ).split(',') if ruta.strip()
+]
+
+# Inspección de consultas por solicitud (api/query_inspector.py): se registra una
+# advertencia si una solicitud supera alguno de estos límites
+QUERY_INSPECTOR_ENABLED = os.getenv('QUERY_INSPECTOR_ENABLED', 'True') == 'True'
+QUERY_BUDGET_COUNT = int(os.getenv('QUERY_BUDGET_COUNT', '50'))
+QUERY_BUDGET_DB_MS = float(os.getenv('QUERY_BUDGET_DB_MS', '500'))
+# Veces que puede repetirse el mismo SQL (con distintos parámetros) antes de considerarlo un N+1
+QUERY_BUDGET_DUPLICATES = int(os.getenv('QUERY_BUDGET_DUPLICATES', '10'))
+
+# Métricas en formato Prometheus en /metrics (api/metrics.py). Con varios workers,
+# METRICS_MULTIPROC_DIR es un directorio compartido donde cada proceso vuelca sus
+# valores cada METRICS_FLUSH_INTERVAL segundos (vaciarlo al desplegar)
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+# Si se define, /metrics exige 'Authorization: Bearer <token>'. Sin token /metrics
+# solo responde con DEBUG=True
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Perfilado a demanda con cProfile (api/profiling.py): un administrador envía
+# 'X-Profile: 1' o '?profile=1' y la respuesta incluye X-Profile-Id
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'True') == 'True'
+PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+# Retención: cantidad máxima de perfiles guardados y antigüedad máxima en horas
+PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', '50'))
+PROFILING_MAX_AGE_HOURS = float(os.getenv('PROFILING_MAX_AGE_HOURS', '72'))
+
+# Gateway de LLM (api/llm_gateway.py)
+# Backend: 'gemini' o 'fake' (backend local sin red para pruebas de carga)
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')
+# Llamadas simultáneas al modelo: en todo el proceso y por usuario
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+LLM_MAX_CONCURRENCY_PER_USER = int(os.getenv('LLM_MAX_CONCURRENCY_PER_USER', '2'))
+# Token bucket: llamadas por segundo (0 = sin límite) y ráfaga máxima
+LLM_RATE_LIMIT = float(os.getenv('LLM_RATE_LIMIT', '0.25'))
+LLM_RATE_BURST = int(os.getenv('LLM_RATE_BURST', '5'))
+# Plazo máximo por llamada (segundos), incluyendo esperas y reintentos
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '30'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', '0.5'))
+# Backend falso: latencia simulada (segundos), variación y proporción de errores 429
+LLM_FAKE_LATENCY = float(os.getenv('LLM_FAKE_LATENCY', '1.0'))
+LLM_FAKE_LATENCY_JITTER = float(os.getenv('LLM_FAKE_LATENCY_JITTER', '0.0'))
+LLM_FAKE_ERROR_RATE = float(os.getenv('LLM_FAKE_ERROR_RATE', '0.0'))
+
@@ -15,3 +15,12 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
 
+# Arranque en caliente: resolver el modelo de Gemini antes de la primera solicitud.
+# Solo al servir la aplicación (runserver también carga config/wsgi.py), no en los comandos de manage.py
+from django.conf import settings  # noqa: E402
+
+if settings.GEMINI_WARM_START:
+    from api import llm_gateway  # noqa: E402
+
+    llm_gateway.warm_up()
+
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Row, Col, Card, Form, Table, Badge, Modal } from 'react-bootstrap';
 import { FaBox, FaDownload, FaPaperPlane, FaExclamationTriangle, FaBrain, FaEdit, FaEnvelope } from 'react-icons/fa';
 import api from '../../services/api';
@@ -9,6 +9,44 @@ import Spinner from '../../components/atoms/Spinner/Spinner';
 import Alert from '../../components/atoms/Alert/Alert';
 import './Inventario.css';
 
+const LIMITE_BUSQUEDA = 20;
+
+// Busca en /api/typeahead/ mientras el usuario escribe, en lugar de descargar el catálogo completo.
+// Sin texto, el selector vuelve al primer lote que envió el bootstrap.
+const useBusquedaTypeahead = (tipo, busqueda, iniciales, setLista) => {
+  useEffect(() => {
+    const q = busqueda.trim();
+    if (!q) {
+      setLista(iniciales.current);
+      return undefined;
+    }
+    let vigente = true;
+    const temporizador = setTimeout(async () => {
+      try {
+        const response = await api.get('/api/typeahead/', { params: { tipo, q, limit: LIMITE_BUSQUEDA } });
+        if (vigente) {
+          setLista(response.data.results);
+        }
+      } catch (error) {
+        console.error(`Error al buscar ${tipo}:`, error);
+      }
+    }, 250);
+    return () => {
+      vigente = false;
+      clearTimeout(temporizador);
+    };
+  }, [tipo, busqueda]);
+};
+
+// Agrega al inicio los elementos elegidos que no están en los resultados de la búsqueda actual
+const incluirSeleccionados = (lista, clave, valores, conocidos) => {
+  const faltantes = valores
+    .filter(valor => valor && !lista.some(item => String(item[clave]) === String(valor)))
+    .map(valor => conocidos[valor])
+    .filter(Boolean);
+  return [...faltantes, ...lista];
+};
+
 const Inventario = () => {
   const [inventario, setInventario] = useState([]);
   const [empresas, setEmpresas] = useState([]);
@@ -40,35 +78,54 @@ const Inventario = () => {
   const [emailError, setEmailError] = useState('');
   const [selectedEmpresaForEmail, setSelectedEmpresaForEmail] = useState(null);
 
-  useEffect(() => {
-    fetchEmpresas();
-    fetchProductos();
-    fetchInventario();
-  }, []);
+  const [busquedaEmpresa, setBusquedaEmpresa] = useState('');
+  const [busquedaProducto, setBusquedaProducto] = useState('');
+
+  const datosInicialesCargados = useRef(false);
+  const empresasIniciales = useRef([]);
+  const productosIniciales = useRef([]);
+  // Empresas y productos recibidos hasta ahora, por clave, para no perder la opción elegida
+  const empresasConocidas = useRef({});
+  const productosConocidos = useRef({});
+
+  const mostrarEmpresas = (lista) => {
+    lista.forEach(emp => { empresasConocidas.current[emp.nit] = emp; });
+    setEmpresas(lista);
+  };
+
+  const mostrarProductos = (lista) => {
+    lista.forEach(prod => { productosConocidos.current[prod.id] = prod; });
+    setProductos(lista);
+  };
+
+  useBusquedaTypeahead('empresas', busquedaEmpresa, empresasIniciales, mostrarEmpresas);
+  useBusquedaTypeahead('productos', busquedaProducto, productosIniciales, mostrarProductos);
 
   useEffect(() => {
     if (selectedEmpresa) {
       fetchInventarioByEmpresa(selectedEmpresa);
+    } else if (!datosInicialesCargados.current) {
+      datosInicialesCargados.current = true;
+      fetchDatosIniciales();
     } else {
       fetchInventario();
     }
   }, [selectedEmpresa]);
 
-  const fetchEmpresas = async () => {
-    try {
-      const response = await api.get('/api/empresas/');
-      setEmpresas(response.data.results || response.data);
-    } catch (error) {
-      console.error('Error al cargar empresas:', error);
-    }
-  };
-
-  const fetchProductos = async () => {
+  // Inventario y primer lote de empresas y productos en una sola solicitud
+  const fetchDatosIniciales = async () => {
+    setLoading(true);
     try {
-      const response = await api.get('/api/productos/');
-      setProductos(response.data.results || response.data);
+      const response = await api.get('/api/inventario/bootstrap/');
+      empresasIniciales.current = response.data.empresas;
+      productosIniciales.current = response.data.productos;
+      mostrarEmpresas(response.data.empresas);
+      mostrarProductos(response.data.productos);
+      setInventario(response.data.inventario.results || response.data.inventario);
     } catch (error) {
-      console.error('Error al cargar productos:', error);
+      console.error('Error al cargar los datos iniciales:', error);
+    } finally {
+      setLoading(false);
     }
   };
 
@@ -108,7 +165,7 @@ const Inventario = () => {
     setLoading(true);
     try {
       const response = await api.get(`/api/inventario/empresa/${empresaNit}/`);
-      setInventario(response.data);
+      setInventario(response.data.results || response.data);
     } catch (error) {
       console.error('Error al cargar inventario:', error);
     } finally {
@@ -239,12 +296,16 @@ const Inventario = () => {
     setErrors({});
   };
 
-  const empresaOptions = empresas.map(emp => ({
+  const empresaOptions = incluirSeleccionados(
+    empresas, 'nit', [selectedEmpresa, formData.empresa], empresasConocidas.current
+  ).map(emp => ({
     value: emp.nit,
     label: `${emp.nombre} - ${emp.nit}`
   }));
 
-  const productoOptions = productos.map(prod => ({
+  const productoOptions = incluirSeleccionados(
+    productos, 'id', [formData.producto], productosConocidos.current
+  ).map(prod => ({
     value: prod.id,
     label: `${prod.nombre} (${prod.codigo})`
   }));
@@ -357,6 +418,16 @@ const Inventario = () => {
       )}
 
       <Row className="mb-4">
+        <Col md={4}>
+          <FormField
+            label="Buscar empresa"
+            type="text"
+            name="busquedaEmpresa"
+            value={busquedaEmpresa}
+            onChange={(e) => setBusquedaEmpresa(e.target.value)}
+            placeholder="Nombre o NIT"
+          />
+        </Col>
         <Col md={4}>
           <FormField
             label="Filtrar por empresa"
@@ -376,6 +447,14 @@ const Inventario = () => {
           </Card.Header>
           <Card.Body>
           <Form onSubmit={handleSubmit}>
+            <FormField
+              label="Buscar empresa"
+              type="text"
+              name="busquedaEmpresaFormulario"
+              value={busquedaEmpresa}
+              onChange={(e) => setBusquedaEmpresa(e.target.value)}
+              placeholder="Nombre o NIT"
+            />
             <FormField
               label="Empresa"
               type="select"
@@ -386,6 +465,14 @@ const Inventario = () => {
               error={errors.empresa}
               options={empresaOptions}
             />
+            <FormField
+              label="Buscar producto"
+              type="text"
+              name="busquedaProducto"
+              value={busquedaProducto}
+              onChange={(e) => setBusquedaProducto(e.target.value)}
+              placeholder="Nombre o código"
+            />
             <FormField
               label="Producto"
               type="select"